@@ -6,31 +6,31 @@
 """
 
 import argparse
+import hashlib
+import itertools
+import json
 import logging
+import mmap
 import os
+import re
 import sys
 import time
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
 
-# 添加專案路徑
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-from src.data_models import create_indexes, get_all_schemas
-from src.neo4j_loader.neo4j_loader import ImprovedNeo4jLoader, LoadConfig
-from src.rules.security_rules_engine import SecurityRulesEngine
 from src.extensions.modular_architecture import ExtensionManager, ModuleType
-# 導入分析模組
-from src.analysis.security_analysis import SecurityAnalyzer
-from src.analysis.failure_impact_analysis import FailureImpactAnalyzer
-from src.analysis.cost_optimization import CostOptimizationAnalyzer
+# Neo4j 載入器、規則引擎、分析模組與 AWS 提取器會拖入 neo4j/boto3 等重量級套件，
+# 延遲到實際使用的方法內才導入，以縮短 CLI 啟動時間
 
-# 動態導入 AWS 提取器（如果可用）
+# 嘗試導入 orjson 以加速 JSON 序列化
 try:
-    from src.extractors.aws_extractor import AWSExtractor
-    AWS_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    AWSExtractor = None
-    AWS_AVAILABLE = False
+    orjson = None
+    ORJSON_AVAILABLE = False
 
 # 設定日誌
 logging.basicConfig(
@@ -39,12 +39,99 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 設定檔 KEY=VALUE 行（允許縮排與等號兩側空白，略過以 # 開頭的註解行）
+_ENV_LINE_RE = re.compile(rb'^[ \t]*(?!#)([^=\s]+)[ \t]*=(.*)$', re.M)
+
+
+def _parse_env_value(raw: bytes) -> str:
+    """
+    轉換設定檔中的值
+    
+    一般值保持原樣（密碼等可能含有 $ 字元）；
+    以雙引號包住的值才去除引號並展開其中的 $VAR / ${VAR} 環境變數。
+    """
+    value = raw.decode().strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return os.path.expandvars(value[1:-1])
+    return value
+
+# 綜合分析中關鍵節點與單點故障清單的筆數上限（逐一列出完整節點屬性，需避免無上限的結果）；
+# 結果另以 *_total 記錄實際筆數、*_truncated 標示是否截斷，完整清單可由 FailureImpactAnalyzer 取得
+COMPREHENSIVE_NODE_LIMIT = 100
+
+
+def _json_default(obj: Any) -> Any:
+    """序列化 JSON 無法直接處理的物件（如 SecurityFinding）"""
+    to_dict = getattr(obj, 'to_dict', None)
+    if to_dict is None:
+        raise TypeError(f"無法序列化的型別: {type(obj).__name__}")
+    return to_dict()
+
+
+def _dump_json(obj: Any, output_path: Path, pretty: bool = True):
+    """
+    將物件寫入 JSON 檔案（可用時使用 orjson 直接寫入位元組）
+    
+    只給程式讀取的資料檔可傳入 pretty=False，輸出不縮排的精簡 JSON。
+    """
+    if ORJSON_AVAILABLE:
+        # dataclass 交給 _json_default，以其 to_dict() 決定輸出欄位
+        option = orjson.OPT_PASSTHROUGH_DATACLASS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(obj, default=_json_default, option=option))
+    else:
+        format_kwargs = {'indent': 2} if pretty else {'separators': (',', ':')}
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, ensure_ascii=False, default=_json_default, **format_kwargs)
+
+
+def _dump_ndjson(records: Iterable[Any], output_path: Path):
+    """將多筆紀錄逐行寫入 NDJSON 檔案，每行一筆，不需先組成完整清單"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_APPEND_NEWLINE
+        with open(output_path, 'wb') as f:
+            for record in records:
+                f.write(orjson.dumps(record, default=_json_default, option=option))
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=_json_default))
+                f.write('\n')
+
+
+def _load_json(input_path: Path) -> Any:
+    """讀取 JSON 檔案（可用時以 mmap + orjson 直接解析位元組）"""
+    if ORJSON_AVAILABLE:
+        with open(input_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                memoryview(mm) as view:
+            return orjson.loads(view)
+    with open(input_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 
 class ImprovedCloudInfrastructureAnalyzer:
     """改進的雲端基礎設施分析器"""
     
     def __init__(self, config_path: str = '.env'):
         self.config = self._load_config(config_path)
+        
+        # 解析並建立輸出目錄（僅於初始化時執行一次）
+        self.raw_data_dir = Path(self.config['data_dir']) / 'raw'
+        self.output_dir = Path(self.config['output_dir'])
+        self.raw_data_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 輸出檔名時間戳於啟動時取一次，並以遞增序號避免同秒覆寫
+        self._run_ts = time.time_ns() // 1_000_000_000
+        self._output_seq = itertools.count()
+        
+        # 最近一次擷取的資料（供完整流程直接載入，免去磁碟往返）；
+        # 沿用快取的模擬資料時為該檔案路徑
+        self._last_extracted = None
+        
         self.neo4j_loader = None
         self.rules_engine = None
         self.extension_manager = ExtensionManager()
@@ -65,6 +152,7 @@ class ImprovedCloudInfrastructureAnalyzer:
             'neo4j_database': os.getenv('NEO4J_DATABASE', 'neo4j'),
             'aws_region': os.getenv('AWS_REGION', 'us-east-1'),
             'use_mock_data': os.getenv('USE_MOCK_DATA', 'false').lower() == 'true',
+            'use_apoc_iterate': os.getenv('USE_APOC_ITERATE', 'false').lower() == 'true',
             'data_dir': os.getenv('DATA_DIR', 'data'),
             'output_dir': os.getenv('OUTPUT_DIR', 'output'),
             'log_level': os.getenv('LOG_LEVEL', 'INFO')
@@ -72,23 +160,40 @@ class ImprovedCloudInfrastructureAnalyzer:
         
         # 從檔案載入配置（如果存在）
         if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                for line in f:
-                    if '=' in line and not line.startswith('#'):
-                        key, value = line.strip().split('=', 1)
-                        config[key.lower()] = value
+            with open(config_path, 'rb') as f:
+                buf = f.read()
+            config.update({
+                m.group(1).decode().lower(): _parse_env_value(m.group(2))
+                for m in _ENV_LINE_RE.finditer(buf)
+            })
+            
+            # 檔案中的值皆為字串（'false' 仍為真值），布林設定依環境變數的相同規則轉換
+            for key in ('use_mock_data', 'use_apoc_iterate'):
+                if isinstance(config[key], str):
+                    config[key] = config[key].lower() == 'true'
         
         return config
     
+    def _next_output_suffix(self) -> str:
+        """產生唯一的輸出檔名後綴"""
+        return f"{self._run_ts}_{next(self._output_seq)}"
+    
     def _initialize_components(self):
         """初始化組件"""
         try:
+            from src.neo4j_loader.neo4j_loader import ImprovedNeo4jLoader, LoadConfig
+            from src.rules.security_rules_engine import SecurityRulesEngine
+            from src.analysis.security_analysis import SecurityAnalyzer
+            from src.analysis.failure_impact_analysis import FailureImpactAnalyzer
+            from src.analysis.cost_optimization import CostOptimizationAnalyzer
+            
             # 初始化 Neo4j 載入器
             self.neo4j_loader = ImprovedNeo4jLoader(
                 uri=self.config['neo4j_uri'],
                 username=self.config['neo4j_username'],
                 password=self.config['neo4j_password'],
-                database=self.config['neo4j_database']
+                database=self.config['neo4j_database'],
+                config=LoadConfig(use_apoc_iterate=self.config['use_apoc_iterate'])
             )
             
             # 連接 Neo4j
@@ -104,9 +209,11 @@ class ImprovedCloudInfrastructureAnalyzer:
             self.rules_engine = SecurityRulesEngine(self.neo4j_loader.session)
             
             # 初始化分析器
-            self.security_analyzer = SecurityAnalyzer(self.neo4j_loader.driver)
-            self.failure_analyzer = FailureImpactAnalyzer(self.neo4j_loader.driver)
-            self.cost_analyzer = CostOptimizationAnalyzer(self.neo4j_loader.driver)
+            # 分析器共用載入器驅動程式的連線池
+            database = self.config['neo4j_database']
+            self.security_analyzer = SecurityAnalyzer(self.neo4j_loader.driver, database)
+            self.failure_analyzer = FailureImpactAnalyzer(self.neo4j_loader.driver, database)
+            self.cost_analyzer = CostOptimizationAnalyzer(self.neo4j_loader.driver, database)
             
             # 載入擴展模組
             self._load_extensions()
@@ -114,7 +221,7 @@ class ImprovedCloudInfrastructureAnalyzer:
             logger.info("所有組件初始化完成")
             
         except Exception as e:
-            logger.error(f"初始化組件失敗: {e}")
+            logger.error("初始化組件失敗: %s", e)
             raise
     
     def _load_extensions(self):
@@ -142,97 +249,107 @@ class ImprovedCloudInfrastructureAnalyzer:
             logger.info("擴展模組載入完成")
             
         except Exception as e:
-            logger.warning(f"載入擴展模組失敗: {e}")
+            logger.warning("載入擴展模組失敗: %s", e)
     
     def extract_data(self, provider: str = 'aws', region: str = None, 
-                    use_mock: bool = False) -> bool:
-        """擷取雲端資料"""
+                    use_mock: bool = False, max_workers: int = 8,
+                    persist: bool = True) -> bool:
+        """擷取雲端資料（結果或沿用的快取檔案路徑同時保留於 self._last_extracted）"""
+        self._last_extracted = None
         try:
             if use_mock:
                 logger.info("使用模擬資料模式...")
                 return self._extract_mock_data()
             else:
-                logger.info(f"擷取 {provider.upper()} 真實資料...")
-                return self._extract_real_data(provider, region)
+                logger.info("擷取 %s 真實資料...", provider.upper())
+                return self._extract_real_data(provider, region, max_workers, persist)
                 
         except Exception as e:
-            logger.error(f"資料擷取失敗: {e}")
+            logger.error("資料擷取失敗: %s", e)
             return False
     
     def _extract_mock_data(self) -> bool:
         """擷取模擬資料"""
         try:
-            # 檢查是否已有增強版模擬資料
-            mock_data_path = f"{self.config['data_dir']}/raw/enhanced_mock_aws_resources.json"
-            if os.path.exists(mock_data_path):
-                logger.info(f"找到現有增強版模擬資料: {mock_data_path}")
+            from scripts.create_mock_data import EnhancedMockAWSDataGenerator
+            
+            generator = EnhancedMockAWSDataGenerator()
+            config_hash = hashlib.blake2b(
+                json.dumps(generator.get_config(), sort_keys=True).encode(), digest_size=8
+            ).hexdigest()
+            
+            # 檢查是否已有以相同生成設定產生的增強版模擬資料
+            mock_data_path = self.raw_data_dir / 'enhanced_mock_aws_resources.json'
+            meta_path = mock_data_path.with_name(mock_data_path.name + '.meta')
+            if mock_data_path.exists() and meta_path.exists() \
+                    and meta_path.read_text().strip() == config_hash:
+                logger.info("找到現有增強版模擬資料: %s", mock_data_path)
+                self._last_extracted = mock_data_path
                 return True
             
             # 生成增強版模擬資料
             logger.info("生成增強版模擬資料...")
-            from scripts.create_mock_data import EnhancedMockAWSDataGenerator
-            
-            generator = EnhancedMockAWSDataGenerator()
             dataset = generator.generate_complete_dataset()
             
-            # 儲存模擬資料
-            os.makedirs(os.path.dirname(mock_data_path), exist_ok=True)
-            import json
-            with open(mock_data_path, 'w', encoding='utf-8') as f:
-                json.dump(dataset, f, indent=2, ensure_ascii=False)
+            # 儲存模擬資料與生成設定雜湊
+            _dump_json(dataset, mock_data_path, pretty=False)
+            meta_path.write_text(config_hash)
+            self._last_extracted = dataset
             
-            logger.info(f"模擬資料已生成: {mock_data_path}")
+            logger.info("模擬資料已生成: %s", mock_data_path)
             return True
             
         except Exception as e:
-            logger.error(f"生成模擬資料失敗: {e}")
+            logger.error("生成模擬資料失敗: %s", e)
             return False
     
-    def _extract_real_data(self, provider: str, region: str) -> bool:
+    def _extract_real_data(self, provider: str, region: str, max_workers: int = 8,
+                           persist: bool = True) -> bool:
         """擷取真實資料"""
         try:
             if provider.lower() == 'aws':
-                if not AWS_AVAILABLE:
+                # 動態導入 AWS 提取器（如果可用）
+                try:
+                    from src.extractors.aws_extractor import AWSExtractor
+                except ImportError:
                     logger.error("AWS 提取器不可用，請安裝 boto3: pip install boto3")
                     return False
                 
                 # 使用真實 AWS 提取器
-                extractor = AWSExtractor(region or self.config['aws_region'])
+                extractor = AWSExtractor(region or self.config['aws_region'], max_workers=max_workers)
                 resources = extractor.extract_all_resources()
+                self._last_extracted = resources
                 
                 # 儲存到檔案
-                output_path = f"data/raw/real_aws_resources_{region or self.config['aws_region']}_{int(time.time())}.json"
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                
-                import json
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(resources, f, indent=2, ensure_ascii=False)
-                
-                logger.info(f"真實 AWS 資料已儲存至: {output_path}")
+                if persist:
+                    output_path = self.raw_data_dir / f"real_aws_resources_{region or self.config['aws_region']}_{self._next_output_suffix()}.json"
+                    _dump_json(resources, output_path, pretty=False)
+                    logger.info("真實 AWS 資料已儲存至: %s", output_path)
                 return True
             else:
-                logger.error(f"不支援的雲端提供商: {provider}")
+                logger.error("不支援的雲端提供商: %s", provider)
                 return False
             
         except Exception as e:
-            logger.error(f"擷取真實資料失敗: {e}")
+            logger.error("擷取真實資料失敗: %s", e)
             return False
     
-    def load_to_neo4j(self, data_path: str = None) -> bool:
-        """載入資料到 Neo4j"""
+    def load_to_neo4j(self, data_path: str = None, data: Dict[str, Any] = None) -> bool:
+        """載入資料到 Neo4j（提供 data 時直接載入記憶體中的資料）"""
         try:
             if not self.neo4j_loader:
                 logger.error("Neo4j 載入器未初始化")
                 return False
             
             # 確定資料路徑
-            if not data_path:
+            if data is None and not data_path:
                 # 尋找最新的資料檔案
-                data_dir = f"{self.config['data_dir']}/raw"
-                if os.path.exists(data_dir):
-                    files = [f for f in os.listdir(data_dir) if f.endswith('.json')]
-                    if files:
-                        data_path = os.path.join(data_dir, sorted(files)[-1])
+                data_dir = self.raw_data_dir
+                if data_dir.exists():
+                    entries = [e for e in os.scandir(data_dir) if e.name.endswith('.json')]
+                    if entries:
+                        # 以修改時間選出最新檔案（單次掃描）
+                        data_path = max(entries, key=lambda e: e.stat().st_mtime).path
                     else:
                         logger.error("未找到資料檔案")
                         return False
@@ -241,9 +358,8 @@ class ImprovedCloudInfrastructureAnalyzer:
                     return False
             
             # 載入資料
-            import json
-            with open(data_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if data is None:
+                data = _load_json(data_path)
             
             # 使用改進的載入器
             success = self.neo4j_loader.load_aws_data(
@@ -253,14 +369,20 @@ class ImprovedCloudInfrastructureAnalyzer:
             )
             
             if success:
-                # 獲取統計資訊
+                # 資料已變更，捨棄分析器暫存的查詢結果
+                for analyzer in (self.security_analyzer, self.failure_analyzer, self.cost_analyzer):
+                    if analyzer:
+                        analyzer.refresh()
+            
+            if success and logger.isEnabledFor(logging.INFO):
+                # 統計資訊需要額外查詢資料庫，只在會輸出時才取得
                 stats = self.neo4j_loader.get_statistics()
-                logger.info(f"資料載入完成，統計資訊: {stats}")
+                logger.info("資料載入完成，統計資訊: %s", stats)
             
             return success
             
         except Exception as e:
-            logger.error(f"載入資料到 Neo4j 失敗: {e}")
+            logger.error("載入資料到 Neo4j 失敗: %s", e)
             return False
     
     def run_analysis(self, rule_ids: list = None) -> Optional[Dict[str, Any]]:
@@ -278,45 +400,27 @@ class ImprovedCloudInfrastructureAnalyzer:
             # 獲取摘要
             summary = self.rules_engine.get_summary(findings)
             
-            # 儲存結果
-            output_path = f"{self.config['output_dir']}/analysis_results_{int(time.time())}.json"
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            import json
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'summary': summary,
-                    'findings': [
-                        {
-                            'rule_id': finding.rule_id,
-                            'rule_name': finding.rule_name,
-                            'severity': finding.severity.value,
-                            'description': finding.description,
-                            'affected_resources': finding.affected_resources,
-                            'recommendation': finding.recommendation,
-                            'metadata': finding.metadata
-                        }
-                        for finding in findings
-                    ]
-                }, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"安全分析完成，結果儲存至: {output_path}")
-            logger.info(f"分析摘要: {summary}")
+            # 儲存結果：第一行為摘要，之後每行一筆發現
+            output_path = self.output_dir / f"analysis_results_{self._next_output_suffix()}.ndjson"
+            _dump_ndjson(itertools.chain(({'summary': summary},), findings), output_path)
+            
+            logger.info("安全分析完成，結果儲存至: %s", output_path)
+            logger.info("分析摘要: %s", summary)
             
             return {
                 'summary': summary,
                 'findings': findings,
-                'output_path': output_path
+                'output_path': str(output_path)
             }
             
         except Exception as e:
-            logger.error(f"執行安全分析失敗: {e}")
+            logger.error("執行安全分析失敗: %s", e)
             return None
     
     def run_advanced_analysis(self, analysis_type: str = 'security') -> Dict[str, Any]:
         """執行進階分析（基於 Cartography 架構）"""
         try:
-            logger.info(f"開始執行進階 {analysis_type} 分析")
+            logger.info("開始執行進階 %s 分析", analysis_type)
             
             if not self.neo4j_loader:
                 logger.error("Neo4j 載入器未初始化")
@@ -326,22 +430,18 @@ class ImprovedCloudInfrastructureAnalyzer:
             findings = self.neo4j_loader.run_analysis_advanced(analysis_type)
             
             # 儲存結果
-            output_path = f"{self.config['output_dir']}/advanced_analysis_{analysis_type}_{int(time.time())}.json"
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            import json
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'analysis_type': analysis_type,
-                    'findings': findings,
-                    'timestamp': time.time()
-                }, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"進階分析完成，結果儲存至: {output_path}")
-            return {'findings': findings, 'output_path': output_path}
+            output_path = self.output_dir / f"advanced_analysis_{analysis_type}_{self._next_output_suffix()}.json"
+            _dump_json({
+                'analysis_type': analysis_type,
+                'findings': findings,
+                'timestamp': time.time()
+            }, output_path)
+            
+            logger.info("進階分析完成，結果儲存至: %s", output_path)
+            return {'findings': findings, 'output_path': str(output_path)}
                 
         except Exception as e:
-            logger.error(f"進階分析執行失敗: {e}")
+            logger.error("進階分析執行失敗: %s", e)
             return {}
     
     def run_comprehensive_analysis(self) -> Dict[str, Any]:
@@ -353,67 +453,64 @@ class ImprovedCloudInfrastructureAnalyzer:
                 logger.error("分析器未完全初始化")
                 return {}
             
-            results = {}
-            
-            # 1. 資安漏洞分析
-            logger.info("執行資安漏洞分析...")
-            security_summary = self.security_analyzer.get_security_summary()
-            exposed_services = self.security_analyzer.find_exposed_services()
-            permissive_rules = self.security_analyzer.find_overly_permissive_rules()
-            unencrypted_resources = self.security_analyzer.find_unencrypted_resources()
-            
-            results['security'] = {
-                'summary': security_summary,
-                'exposed_services': exposed_services,
-                'permissive_rules': permissive_rules,
-                'unencrypted_resources': unencrypted_resources
-            }
-            
-            # 2. 故障衝擊分析
-            logger.info("執行故障衝擊分析...")
-            failure_summary = self.failure_analyzer.get_failure_impact_summary()
-            critical_nodes = self.failure_analyzer.identify_critical_nodes()
-            single_points = self.failure_analyzer.find_single_points_of_failure()
-            
-            results['failure_impact'] = {
-                'summary': failure_summary,
-                'critical_nodes': critical_nodes,
-                'single_points_of_failure': single_points
+            # 各項清單以單一 Cypher 查詢（一次往返）取得，摘要與建議仍由各分析器產生；
+            # 兩者彼此獨立，以執行緒池並行執行以重疊 Neo4j 往返時間
+            tasks = {
+                'lists': partial(self.neo4j_loader.run_comprehensive_cypher,
+                                 node_limit=COMPREHENSIVE_NODE_LIMIT),
+                'security_summary': self.security_analyzer.get_security_summary,
+                'failure_summary': self.failure_analyzer.get_failure_impact_summary,
+                'cost_summary': self.cost_analyzer.get_cost_summary,
             }
             
-            # 3. 成本優化分析
-            logger.info("執行成本優化分析...")
-            cost_summary = self.cost_analyzer.get_cost_summary()
-            orphaned_volumes = self.cost_analyzer.find_orphaned_ebs_volumes()
-            unused_sgs = self.cost_analyzer.find_unused_security_groups()
-            stopped_instances = self.cost_analyzer.find_stopped_instances()
-            recommendations = self.cost_analyzer.get_cost_optimization_recommendations()
-            
-            results['cost_optimization'] = {
-                'summary': cost_summary,
-                'orphaned_volumes': orphaned_volumes,
-                'unused_security_groups': unused_sgs,
-                'stopped_instances': stopped_instances,
-                'recommendations': recommendations
+            logger.info("並行執行資安、故障衝擊與成本優化分析...")
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = {name: executor.submit(func) for name, func in tasks.items()}
+                outputs = {name: future.result() for name, future in futures.items()}
+            lists = outputs['lists']
+            
+            results = {
+                # 1. 資安漏洞分析
+                'security': {
+                    'summary': outputs['security_summary'],
+                    'exposed_services': lists['exposed_services'],
+                    'permissive_rules': lists['permissive_rules'],
+                    'unencrypted_resources': lists['unencrypted_resources']
+                },
+                # 2. 故障衝擊分析（清單超過 COMPREHENSIVE_NODE_LIMIT 筆時截斷）
+                'failure_impact': {
+                    'summary': outputs['failure_summary'],
+                    'critical_nodes': lists['critical_nodes'],
+                    'critical_nodes_total': lists['critical_nodes_total'],
+                    'critical_nodes_truncated': lists['critical_nodes_truncated'],
+                    'single_points_of_failure': lists['single_points_of_failure'],
+                    'single_points_of_failure_total': lists['single_points_of_failure_total'],
+                    'single_points_of_failure_truncated': lists['single_points_of_failure_truncated']
+                },
+                # 3. 成本優化分析
+                'cost_optimization': {
+                    'summary': outputs['cost_summary'],
+                    'orphaned_volumes': lists['orphaned_volumes'],
+                    'unused_security_groups': lists['unused_security_groups'],
+                    'stopped_instances': lists['stopped_instances'],
+                    # 成本摘要已包含優化建議，不必再查詢一次
+                    'recommendations': outputs['cost_summary'].get('recommendations', [])
+                }
             }
             
             # 儲存綜合分析結果
-            output_path = f"{self.config['output_dir']}/comprehensive_analysis_{int(time.time())}.json"
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            
-            import json
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump({
-                    'analysis_type': 'comprehensive',
-                    'results': results,
-                    'timestamp': time.time()
-                }, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"綜合分析完成，結果儲存至: {output_path}")
-            return {'results': results, 'output_path': output_path}
+            output_path = self.output_dir / f"comprehensive_analysis_{self._next_output_suffix()}.json"
+            _dump_json({
+                'analysis_type': 'comprehensive',
+                'results': results,
+                'timestamp': time.time()
+            }, output_path)
+            
+            logger.info("綜合分析完成，結果儲存至: %s", output_path)
+            return {'results': results, 'output_path': str(output_path)}
                 
         except Exception as e:
-            logger.error(f"綜合分析執行失敗: {e}")
+            logger.error("綜合分析執行失敗: %s", e)
             return {}
     
     def start_dashboard(self, host: str = '127.0.0.1', port: int = 8050):
@@ -430,7 +527,7 @@ class ImprovedCloudInfrastructureAnalyzer:
                 logger.error("儀表板視覺化器初始化失敗")
                 return False
             
-            logger.info(f"啟動儀表板: http://{host}:{port}")
+            logger.info("啟動儀表板: http://%s:%s", host, port)
             
             # 創建視覺化
             dashboard = visualizer.create_visualization({})
@@ -444,21 +541,26 @@ class ImprovedCloudInfrastructureAnalyzer:
             return True
             
         except Exception as e:
-            logger.error(f"啟動儀表板失敗: {e}")
+            logger.error("啟動儀表板失敗: %s", e)
             return False
     
     def run_full_pipeline(self, provider: str = 'aws', region: str = None, 
-                         use_mock: bool = False) -> bool:
+                         use_mock: bool = False, persist_raw: bool = False) -> bool:
         """執行完整分析流程"""
         try:
             logger.info("開始執行完整分析流程...")
             
-            # 1. 擷取資料
-            if not self.extract_data(provider, region, use_mock):
+            # 1. 擷取資料（真實資料僅在 persist_raw 時寫入磁碟）
+            if not self.extract_data(provider, region, use_mock, persist=persist_raw):
                 return False
             
-            # 2. 載入到 Neo4j
-            if not self.load_to_neo4j():
+            # 2. 載入到 Neo4j（直接使用記憶體中的資料；沿用快取時載入該檔案）
+            extracted = self._last_extracted
+            if isinstance(extracted, Path):
+                loaded = self.load_to_neo4j(data_path=extracted)
+            else:
+                loaded = self.load_to_neo4j(data=extracted)
+            if not loaded:
                 return False
             
             # 3. 執行分析
@@ -473,7 +575,7 @@ class ImprovedCloudInfrastructureAnalyzer:
             return True
             
         except Exception as e:
-            logger.error(f"執行完整流程失敗: {e}")
+            logger.error("執行完整流程失敗: %s", e)
             return False
     
     def cleanup(self):
@@ -485,14 +587,33 @@ class ImprovedCloudInfrastructureAnalyzer:
             logger.info("資源清理完成")
             
         except Exception as e:
-            logger.error(f"資源清理失敗: {e}")
+            logger.error("資源清理失敗: %s", e)
+
+
+def _run_dashboard_mode(args: argparse.Namespace, analyzer: ImprovedCloudInfrastructureAnalyzer) -> bool:
+    """啟動儀表板（服務結束即視為成功）"""
+    analyzer.start_dashboard(args.host, args.port)
+    return True
+
+
+# 執行模式分派表：模式名稱 -> (args, analyzer) -> 是否成功
+MODES: Dict[str, Callable[[argparse.Namespace, ImprovedCloudInfrastructureAnalyzer], bool]] = {
+    'extract': lambda args, analyzer: analyzer.extract_data(
+        args.provider, args.region, use_mock=args.mock, max_workers=args.max_workers),
+    'load': lambda args, analyzer: analyzer.load_to_neo4j(args.data_path),
+    'analyze': lambda args, analyzer: analyzer.run_analysis(args.rules) is not None,
+    'advanced-analyze': lambda args, analyzer: bool(analyzer.run_advanced_analysis(args.analysis_type)),
+    'comprehensive-analyze': lambda args, analyzer: bool(analyzer.run_comprehensive_analysis()),
+    'dashboard': _run_dashboard_mode,
+    'full': lambda args, analyzer: analyzer.run_full_pipeline(
+        args.provider, args.region, use_mock=args.mock, persist_raw=args.persist_raw),
+}
 
 
 def main():
     """主程式入口"""
     parser = argparse.ArgumentParser(description='改進的雲端基礎設施視覺化分析平台')
-    parser.add_argument('--mode', choices=['extract', 'load', 'analyze', 'advanced-analyze', 'comprehensive-analyze', 'dashboard', 'full'],
-                       default='full', help='執行模式')
+    parser.add_argument('--mode', choices=MODES, default='full', help='執行模式')
     parser.add_argument('--provider', default='aws', help='雲端提供商 (aws, gcp, azure)')
     parser.add_argument('--region', default='us-east-1', help='雲端區域')
     parser.add_argument('--data-path', help='資料檔案路徑')
@@ -501,6 +622,8 @@ def main():
     parser.add_argument('--config', default='.env', help='設定檔路徑')
     parser.add_argument('--mock', action='store_true', default=True, help='使用模擬資料（免費測試）')
     parser.add_argument('--rules', nargs='*', help='指定要執行的安全規則')
+    parser.add_argument('--max-workers', type=int, default=8, help='AWS 資料提取並行執行緒數')
+    parser.add_argument('--persist-raw', action='store_true', help='完整流程中將擷取的原始資料寫入磁碟')
     parser.add_argument('--analysis-type', choices=['security', 'cost'], default='security', 
                        help='進階分析類型')
     
@@ -510,26 +633,8 @@ def main():
     analyzer = ImprovedCloudInfrastructureAnalyzer(args.config)
     
     try:
-        if args.mode == 'extract':
-            success = analyzer.extract_data(args.provider, args.region, use_mock=args.mock)
-        elif args.mode == 'load':
-            success = analyzer.load_to_neo4j(args.data_path)
-        elif args.mode == 'analyze':
-            success = analyzer.run_analysis(args.rules) is not None
-        elif args.mode == 'advanced-analyze':
-            result = analyzer.run_advanced_analysis(args.analysis_type)
-            success = bool(result)
-        elif args.mode == 'comprehensive-analyze':
-            result = analyzer.run_comprehensive_analysis()
-            success = bool(result)
-        elif args.mode == 'dashboard':
-            analyzer.start_dashboard(args.host, args.port)
-            success = True
-        elif args.mode == 'full':
-            success = analyzer.run_full_pipeline(args.provider, args.region, use_mock=args.mock)
-        else:
-            logger.error(f"未知的執行模式: {args.mode}")
-            success = False
+        # argparse 的 choices 已確保模式有效
+        success = MODES[args.mode](args, analyzer)
         
         if success:
             logger.info("執行成功")
@@ -540,7 +645,7 @@ def main():
     except KeyboardInterrupt:
         logger.info("使用者中斷執行")
     except Exception as e:
-        logger.error(f"執行失敗: {e}")
+        logger.error("執行失敗: %s", e)
         sys.exit(1)
     finally:
         analyzer.cleanup()
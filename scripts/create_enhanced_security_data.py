@@ -5,22 +5,167 @@
 生成包含多種安全問題的測試資料，修正資料載入問題。
 """
 
+import argparse
 import json
 import random
-import secrets
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from functools import partial
+from typing import List, Dict, Any, BinaryIO, Iterable, Iterator, Optional, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+@dataclass
+class SecurityRuleRecord:
+    """生成過程中的安全規則紀錄，寫出 JSON 時才轉為 AWS 格式的字典"""
+    __slots__ = ('rule_id', 'group_id', 'protocol', 'port_range', 'source_cidr', 'description')
+    
+    rule_id: str
+    group_id: str
+    protocol: str
+    port_range: str
+    source_cidr: str
+    description: str
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'RuleId': self.rule_id,
+            'GroupId': self.group_id,
+            'Protocol': self.protocol,
+            'PortRange': self.port_range,
+            'SourceCIDR': self.source_cidr,
+            'Direction': 'inbound',
+            'Action': 'allow',
+            'Description': self.description
+        }
+
+
+@dataclass
+class EBSVolumeRecord:
+    """
+    生成過程中的 EBS 磁碟紀錄
+    
+    磁碟欄位固定，串流寫出時直接套用 JSON 範本，不經過字典與通用編碼器。
+    iops、creation_date 為 None 時省略該欄位；instance_id 為 None 表示未附加。
+    """
+    __slots__ = (
+        'volume_id', 'size', 'volume_type', 'state', 'encrypted',
+        'iops', 'creation_date', 'instance_id', 'name'
+    )
+    
+    volume_id: str
+    size: int
+    volume_type: str
+    state: str
+    encrypted: bool
+    iops: Optional[int]
+    creation_date: Optional[str]
+    instance_id: Optional[str]
+    name: str
+    
+    def to_dict(self) -> Dict[str, Any]:
+        volume = {
+            'VolumeId': self.volume_id,
+            'Size': self.size,
+            'VolumeType': self.volume_type,
+            'State': self.state,
+            'Encrypted': self.encrypted
+        }
+        if self.iops is not None:
+            volume['Iops'] = self.iops
+        if self.creation_date is not None:
+            volume['CreationDate'] = self.creation_date
+        volume['Attachments'] = [{'InstanceId': self.instance_id}] if self.instance_id else []
+        volume['Tags'] = [{'Key': 'Name', 'Value': self.name}]
+        return volume
+    
+    def to_json(self) -> bytes:
+        # 所有字串欄位皆為 ID、ISO 時間或由其組成的名稱，不含需要跳脫的字元
+        return (
+            '{"VolumeId":"%s","Size":%d,"VolumeType":"%s","State":"%s","Encrypted":%s%s%s,"Attachments":[%s],"Tags":[{"Key":"Name","Value":"%s"}]}' % (
+                self.volume_id,
+                self.size,
+                self.volume_type,
+                self.state,
+                'true' if self.encrypted else 'false',
+                '' if self.iops is None else ',"Iops":%d' % self.iops,
+                '' if self.creation_date is None else ',"CreationDate":"%s"' % self.creation_date,
+                '{"InstanceId":"%s"}' % self.instance_id if self.instance_id else '',
+                self.name
+            )
+        ).encode('ascii')
+
+
+def _json_default(obj: Any) -> Any:
+    """JSON 序列化時處理帶有 to_dict() 的紀錄物件"""
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _encode_json(obj: Any) -> bytes:
+    """將單一物件編碼為 UTF-8 JSON 位元組"""
+    if hasattr(obj, 'to_json'):
+        return obj.to_json()
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+    return json.dumps(obj, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+def _write_json_array(f: BinaryIO, records: Iterable[Any]) -> int:
+    """將紀錄逐筆寫成 JSON 陣列，回傳寫入筆數"""
+    count = 0
+    f.write(b'[')
+    for record in records:
+        if count:
+            f.write(b',\n')
+        f.write(_encode_json(record))
+        count += 1
+    f.write(b']')
+    return count
+
+
+# 在大量紀錄間重複出現的常數子結構只建立一次並共用（使用端只讀取）；
+# 字串常值本身已是程式碼常數，不需額外 sys.intern
+ANY_CIDR = '0.0.0.0/0'
+ANY_CIDR_RANGES = [{'CidrIp': ANY_CIDR}]
+RUNNING_STATE = {'Name': 'running'}
+
+# 每個 VPC 內建立的安全群組：(名稱前綴, 描述, 對 0.0.0.0/0 開放的 TCP 連接埠範圍)
+SECURITY_GROUP_PROFILES = (
+    ('normal', 'Normal security group', (80, 80)),
+    ('overly-permissive', 'Overly permissive security group', (0, 65535)),  # 問題1
+    ('exposed-ssh', 'Security group with exposed SSH', (22, 22)),  # 問題2
+    ('exposed-rdp', 'Security group with exposed RDP', (3389, 3389)),  # 問題3
+    ('unused', 'Unused security group', None),  # 問題4
+    ('unused-2', 'Another unused security group', None),  # 問題5
+)
+
+
+def _init_worker():
+    """重新設定子行程的亂數狀態，fork 出的行程才不會產生重複的值"""
+    random.seed()
 
 
 def _generate_aws_id(prefix: str, length: int = 17) -> str:
-    """產生一個 AWS 格式的十六進位 ID"""
-    return f"{prefix}-{secrets.token_hex(length // 2 + 1)[:length]}"
+    """產生一個 AWS 格式的十六進位 ID（測試資料不需密碼學等級的亂數）"""
+    # 每個十六進位字元對應 4 個亂數位元，補零到固定長度，所有字元位置都是隨機的
+    return f"{prefix}-{random.getrandbits(length * 4):0{length}x}"
 
 
 class EnhancedSecurityDataGenerator:
     """增強版安全測試資料生成器"""
     
-    def __init__(self):
+    def __init__(self, workers: int = 1):
+        # 大於 1 時以多個行程平行生成各 VPC 的資源；資料量小時行程啟動成本反而較高
+        self.workers = workers
         self.regions = ['us-east-1', 'us-west-2', 'eu-west-1']
         self.instance_types = ['t2.micro', 't2.small', 't3.medium', 'm5.large']
         self.states = ['running', 'stopped', 'pending']
@@ -35,27 +180,21 @@ class EnhancedSecurityDataGenerator:
         # 環境
         self.environments = ['prod', 'staging', 'dev', 'test']
         
+        # Environment 標籤在資料集中大量重複，各環境共用同一個標籤物件
+        self.env_tags = {env: {'Key': 'Environment', 'Value': env} for env in self.environments}
+        
     def generate_complete_dataset(self) -> Dict[str, Any]:
         """生成完整的測試資料集"""
         print("生成增強版安全測試資料...")
         
         # 生成基礎設施
-        vpcs = self._generate_vpcs(4)
-        subnets = self._generate_subnets(vpcs, 4)
-        security_groups = self._generate_security_groups(vpcs)
-        instances = self._generate_ec2_instances(subnets, security_groups)
-        volumes = self._generate_ebs_volumes(instances)
-        security_rules = self._generate_security_rules(security_groups)
+        vpcs, subnets, security_groups, rules, instances = self._generate_infrastructure(4, 4)
+        volumes = [volume.to_dict() for volume in self._generate_ebs_volumes(instances)]
+        security_rules = [rule.to_dict() for rule in rules]
         
         # 按照系統期望的格式組織資料
         dataset = {
-            'metadata': {
-                'extraction_time': datetime.now().isoformat(),
-                'account_id': '123456789012',
-                'data_type': 'enhanced_security_test_data',
-                'version': '2.0',
-                'description': 'Enhanced security test data with multiple vulnerabilities'
-            },
+            'metadata': self._build_metadata(),
             'vpcs': {'Vpcs': vpcs},
             'subnets': {'Subnets': subnets},
             'security_groups': {'SecurityGroups': security_groups},
@@ -64,321 +203,345 @@ class EnhancedSecurityDataGenerator:
             'ebs_volumes': {'Volumes': volumes}
         }
         
-        print(f"生成完成：{len(vpcs)} VPCs, {len(subnets)} Subnets, {len(security_groups)} Security Groups, {len(instances)} Instances, {len(volumes)} Volumes, {len(security_rules)} Security Rules")
+        self._print_summary(len(vpcs), len(subnets), len(security_groups), len(instances), len(volumes), len(security_rules))
         return dataset
     
+    def write_complete_dataset(self, output_file: str) -> None:
+        """
+        生成資料集並逐筆串流寫入 JSON 檔案
+        
+        VPC、子網路、安全群組與實例會被其他資源參照，仍需先建立清單；
+        EBS 磁碟則由產生器逐筆輸出，不會整份留在記憶體中。
+        """
+        print("生成增強版安全測試資料...")
+        
+        vpcs, subnets, security_groups, security_rules, instances = self._generate_infrastructure(4, 4)
+        
+        with open(output_file, 'wb', buffering=1 << 20) as f:
+            f.write(b'{"metadata":')
+            f.write(_encode_json(self._build_metadata()))
+            f.write(b',\n"vpcs":{"Vpcs":')
+            _write_json_array(f, vpcs)
+            f.write(b'},\n"subnets":{"Subnets":')
+            _write_json_array(f, subnets)
+            f.write(b'},\n"security_groups":{"SecurityGroups":')
+            _write_json_array(f, security_groups)
+            f.write(b'},\n"security_rules":{"Rules":')
+            _write_json_array(f, security_rules)
+            f.write(b'},\n"ec2_instances":{"Reservations":[{"Instances":')
+            _write_json_array(f, instances)
+            f.write(b'}]},\n"ebs_volumes":{"Volumes":')
+            volume_count = _write_json_array(f, self._generate_ebs_volumes(instances))
+            f.write(b'}}\n')
+        
+        self._print_summary(len(vpcs), len(subnets), len(security_groups), len(instances), volume_count, len(security_rules))
+    
+    def _generate_infrastructure(self, vpc_count: int, subnets_per_vpc: int) -> Tuple[List[Dict], List[Dict], List[Dict], List[SecurityRuleRecord], List[Dict]]:
+        """
+        生成 VPC 及各 VPC 內的子網路、安全群組、安全規則與實例
+        
+        各 VPC 之間沒有相依性，workers 大於 1 時分散到多個行程生成後依序合併。
+        """
+        vpcs = self._generate_vpcs(vpc_count)
+        partition = partial(self._generate_vpc_partition, subnets_per_vpc=subnets_per_vpc)
+        
+        if self.workers > 1 and len(vpcs) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(vpcs)), initializer=_init_worker) as executor:
+                parts = list(executor.map(partition, range(len(vpcs)), vpcs))
+        else:
+            parts = [partition(vpc_idx, vpc) for vpc_idx, vpc in enumerate(vpcs)]
+        
+        subnets, security_groups, security_rules, instances = [], [], [], []
+        for part_subnets, part_sgs, part_rules, part_instances in parts:
+            subnets.extend(part_subnets)
+            security_groups.extend(part_sgs)
+            security_rules.extend(part_rules)
+            instances.extend(part_instances)
+        return vpcs, subnets, security_groups, security_rules, instances
+    
+    def _generate_vpc_partition(self, vpc_idx: int, vpc: Dict, subnets_per_vpc: int) -> Tuple[List[Dict], List[Dict], List[SecurityRuleRecord], List[Dict]]:
+        """生成單一 VPC 內的子網路、安全群組、安全規則與實例"""
+        subnets = self._generate_subnets([vpc], subnets_per_vpc, vpc_offset=vpc_idx)
+        security_groups, security_rules = self._generate_security_groups([vpc])
+        instances = self._generate_ec2_instances(subnets, security_groups, subnet_offset=vpc_idx * subnets_per_vpc)
+        return subnets, security_groups, security_rules, instances
+    
+    def _build_metadata(self) -> Dict[str, Any]:
+        """建立資料集的中繼資料"""
+        return {
+            'extraction_time': datetime.now().isoformat(),
+            'account_id': '123456789012',
+            'data_type': 'enhanced_security_test_data',
+            'version': '2.0',
+            'description': 'Enhanced security test data with multiple vulnerabilities'
+        }
+    
+    def _print_summary(self, vpc_count: int, subnet_count: int, sg_count: int,
+                       instance_count: int, volume_count: int, rule_count: int) -> None:
+        """輸出生成結果統計"""
+        print(f"生成完成：{vpc_count} VPCs, {subnet_count} Subnets, {sg_count} Security Groups, {instance_count} Instances, {volume_count} Volumes, {rule_count} Security Rules")
+    
     def _generate_vpcs(self, count: int = 4) -> List[Dict]:
         """生成 VPC"""
-        vpcs = []
-        for i in range(count):
-            vpc_id = _generate_aws_id('vpc')
-            vpc = {
-                'VpcId': vpc_id,
-                'CidrBlock': f'10.{i}.0.0/16',
-                'State': 'available',
-                'IsDefault': i == 0,
-                'Tags': [
-                    {'Key': 'Name', 'Value': f'vpc-{self.environments[i % len(self.environments)]}-{i+1}'},
-                    {'Key': 'Environment', 'Value': self.environments[i % len(self.environments)]}
-                ]
-            }
-            vpcs.append(vpc)
-        return vpcs
+        return [self._build_vpc(i) for i in range(count)]
     
-    def _generate_subnets(self, vpcs: List[Dict], count_per_vpc: int = 4) -> List[Dict]:
+    def _build_vpc(self, i: int) -> Dict:
+        """建立第 i 個 VPC"""
+        environment = self.environments[i % len(self.environments)]
+        return {
+            'VpcId': _generate_aws_id('vpc'),
+            'CidrBlock': f'10.{i}.0.0/16',
+            'State': 'available',
+            'IsDefault': i == 0,
+            'Tags': [
+                {'Key': 'Name', 'Value': f'vpc-{environment}-{i+1}'},
+                self.env_tags[environment]
+            ]
+        }
+    
+    def _generate_subnets(self, vpcs: List[Dict], count_per_vpc: int = 4, vpc_offset: int = 0) -> List[Dict]:
         """生成子網路"""
-        subnets = []
-        for vpc in vpcs:
-            for i in range(count_per_vpc):
-                subnet_id = _generate_aws_id('subnet')
-                subnet = {
-                    'SubnetId': subnet_id,
-                    'VpcId': vpc['VpcId'],
-                    'CidrBlock': f'10.{vpcs.index(vpc)}.{i}.0/24',
-                    'AvailabilityZone': f'{self.regions[0]}{chr(97+i)}',
-                    'State': 'available',
-                    'Tags': [
-                        {'Key': 'Name', 'Value': f'subnet-{vpc["Tags"][0]["Value"]}-{i+1}'},
-                        {'Key': 'Environment', 'Value': vpc['Tags'][1]['Value']}
-                    ]
-                }
-                subnets.append(subnet)
-        return subnets
+        return [
+            self._build_subnet(vpc_idx, vpc, i)
+            for vpc_idx, vpc in enumerate(vpcs, vpc_offset)
+            for i in range(count_per_vpc)
+        ]
     
-    def _generate_security_groups(self, vpcs: List[Dict]) -> List[Dict]:
-        """生成安全群組，包含多種安全問題"""
+    def _build_subnet(self, vpc_idx: int, vpc: Dict, i: int) -> Dict:
+        """建立 VPC 內的第 i 個子網路"""
+        name_tag, env_tag = vpc['Tags']
+        return {
+            'SubnetId': _generate_aws_id('subnet'),
+            'VpcId': vpc['VpcId'],
+            'CidrBlock': f'10.{vpc_idx}.{i}.0/24',
+            'AvailabilityZone': f'{self.regions[0]}{chr(97+i)}',
+            'State': 'available',
+            'Tags': [
+                {'Key': 'Name', 'Value': f"subnet-{name_tag['Value']}-{i+1}"},
+                env_tag
+            ]
+        }
+    
+    def _generate_security_groups(self, vpcs: List[Dict]) -> Tuple[List[Dict], List[SecurityRuleRecord]]:
+        """生成安全群組，包含多種安全問題；每個 IpPermissions 項目同時產生對應的安全規則"""
         security_groups = []
+        security_rules = []
         
         for vpc in vpcs:
-            # 正常的安全群組
-            normal_sg = {
-                'GroupId': _generate_aws_id('sg'),
-                'GroupName': f'normal-{vpc["Tags"][0]["Value"]}',
-                'Description': 'Normal security group',
-                'VpcId': vpc['VpcId'],
-                'IpPermissions': [
-                    {
-                        'IpProtocol': 'tcp',
-                        'FromPort': 80,
-                        'ToPort': 80,
-                        'IpRanges': [{'CidrIp': '0.0.0.0/0'}]
-                    }
-                ]
-            }
-            security_groups.append(normal_sg)
-            
-            # 過度寬鬆的安全群組 (問題1)
-            overly_permissive_sg = {
-                'GroupId': _generate_aws_id('sg'),
-                'GroupName': f'overly-permissive-{vpc["Tags"][0]["Value"]}',
-                'Description': 'Overly permissive security group',
-                'VpcId': vpc['VpcId'],
-                'IpPermissions': [
-                    {
-                        'IpProtocol': 'tcp',
-                        'FromPort': 0,
-                        'ToPort': 65535,
-                        'IpRanges': [{'CidrIp': '0.0.0.0/0'}]
-                    }
-                ]
-            }
-            security_groups.append(overly_permissive_sg)
-            
-            # 暴露 SSH 的安全群組 (問題2)
-            exposed_ssh_sg = {
-                'GroupId': _generate_aws_id('sg'),
-                'GroupName': f'exposed-ssh-{vpc["Tags"][0]["Value"]}',
-                'Description': 'Security group with exposed SSH',
-                'VpcId': vpc['VpcId'],
-                'IpPermissions': [
-                    {
-                        'IpProtocol': 'tcp',
-                        'FromPort': 22,
-                        'ToPort': 22,
-                        'IpRanges': [{'CidrIp': '0.0.0.0/0'}]
-                    }
-                ]
-            }
-            security_groups.append(exposed_ssh_sg)
-            
-            # 暴露 RDP 的安全群組 (問題3)
-            exposed_rdp_sg = {
-                'GroupId': _generate_aws_id('sg'),
-                'GroupName': f'exposed-rdp-{vpc["Tags"][0]["Value"]}',
-                'Description': 'Security group with exposed RDP',
-                'VpcId': vpc['VpcId'],
-                'IpPermissions': [
-                    {
+            vpc_name = vpc['Tags'][0]['Value']
+            for name_prefix, description, ports in SECURITY_GROUP_PROFILES:
+                group_id = _generate_aws_id('sg')
+                group_name = f'{name_prefix}-{vpc_name}'
+                permissions = []
+                
+                if ports:
+                    from_port, to_port = ports
+                    permissions.append({
                         'IpProtocol': 'tcp',
-                        'FromPort': 3389,
-                        'ToPort': 3389,
-                        'IpRanges': [{'CidrIp': '0.0.0.0/0'}]
-                    }
-                ]
-            }
-            security_groups.append(exposed_rdp_sg)
-            
-            # 未使用的安全群組 (問題4)
-            unused_sg = {
-                'GroupId': _generate_aws_id('sg'),
-                'GroupName': f'unused-{vpc["Tags"][0]["Value"]}',
-                'Description': 'Unused security group',
-                'VpcId': vpc['VpcId'],
-                'IpPermissions': []
-            }
-            security_groups.append(unused_sg)
-            
-            # 額外的未使用安全群組 (問題5)
-            unused_sg2 = {
-                'GroupId': _generate_aws_id('sg'),
-                'GroupName': f'unused-2-{vpc["Tags"][0]["Value"]}',
-                'Description': 'Another unused security group',
-                'VpcId': vpc['VpcId'],
-                'IpPermissions': []
-            }
-            security_groups.append(unused_sg2)
+                        'FromPort': from_port,
+                        'ToPort': to_port,
+                        'IpRanges': ANY_CIDR_RANGES
+                    })
+                    security_rules.append(SecurityRuleRecord(
+                        rule_id=_generate_aws_id('rule'),
+                        group_id=group_id,
+                        protocol='tcp',
+                        port_range=f'{from_port}-{to_port}',
+                        source_cidr=ANY_CIDR,
+                        description=f'Rule for {group_name}'
+                    ))
+                
+                security_groups.append({
+                    'GroupId': group_id,
+                    'GroupName': group_name,
+                    'Description': description,
+                    'VpcId': vpc['VpcId'],
+                    'IpPermissions': permissions
+                })
         
-        return security_groups
+        return security_groups, security_rules
     
-    def _generate_ec2_instances(self, subnets: List[Dict], security_groups: List[Dict]) -> List[Dict]:
+    def _generate_ec2_instances(self, subnets: List[Dict], security_groups: List[Dict], subnet_offset: int = 0) -> List[Dict]:
         """生成 EC2 實例，包含多種安全問題"""
         instances = []
         
-        for i, subnet in enumerate(subnets):
+        # 先依 (VPC, 群組類型) 建立索引，避免每個子網路都重新掃描全部安全群組
+        sg_index: Dict[tuple, List[Dict]] = {}
+        for sg in security_groups:
+            for role in ('normal', 'exposed-ssh', 'exposed-rdp', 'overly-permissive'):
+                if role in sg['GroupName']:
+                    sg_index.setdefault((sg['VpcId'], role), []).append(sg)
+        
+        # 每個子網路最多產生四台實例，先一次批次抽取所需的隨機值，迴圈內依序取用
+        max_instances = 4 * len(subnets)
+        octets = iter(random.choices(range(1, 256), k=3 * max_instances))
+        public_ips = (f'54.{a}.{b}.{c}' for a, b, c in zip(octets, octets, octets))
+        private_hosts = iter(random.choices(range(10, 251), k=max_instances))
+        instance_types = iter(random.choices(self.instance_types, k=max_instances))
+        
+        for i, subnet in enumerate(subnets, subnet_offset):
+            # 各分支共用的子網路欄位只取一次
+            _, oct1, oct2, _ = subnet['CidrBlock'].split('.')
+            private_prefix = f'10.{oct1}.{oct2}.'
+            subnet_id = subnet['SubnetId']
+            vpc_id = subnet['VpcId']
+            env_tag = subnet['Tags'][1]
+            
             # 正常實例
             if i % 3 == 0:
-                instance = {
-                    'InstanceId': _generate_aws_id('i'),
-                    'InstanceType': random.choice(self.instance_types),
-                    'State': {'Name': 'running'},
-                    'PublicIpAddress': f'54.{random.randint(1,255)}.{random.randint(1,255)}.{random.randint(1,255)}',
-                    'PrivateIpAddress': f'10.{subnet["CidrBlock"].split(".")[1]}.{subnet["CidrBlock"].split(".")[2]}.{random.randint(10,250)}',
-                    'SubnetId': subnet['SubnetId'],
-                    'VpcId': subnet['VpcId'],
-                    'SecurityGroups': [random.choice([sg for sg in security_groups if sg['VpcId'] == subnet['VpcId'] and 'normal' in sg['GroupName']])],
-                    'Tags': [
-                        {'Key': 'Name', 'Value': f'{random.choice(self.app_services)}-{i+1}'},
-                        {'Key': 'Environment', 'Value': subnet['Tags'][1]['Value']}
-                    ]
-                }
-                instances.append(instance)
+                instances.append(self._build_instance(
+                    name=f'{random.choice(self.app_services)}-{i+1}',
+                    instance_type=next(instance_types),
+                    public_ip=next(public_ips),
+                    private_ip=f'{private_prefix}{next(private_hosts)}',
+                    subnet_id=subnet_id,
+                    vpc_id=vpc_id,
+                    security_groups=[random.choice(sg_index[(vpc_id, 'normal')])],
+                    env_tag=env_tag
+                ))
             
             # 暴露 SSH 的實例
             if i % 4 == 0:
-                exposed_ssh_instance = {
-                    'InstanceId': _generate_aws_id('i'),
-                    'InstanceType': random.choice(self.instance_types),
-                    'State': {'Name': 'running'},
-                    'PublicIpAddress': f'54.{random.randint(1,255)}.{random.randint(1,255)}.{random.randint(1,255)}',
-                    'PrivateIpAddress': f'10.{subnet["CidrBlock"].split(".")[1]}.{subnet["CidrBlock"].split(".")[2]}.{random.randint(10,250)}',
-                    'SubnetId': subnet['SubnetId'],
-                    'VpcId': subnet['VpcId'],
-                    'SecurityGroups': [sg for sg in security_groups if 'exposed-ssh' in sg['GroupName'] and sg['VpcId'] == subnet['VpcId']],
-                    'Tags': [
-                        {'Key': 'Name', 'Value': f'ssh-exposed-server-{i+1}'},
-                        {'Key': 'Environment', 'Value': subnet['Tags'][1]['Value']}
-                    ]
-                }
-                instances.append(exposed_ssh_instance)
+                instances.append(self._build_instance(
+                    name=f'ssh-exposed-server-{i+1}',
+                    instance_type=next(instance_types),
+                    public_ip=next(public_ips),
+                    private_ip=f'{private_prefix}{next(private_hosts)}',
+                    subnet_id=subnet_id,
+                    vpc_id=vpc_id,
+                    security_groups=list(sg_index.get((vpc_id, 'exposed-ssh'), [])),
+                    env_tag=env_tag
+                ))
             
             # 暴露 RDP 的實例
             if i % 5 == 0:
-                exposed_rdp_instance = {
-                    'InstanceId': _generate_aws_id('i'),
-                    'InstanceType': random.choice(self.instance_types),
-                    'State': {'Name': 'running'},
-                    'PublicIpAddress': f'54.{random.randint(1,255)}.{random.randint(1,255)}.{random.randint(1,255)}',
-                    'PrivateIpAddress': f'10.{subnet["CidrBlock"].split(".")[1]}.{subnet["CidrBlock"].split(".")[2]}.{random.randint(10,250)}',
-                    'SubnetId': subnet['SubnetId'],
-                    'VpcId': subnet['VpcId'],
-                    'SecurityGroups': [sg for sg in security_groups if 'exposed-rdp' in sg['GroupName'] and sg['VpcId'] == subnet['VpcId']],
-                    'Tags': [
-                        {'Key': 'Name', 'Value': f'rdp-exposed-server-{i+1}'},
-                        {'Key': 'Environment', 'Value': subnet['Tags'][1]['Value']}
-                    ]
-                }
-                instances.append(exposed_rdp_instance)
+                instances.append(self._build_instance(
+                    name=f'rdp-exposed-server-{i+1}',
+                    instance_type=next(instance_types),
+                    public_ip=next(public_ips),
+                    private_ip=f'{private_prefix}{next(private_hosts)}',
+                    subnet_id=subnet_id,
+                    vpc_id=vpc_id,
+                    security_groups=list(sg_index.get((vpc_id, 'exposed-rdp'), [])),
+                    env_tag=env_tag
+                ))
             
             # 過度寬鬆安全群組的實例
             if i % 6 == 0:
-                overly_permissive_instance = {
-                    'InstanceId': _generate_aws_id('i'),
-                    'InstanceType': random.choice(self.instance_types),
-                    'State': {'Name': 'running'},
-                    'PublicIpAddress': f'54.{random.randint(1,255)}.{random.randint(1,255)}.{random.randint(1,255)}',
-                    'PrivateIpAddress': f'10.{subnet["CidrBlock"].split(".")[1]}.{subnet["CidrBlock"].split(".")[2]}.{random.randint(10,250)}',
-                    'SubnetId': subnet['SubnetId'],
-                    'VpcId': subnet['VpcId'],
-                    'SecurityGroups': [sg for sg in security_groups if 'overly-permissive' in sg['GroupName'] and sg['VpcId'] == subnet['VpcId']],
-                    'Tags': [
-                        {'Key': 'Name', 'Value': f'overly-permissive-server-{i+1}'},
-                        {'Key': 'Environment', 'Value': subnet['Tags'][1]['Value']}
-                    ]
-                }
-                instances.append(overly_permissive_instance)
+                instances.append(self._build_instance(
+                    name=f'overly-permissive-server-{i+1}',
+                    instance_type=next(instance_types),
+                    public_ip=next(public_ips),
+                    private_ip=f'{private_prefix}{next(private_hosts)}',
+                    subnet_id=subnet_id,
+                    vpc_id=vpc_id,
+                    security_groups=list(sg_index.get((vpc_id, 'overly-permissive'), [])),
+                    env_tag=env_tag
+                ))
         
         return instances
     
-    def _generate_ebs_volumes(self, instances: List[Dict]) -> List[Dict]:
+    def _build_instance(self, name: str, instance_type: str, public_ip: str, private_ip: str,
+                        subnet_id: str, vpc_id: str, security_groups: List[Dict], env_tag: Dict) -> Dict:
+        """建立單一 EC2 實例紀錄"""
+        return {
+            'InstanceId': _generate_aws_id('i'),
+            'InstanceType': instance_type,
+            'State': RUNNING_STATE,
+            'PublicIpAddress': public_ip,
+            'PrivateIpAddress': private_ip,
+            'SubnetId': subnet_id,
+            'VpcId': vpc_id,
+            'SecurityGroups': security_groups,
+            'Tags': [
+                {'Key': 'Name', 'Value': name},
+                env_tag
+            ]
+        }
+    
+    def _generate_ebs_volumes(self, instances: List[Dict]) -> Iterator[EBSVolumeRecord]:
         """生成 EBS 磁碟，包含多種安全問題"""
-        volumes = []
+        now = datetime.now()
         
-        for instance in instances:
+        # 每個實例最多兩顆磁碟，另有 8 顆孤兒磁碟；先批次抽取隨機屬性再依序取用
+        max_volumes = 2 * len(instances) + 8
+        sizes = iter(random.choices(range(20, 101), k=max_volumes))
+        volume_types = iter(random.choices(('gp2', 'gp3'), k=max_volumes))
+        iops = iter(random.choices(range(100, 3001), k=max_volumes))
+        ages = iter(random.choices(range(1, 366), k=max_volumes))
+        # 40% 機率額外附加一顆未加密磁碟
+        has_unencrypted = random.choices((True, False), weights=(4, 6), k=len(instances))
+        
+        for instance, add_unencrypted in zip(instances, has_unencrypted):
+            instance_id = instance['InstanceId']
+            
             # 正常加密的磁碟
-            encrypted_volume = {
-                'VolumeId': _generate_aws_id('vol'),
-                'Size': random.randint(20, 100),
-                'VolumeType': random.choice(['gp2', 'gp3']),
-                'State': 'in-use',
-                'Encrypted': True,
-                'Iops': random.randint(100, 3000),
-                'CreationDate': (datetime.now() - timedelta(days=random.randint(1, 365))).isoformat(),
-                'Attachments': [{'InstanceId': instance['InstanceId']}],
-                'Tags': [
-                    {'Key': 'Name', 'Value': f'encrypted-volume-{instance["InstanceId"]}'}
-                ]
-            }
-            volumes.append(encrypted_volume)
+            yield EBSVolumeRecord(
+                volume_id=_generate_aws_id('vol'),
+                size=next(sizes),
+                volume_type=next(volume_types),
+                state='in-use',
+                encrypted=True,
+                iops=next(iops),
+                creation_date=(now - timedelta(days=next(ages))).isoformat(),
+                instance_id=instance_id,
+                name=f'encrypted-volume-{instance_id}'
+            )
             
             # 未加密的磁碟 (問題6)
-            if random.random() < 0.4:  # 40% 機率
-                unencrypted_volume = {
-                    'VolumeId': _generate_aws_id('vol'),
-                    'Size': random.randint(20, 100),
-                    'VolumeType': random.choice(['gp2', 'gp3']),
-                    'State': 'in-use',
-                    'Encrypted': False,  # 問題：未加密
-                    'Iops': random.randint(100, 3000),
-                    'CreationDate': (datetime.now() - timedelta(days=random.randint(1, 365))).isoformat(),
-                    'Attachments': [{'InstanceId': instance['InstanceId']}],
-                    'Tags': [
-                        {'Key': 'Name', 'Value': f'unencrypted-volume-{instance["InstanceId"]}'}
-                    ]
-                }
-                volumes.append(unencrypted_volume)
+            if add_unencrypted:
+                yield EBSVolumeRecord(
+                    volume_id=_generate_aws_id('vol'),
+                    size=next(sizes),
+                    volume_type=next(volume_types),
+                    state='in-use',
+                    encrypted=False,  # 問題：未加密
+                    iops=next(iops),
+                    creation_date=(now - timedelta(days=next(ages))).isoformat(),
+                    instance_id=instance_id,
+                    name=f'unencrypted-volume-{instance_id}'
+                )
         
         # 孤兒磁碟 (問題7)
         for i in range(5):
-            orphaned_volume = {
-                'VolumeId': _generate_aws_id('vol'),
-                'Size': random.randint(20, 100),
-                'VolumeType': random.choice(['gp2', 'gp3']),
-                'State': 'available',  # 問題：可用但未附加
-                'Encrypted': True,
-                'Iops': random.randint(100, 3000),
-                'CreationDate': (datetime.now() - timedelta(days=random.randint(1, 365))).isoformat(),
-                'Attachments': [],
-                'Tags': [
-                    {'Key': 'Name', 'Value': f'orphaned-volume-{i+1}'}
-                ]
-            }
-            volumes.append(orphaned_volume)
+            yield EBSVolumeRecord(
+                volume_id=_generate_aws_id('vol'),
+                size=next(sizes),
+                volume_type=next(volume_types),
+                state='available',  # 問題：可用但未附加
+                encrypted=True,
+                iops=next(iops),
+                creation_date=(now - timedelta(days=next(ages))).isoformat(),
+                instance_id=None,
+                name=f'orphaned-volume-{i+1}'
+            )
         
         # 未加密的孤兒磁碟 (問題8)
         for i in range(3):
-            unencrypted_orphaned_volume = {
-                'VolumeId': _generate_aws_id('vol'),
-                'Size': random.randint(20, 100),
-                'VolumeType': random.choice(['gp2', 'gp3']),
-                'State': 'available',  # 問題：可用但未附加
-                'Encrypted': False,  # 問題：未加密
-                'Attachments': [],
-                'Tags': [
-                    {'Key': 'Name', 'Value': f'unencrypted-orphaned-volume-{i+1}'}
-                ]
-            }
-            volumes.append(unencrypted_orphaned_volume)
-        
-        return volumes
-    
-    def _generate_security_rules(self, security_groups: List[Dict]) -> List[Dict]:
-        """生成安全規則"""
-        security_rules = []
-        for sg in security_groups:
-            for perm in sg.get('IpPermissions', []):
-                rule = {
-                    'RuleId': _generate_aws_id('rule'),
-                    'GroupId': sg['GroupId'],
-                    'Protocol': perm.get('IpProtocol', 'tcp'),
-                    'PortRange': f"{perm.get('FromPort', 0)}-{perm.get('ToPort', 0)}",
-                    'SourceCIDR': perm['IpRanges'][0]['CidrIp'] if perm.get('IpRanges') else '0.0.0.0/0',
-                    'Direction': 'inbound',
-                    'Action': 'allow',
-                    'Description': f"Rule for {sg['GroupName']}"
-                }
-                security_rules.append(rule)
-        return security_rules
-
+            yield EBSVolumeRecord(
+                volume_id=_generate_aws_id('vol'),
+                size=next(sizes),
+                volume_type=next(volume_types),
+                state='available',  # 問題：可用但未附加
+                encrypted=False,  # 問題：未加密
+                iops=None,
+                creation_date=None,
+                instance_id=None,
+                name=f'unencrypted-orphaned-volume-{i+1}'
+            )
 
 def main():
     """主函數"""
-    generator = EnhancedSecurityDataGenerator()
-    dataset = generator.generate_complete_dataset()
+    parser = argparse.ArgumentParser(description='增強版安全測試資料生成器')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='平行生成各 VPC 資源的行程數（預設 1，即不使用多行程）')
+    args = parser.parse_args()
+    
+    generator = EnhancedSecurityDataGenerator(workers=args.workers)
     
     # 儲存到檔案
     output_file = 'data/raw/mock_aws_resources.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(dataset, f, indent=2, ensure_ascii=False)
+    generator.write_complete_dataset(output_file)
     
     print(f"增強版安全測試資料已儲存至: {output_file}")
     print("包含以下安全問題：")
@@ -6,11 +6,60 @@
 包含完整的資源關聯性和安全規則。
 """
 
+import argparse
 import json
+import os
 import random
 import secrets
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, BinaryIO, Callable, Iterable, Iterator, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import ormsgpack
+    ORMSGPACK_AVAILABLE = True
+except ImportError:
+    ormsgpack = None
+    ORMSGPACK_AVAILABLE = False
+
+
+# 沒有 orjson 時使用的編碼器：重複使用同一個實例，並走 ASCII 跳脫路徑，
+# 輸出必為純 ASCII，轉成位元組時不必再逐字元做 UTF-8 編碼
+_JSON_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+
+def _encode_json(obj: Any) -> bytes:
+    """將單一物件編碼為 UTF-8 JSON 位元組"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return _JSON_ENCODER.encode(obj).encode('ascii')
+
+
+def _write_json_array(f: BinaryIO, records: Iterable[Dict[str, Any]]) -> int:
+    """將紀錄逐筆寫成 JSON 陣列，回傳寫入筆數"""
+    count = 0
+    f.write(b'[')
+    for record in records:
+        if count:
+            f.write(b',\n')
+        f.write(_encode_json(record))
+        count += 1
+    f.write(b']')
+    return count
+
+
+def _init_worker():
+    """重新設定子行程的亂數狀態，fork 出的行程才不會產生重複的值"""
+    random.seed()
 
 
 def _generate_aws_id(prefix: str, length: int = 17) -> str:
@@ -18,24 +67,87 @@ def _generate_aws_id(prefix: str, length: int = 17) -> str:
     return f"{prefix}-{secrets.token_hex(length // 2 + 1)[:length]}"
 
 
+def _bulk_ids(prefix: str, n: int, length: int = 17) -> List[str]:
+    """一次取得 n 個 AWS 格式的 ID，只向作業系統要一次隨機位元組"""
+    step = length // 2 + 1
+    hex_str = os.urandom(n * step).hex()
+    return [f"{prefix}-{hex_str[k:k + length]}" for k in range(0, n * step * 2, step * 2)]
+
+
+def _iso_days_ago(now: datetime) -> Callable[[int], str]:
+    """回傳「now 往前 N 天」的 ISO 字串產生函式，同一天數只格式化一次"""
+    cache: Dict[int, str] = {}
+    
+    def days_ago(days: int) -> str:
+        iso = cache.get(days)
+        if iso is None:
+            iso = cache[days] = (now - timedelta(days=days)).isoformat()
+        return iso
+    
+    return days_ago
+
+
 def _generate_arn(partition: str, service: str, region: str, account_id: str, resource_path: str) -> str:
     """產生一個標準的 AWS ARN"""
     return f"arn:{partition}:{service}:{region}:{account_id}:{resource_path}"
 
 
+OUTPUT_FILE = 'data/raw/enhanced_mock_aws_resources.json'
+MSGPACK_OUTPUT_FILE = 'data/raw/enhanced_mock_aws_resources.msgpack'
+# 輸出檔的寫入緩衝區大小，讓逐筆寫入累積成少數幾次系統呼叫
+WRITE_BUFFER_SIZE = 1 << 20
+
+S3_OWNER = {'DisplayName': 'mock-owner', 'ID': 'mock-owner-id'}
+
+VPC_NAMES = ('production-vpc', 'staging-vpc', 'development-vpc', 'dmz-vpc', 'management-vpc')
+SUBNET_TYPES = ('public', 'private', 'database', 'cache')
+AZ_SUFFIXES = ('a', 'b', 'c')
+DB_ENGINES = ('mysql', 'postgres', 'oracle', 'sqlserver', 'mariadb')
+BUCKET_PURPOSES = ('logs', 'backups', 'static-assets', 'data-lake', 'documents', 'images', 'videos', 'archives')
+LAMBDA_FUNCTION_NAMES = ('data-processor', 'image-resizer', 'email-sender', 'notification-handler',
+                         'api-handler', 'scheduled-task', 'event-processor', 'webhook-handler')
+
+# 真實的應用程式名稱
+EC2_APP_NAMES = (
+    'web-server', 'api-gateway', 'database-proxy', 'load-balancer', 'cache-server',
+    'monitoring', 'logging', 'analytics', 'auth-service', 'payment-processor',
+    'user-service', 'notification-service', 'file-storage', 'search-engine',
+    'recommendation-engine', 'order-service', 'inventory-service', 'shipping-service',
+    'customer-service', 'admin-panel', 'reporting-service', 'audit-service',
+    'backup-service', 'disaster-recovery', 'testing-service'
+)
+EC2_ENVIRONMENTS = ('prod', 'staging', 'dev', 'test', 'demo')
+DEPLOY_ENVIRONMENTS = ('prod', 'staging', 'dev')
+EC2_TEAMS = ('backend', 'frontend', 'data', 'infrastructure', 'security', 'mobile', 'devops')
+
+# 值只有固定幾種的標籤在所有資源間共用同一個物件，不必每筆重建
+ENVIRONMENT_TAGS = {env: {'Key': 'Environment', 'Value': env} for env in EC2_ENVIRONMENTS}
+BACKUP_TAGS = {value: {'Key': 'Backup', 'Value': value} for value in ('daily', 'weekly', 'enabled', 'disabled')}
+RETENTION_TAGS = {value: {'Key': 'Retention', 'Value': value} for value in ('7-years', '1-year')}
+MONITORING_ENABLED_TAG = {'Key': 'Monitoring', 'Value': 'enabled'}
+LOAD_BALANCER_TYPE_TAG = {'Key': 'Type', 'Value': 'load-balancer'}
+
+# 預先轉好的 IP 位元組字串，組 IP 時不必逐段做整數轉字串
+IP_OCTETS = tuple(str(n) for n in range(256))
+
+
 class EnhancedMockAWSDataGenerator:
     """增強版模擬 AWS 資料生成器"""
     
-    def __init__(self):
-        self.regions = ['us-east-1', 'us-west-2', 'eu-west-1', 'ap-southeast-1', 'ap-northeast-1']
-        self.instance_types = ['t2.micro', 't2.small', 't2.medium', 't3.micro', 't3.small', 't3.medium', 'm5.large', 'c5.xlarge', 'r5.large']
-        self.volume_types = ['gp2', 'gp3', 'io1', 'io2', 'st1', 'sc1']
-        self.states = ['running', 'stopped', 'pending', 'terminated']
+    def __init__(self, workers: int = 1):
+        # 大於 1 時以多個行程平行生成互不相依的資源；資料量小時行程啟動成本反而較高
+        self.workers = workers
+        self.regions = ('us-east-1', 'us-west-2', 'eu-west-1', 'ap-southeast-1', 'ap-northeast-1')
+        self.instance_types = ('t2.micro', 't2.small', 't2.medium', 't3.micro', 't3.small', 't3.medium', 'm5.large', 'c5.xlarge', 'r5.large')
+        self.volume_types = ('gp2', 'gp3', 'io1', 'io2', 'st1', 'sc1')
+        self.states = ('running', 'stopped', 'pending', 'terminated')
         
         # AWS 帳戶和分區資訊
         self.account_id = '123456789012'
         self.partition = 'aws'
         self.id_gen = _generate_aws_id
+        self.bulk_id_gen = _bulk_ids
+        self._arn_prefixes: Dict[Tuple[str, str], str] = {}
         
         # 真實的應用程式架構
         self.app_architectures = {
@@ -46,445 +158,500 @@ class EnhancedMockAWSDataGenerator:
         }
         
         # 真實的安全群組名稱
-        self.security_group_names = [
+        self.security_group_names = (
             'web-servers', 'api-servers', 'database-servers', 'cache-servers',
             'load-balancers', 'monitoring', 'bastion-hosts', 'nat-gateways',
             'vpc-endpoints', 'lambda-functions', 'rds-proxy', 'elasticsearch'
-        ]
+        )
         
         # 常見的端口和協議
         self.common_ports = {
-            'web-servers': [80, 443, 8080],
-            'api-servers': [3000, 8000, 9000],
-            'database-servers': [3306, 5432, 6379, 27017],
-            'monitoring': [9100, 9090, 3000],
-            'ssh': [22],
-            'rdp': [3389],
-            'dns': [53]
+            'web-servers': (80, 443, 8080),
+            'api-servers': (3000, 8000, 9000),
+            'database-servers': (3306, 5432, 6379, 27017),
+            'monitoring': (9100, 9090, 3000),
+            'ssh': (22,),
+            'rdp': (3389,),
+            'dns': (53,)
+        }
+        
+        # 各類資源的生成數量
+        self.resource_counts = {
+            'vpcs': 5,
+            'security_groups': 15,
+            'ec2_instances': 30,
+            'ebs_volumes': 25,
+            'rds_instances': 8,
+            'load_balancers': 8,
+            's3_buckets': 12,
+            'lambda_functions': 10
+        }
+    
+    def _arn(self, service: str, region: str, resource_path: str) -> str:
+        """產生本帳戶的 ARN，每個 (服務, 區域) 的前綴只格式化一次"""
+        prefix = self._arn_prefixes.get((service, region))
+        if prefix is None:
+            prefix = self._arn_prefixes[(service, region)] = _generate_arn(
+                self.partition, service, region, self.account_id, '')
+        return prefix + resource_path
+    
+    def get_config(self) -> Dict[str, Any]:
+        """取得影響資料集內容的生成設定（用於判斷快取是否過期）"""
+        return {
+            'version': '2.0',
+            'regions': self.regions,
+            'instance_types': self.instance_types,
+            'volume_types': self.volume_types,
+            'states': self.states,
+            'account_id': self.account_id,
+            'partition': self.partition,
+            'app_architectures': self.app_architectures,
+            'security_group_names': self.security_group_names,
+            'common_ports': self.common_ports,
+            'resource_counts': self.resource_counts
         }
     
     def generate_vpcs(self, count: int = 5) -> List[Dict[str, Any]]:
         """生成 VPC"""
-        vpcs = []
-        vpc_names = ['production-vpc', 'staging-vpc', 'development-vpc', 'dmz-vpc', 'management-vpc']
-        
-        for i in range(count):
-            region = random.choice(self.regions)
-            vpc_id = self.id_gen('vpc')
-            name = vpc_names[i] if i < len(vpc_names) else f'vpc-{i+1:02d}'
-            
-            vpc = {
-                'VpcId': vpc_id,
-                'Name': name,
-                'CidrBlock': f'10.{i}.0.0/16',
-                'State': 'available',
-                'IsDefault': i == 0,
-                'Region': region,
-                'Arn': _generate_arn(self.partition, 'ec2', region, self.account_id, f"vpc/{vpc_id}"),
-                'Tags': [
-                    {'Key': 'Name', 'Value': name},
-                    {'Key': 'Environment', 'Value': 'prod' if 'production' in name else 'dev'},
-                    {'Key': 'Purpose', 'Value': 'application' if 'prod' in name else 'testing'}
-                ]
-            }
-            vpcs.append(vpc)
-        
-        return vpcs
+        return [self._build_vpc(i, vpc_id) for i, vpc_id in enumerate(self.bulk_id_gen('vpc', count))]
+    
+    def _build_vpc(self, i: int, vpc_id: str) -> Dict[str, Any]:
+        """建立第 i 個 VPC"""
+        region = random.choice(self.regions)
+        name = VPC_NAMES[i] if i < len(VPC_NAMES) else f'vpc-{i+1:02d}'
+        
+        return {
+            'VpcId': vpc_id,
+            'Name': name,
+            'CidrBlock': f'10.{i}.0.0/16',
+            'State': 'available',
+            'IsDefault': i == 0,
+            'Region': region,
+            'Arn': self._arn('ec2', region, f"vpc/{vpc_id}"),
+            'Tags': [
+                {'Key': 'Name', 'Value': name},
+                ENVIRONMENT_TAGS['prod' if 'production' in name else 'dev'],
+                {'Key': 'Purpose', 'Value': 'application' if 'prod' in name else 'testing'}
+            ]
+        }
     
     def generate_subnets(self, vpcs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """生成子網路"""
-        subnets = []
-        subnet_types = ['public', 'private', 'database', 'cache']
-        
-        for vpc in vpcs:
-            vpc_id = vpc['VpcId']
-            region = vpc['Region']
-            base_cidr = vpc['CidrBlock'].split('.')[1]
-            
-            # 每個 VPC 生成 4-6 個子網路
-            subnet_count = random.randint(4, 6)
-            for i in range(subnet_count):
-                subnet_type = random.choice(subnet_types)
-                az_suffix = chr(ord('a') + (i % 3))  # a, b, c
-                availability_zone = f"{region}{az_suffix}"
-                
-                subnet = {
-                    'SubnetId': self.id_gen('subnet'),
-                    'Name': f'{vpc["Name"]}-{subnet_type}-{i+1:02d}',
-                    'CidrBlock': f'10.{base_cidr}.{i*16}.0/24',
-                    'AvailabilityZone': availability_zone,
-                    'VpcId': vpc_id,
-                    'State': 'available',
-                    'Region': region,
-                    'Arn': _generate_arn(self.partition, 'ec2', region, self.account_id, f"subnet/{self.id_gen('subnet')}"),
-                    'Tags': [
-                        {'Key': 'Name', 'Value': f'{vpc["Name"]}-{subnet_type}-{i+1:02d}'},
-                        {'Key': 'Type', 'Value': subnet_type},
-                        {'Key': 'VPC', 'Value': vpc_id}
-                    ]
-                }
-                subnets.append(subnet)
-        
-        return subnets
+        # 每個 VPC 生成 4-6 個子網路
+        return [
+            self._build_subnet(vpc, vpc['CidrBlock'].split('.')[1], i)
+            for vpc in vpcs
+            for i in range(random.randint(4, 6))
+        ]
+    
+    def _build_subnet(self, vpc: Dict[str, Any], base_cidr: str, i: int) -> Dict[str, Any]:
+        """建立 VPC 內的第 i 個子網路"""
+        vpc_id = vpc['VpcId']
+        region = vpc['Region']
+        subnet_type = random.choice(SUBNET_TYPES)
+        az_suffix = AZ_SUFFIXES[i % len(AZ_SUFFIXES)]
+        availability_zone = f"{region}{az_suffix}"
+        
+        return {
+            'SubnetId': self.id_gen('subnet'),
+            'Name': f'{vpc["Name"]}-{subnet_type}-{i+1:02d}',
+            'CidrBlock': f'10.{base_cidr}.{i*16}.0/24',
+            'AvailabilityZone': availability_zone,
+            'VpcId': vpc_id,
+            'State': 'available',
+            'Region': region,
+            'Arn': self._arn('ec2', region, f"subnet/{self.id_gen('subnet')}"),
+            'Tags': [
+                {'Key': 'Name', 'Value': f'{vpc["Name"]}-{subnet_type}-{i+1:02d}'},
+                {'Key': 'Type', 'Value': subnet_type},
+                {'Key': 'VPC', 'Value': vpc_id}
+            ]
+        }
     
     def generate_security_groups(self, count: int = 15, vpcs: List[Dict[str, Any]] = []) -> List[Dict[str, Any]]:
         """生成安全群組"""
-        security_groups = []
-        
-        for i in range(count):
-            vpc = random.choice(vpcs) if vpcs else {'VpcId': self.id_gen('vpc'), 'Region': random.choice(self.regions)}
-            vpc_id = vpc['VpcId']
-            region = vpc['Region']
-            
-            group_name = random.choice(self.security_group_names)
-            group_id = self.id_gen('sg')
-            
-            sg = {
-                'GroupID': group_id,
-                'GroupName': f'{group_name}-{random.choice(["prod", "staging", "dev"])}',
-                'Description': f'Security group for {group_name}',
-                'VpcId': vpc_id,
-                'Region': region,
-                'Arn': _generate_arn(self.partition, 'ec2', region, self.account_id, f"security-group/{group_id}"),
-                'Tags': [
-                    {'Key': 'Name', 'Value': f'{group_name}-{random.choice(["prod", "staging", "dev"])}'},
-                    {'Key': 'Purpose', 'Value': group_name},
-                    {'Key': 'VPC', 'Value': vpc_id}
-                ]
-            }
-            security_groups.append(sg)
-        
-        return security_groups
+        return [self._build_security_group(group_id, vpcs) for group_id in self.bulk_id_gen('sg', count)]
+    
+    def _build_security_group(self, group_id: str, vpcs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """在隨機選出的 VPC 中建立一個安全群組"""
+        vpc = random.choice(vpcs) if vpcs else {'VpcId': self.id_gen('vpc'), 'Region': random.choice(self.regions)}
+        vpc_id = vpc['VpcId']
+        region = vpc['Region']
+        
+        group_name = random.choice(self.security_group_names)
+        full_name = f'{group_name}-{random.choice(DEPLOY_ENVIRONMENTS)}'
+        
+        return {
+            'GroupID': group_id,
+            'GroupName': full_name,
+            'Description': f'Security group for {group_name}',
+            'VpcId': vpc_id,
+            'Region': region,
+            'Arn': self._arn('ec2', region, f"security-group/{group_id}"),
+            'Tags': [
+                {'Key': 'Name', 'Value': full_name},
+                {'Key': 'Purpose', 'Value': group_name},
+                {'Key': 'VPC', 'Value': vpc_id}
+            ]
+        }
     
     def generate_security_rules(self, security_groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """生成安全規則"""
-        rules = []
+        # 為每個安全群組生成 2-5 個規則
+        return [
+            self._build_security_rule(sg, i)
+            for sg in security_groups
+            for i in range(random.randint(2, 5))
+        ]
+    
+    def _build_security_rule(self, sg: Dict[str, Any], i: int) -> Dict[str, Any]:
+        """為安全群組建立第 i 條規則"""
+        group_id = sg['GroupID']
+        group_name = sg['GroupName']
         
-        for sg in security_groups:
-            group_id = sg['GroupID']
-            group_name = sg['GroupName']
-            
-            # 為每個安全群組生成 2-5 個規則
-            rule_count = random.randint(2, 5)
-            
-            for i in range(rule_count):
-                # 根據安全群組類型生成相應的規則
-                if 'web' in group_name.lower():
-                    ports = random.choice(self.common_ports['web-servers'])
-                    protocol = 'tcp'
-                    source = '0.0.0.0/0' if random.random() > 0.3 else '10.0.0.0/8'
-                elif 'api' in group_name.lower():
-                    ports = random.choice(self.common_ports['api-servers'])
-                    protocol = 'tcp'
-                    source = '10.0.0.0/8' if random.random() > 0.2 else '0.0.0.0/0'
-                elif 'database' in group_name.lower():
-                    ports = random.choice(self.common_ports['database-servers'])
-                    protocol = 'tcp'
-                    source = '10.0.0.0/8'  # 資料庫通常只允許內網訪問
-                elif 'monitoring' in group_name.lower():
-                    ports = random.choice(self.common_ports['monitoring'])
-                    protocol = 'tcp'
-                    source = '10.0.0.0/8'
-                else:
-                    ports = random.randint(1, 65535)
-                    protocol = random.choice(['tcp', 'udp', 'icmp'])
-                    source = random.choice(['0.0.0.0/0', '10.0.0.0/8', '172.16.0.0/12'])
-                
-                direction = random.choice(['inbound', 'outbound'])
-                action = 'allow' if random.random() > 0.1 else 'deny'
-                
-                rule = {
-                    'RuleId': f'{group_id}-rule-{i+1}',
-                    'GroupId': group_id,
-                    'Protocol': protocol,
-                    'PortRange': f'{ports}-{ports}' if protocol != 'icmp' else '0-65535',
-                    'SourceCIDR': source,
-                    'Direction': direction,
-                    'Action': action,
-                    'Description': f'Rule for {group_name} {direction} traffic'
-                }
-                rules.append(rule)
-        
-        return rules
+        # 根據安全群組類型生成相應的規則
+        if 'web' in group_name.lower():
+            ports = random.choice(self.common_ports['web-servers'])
+            protocol = 'tcp'
+            source = '0.0.0.0/0' if random.random() > 0.3 else '10.0.0.0/8'
+        elif 'api' in group_name.lower():
+            ports = random.choice(self.common_ports['api-servers'])
+            protocol = 'tcp'
+            source = '10.0.0.0/8' if random.random() > 0.2 else '0.0.0.0/0'
+        elif 'database' in group_name.lower():
+            ports = random.choice(self.common_ports['database-servers'])
+            protocol = 'tcp'
+            source = '10.0.0.0/8'  # 資料庫通常只允許內網訪問
+        elif 'monitoring' in group_name.lower():
+            ports = random.choice(self.common_ports['monitoring'])
+            protocol = 'tcp'
+            source = '10.0.0.0/8'
+        else:
+            ports = random.randint(1, 65535)
+            protocol = random.choice(('tcp', 'udp', 'icmp'))
+            source = random.choice(('0.0.0.0/0', '10.0.0.0/8', '172.16.0.0/12'))
+        
+        direction = random.choice(('inbound', 'outbound'))
+        action = 'allow' if random.random() > 0.1 else 'deny'
+        
+        return {
+            'RuleId': f'{group_id}-rule-{i+1}',
+            'GroupId': group_id,
+            'Protocol': protocol,
+            'PortRange': f'{ports}-{ports}' if protocol != 'icmp' else '0-65535',
+            'SourceCIDR': source,
+            'Direction': direction,
+            'Action': action,
+            'Description': f'Rule for {group_name} {direction} traffic'
+        }
     
     def generate_ec2_instances(self, count: int = 30, 
                              vpcs: List[Dict[str, Any]] = [], 
                              subnets: List[Dict[str, Any]] = [], 
                              security_groups: List[Dict[str, Any]] = []) -> List[Dict[str, Any]]:
         """生成 EC2 實例"""
-        instances = []
-        
-        # 真實的應用程式名稱
-        app_names = [
-            'web-server', 'api-gateway', 'database-proxy', 'load-balancer', 'cache-server',
-            'monitoring', 'logging', 'analytics', 'auth-service', 'payment-processor',
-            'user-service', 'notification-service', 'file-storage', 'search-engine',
-            'recommendation-engine', 'order-service', 'inventory-service', 'shipping-service',
-            'customer-service', 'admin-panel', 'reporting-service', 'audit-service',
-            'backup-service', 'disaster-recovery', 'testing-service'
+        # 每個欄位一次抽出 count 筆，避免在迴圈內逐筆呼叫 random
+        instance_ids = self.bulk_id_gen('i', count)
+        image_ids = self.bulk_id_gen('ami', count)
+        app_names = random.choices(EC2_APP_NAMES, k=count)
+        envs = random.choices(EC2_ENVIRONMENTS, k=count)
+        teams = random.choices(EC2_TEAMS, k=count)
+        # 相同狀態的實例共用同一個 State 物件
+        states = random.choices([{'Name': state} for state in self.states], k=count)
+        chosen_vpcs = random.choices(vpcs, k=count) if vpcs else [
+            {'VpcId': vpc_id, 'Region': region}
+            for vpc_id, region in zip(self.bulk_id_gen('vpc', count), random.choices(self.regions, k=count))
         ]
+        octets = iter(random.choices(IP_OCTETS, k=6 * count))
+        ips = [(f'54.{a}.{b}.{c}', f'10.{d}.{e}.{f}') for a, b, c, d, e, f in zip(*[octets] * 6)]
+        has_public_ip = random.choices((True, False), weights=(7, 3), k=count)
+        days_ago = _iso_days_ago(datetime.now())
+        launch_times = [days_ago(age) for age in random.choices(range(1, 366), k=count)]
+        cost_centers = [f'CC-{n}' for n in random.choices(range(1000, 10000), k=count)]
+        sg_counts = random.choices((1, 2, 3), k=count)
+        
+        # 預先依 VPC 分組子網路與安全群組，迴圈內只需一次字典查詢
+        subnets_by_vpc: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for subnet in subnets:
+            subnets_by_vpc[subnet['VpcId']].append(subnet)
+        sgs_by_vpc: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for sg in security_groups:
+            sgs_by_vpc[sg['VpcId']].append(sg)
+        
+        # 各欄位逐列組合後一次建成字典
+        columns = zip(instance_ids, image_ids, app_names, envs, teams, chosen_vpcs, states, ips,
+                      has_public_ip, launch_times, cost_centers, sg_counts)
+        return [
+            self._build_ec2_instance(i, *row, subnets_by_vpc, sgs_by_vpc)
+            for i, row in enumerate(columns)
+        ]
+    
+    def _build_ec2_instance(self, i: int, instance_id: str, image_id: str, app_name: str, env: str, team: str,
+                            chosen_vpc: Dict[str, Any], instance_state: Dict[str, str], ips: Tuple[str, str],
+                            has_public_ip: bool, launch_time: str, cost_center: str, sg_count: int,
+                            subnets_by_vpc: Dict[str, List[Dict[str, Any]]],
+                            sgs_by_vpc: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """建立第 i 個 EC2 實例，放在選定 VPC 的子網路與安全群組中"""
+        region = chosen_vpc['Region']
+        public_ip, private_ip = ips
+        
+        # 從該 VPC 的子網路中隨機選一個
+        subnets_in_vpc = subnets_by_vpc.get(chosen_vpc['VpcId'])
+        chosen_subnet = random.choice(subnets_in_vpc) if subnets_in_vpc else {'SubnetId': self.id_gen('subnet'), 'AvailabilityZone': f'{region}a'}
         
-        environments = ['prod', 'staging', 'dev', 'test', 'demo']
-        teams = ['backend', 'frontend', 'data', 'infrastructure', 'security', 'mobile', 'devops']
-        
-        for i in range(count):
-            app_name = random.choice(app_names)
-            env = random.choice(environments)
-            team = random.choice(teams)
-            
-            # 隨機選一個已存在的 VPC
-            chosen_vpc = random.choice(vpcs) if vpcs else {'VpcId': self.id_gen('vpc'), 'Region': random.choice(self.regions)}
-            region = chosen_vpc['Region']
-            
-            # 從該 VPC 的子網路中隨機選一個
-            subnets_in_vpc = [s for s in subnets if s['VpcId'] == chosen_vpc['VpcId']]
-            chosen_subnet = random.choice(subnets_in_vpc) if subnets_in_vpc else {'SubnetId': self.id_gen('subnet'), 'AvailabilityZone': f'{region}a'}
-            
-            # 從該 VPC 的安全群組中隨機選 1-3 個
-            sgs_in_vpc = [sg for sg in security_groups if sg['VpcId'] == chosen_vpc['VpcId']]
-            chosen_sgs = random.sample(sgs_in_vpc, k=random.randint(1, min(3, len(sgs_in_vpc)))) if sgs_in_vpc else [{'GroupID': self.id_gen('sg'), 'GroupName': 'default-sg'}]
-            
-            # 將 SG 格式化為 EC2 期待的格式
-            sg_list_for_ec2 = [{'GroupId': sg['GroupID'], 'GroupName': sg['GroupName']} for sg in chosen_sgs]
-            
-            instance_state = random.choice(self.states)
-            instance_id = self.id_gen('i')
-            
-            # 根據應用程式類型選擇實例類型
-            if 'database' in app_name or 'cache' in app_name:
-                instance_type = random.choice(['r5.large', 'm5.large', 'c5.xlarge'])
-            elif 'web' in app_name or 'api' in app_name:
-                instance_type = random.choice(['t3.medium', 't3.small', 'm5.large'])
-            else:
-                instance_type = random.choice(self.instance_types)
-            
-            instance = {
-                'InstanceID': instance_id,
-                'ImageId': self.id_gen('ami'),
-                'Name': f'{app_name}-{env}-{i+1:02d}',
-                'State': {'Name': instance_state},
-                'InstanceType': instance_type,
-                'PublicIpAddress': f'54.{random.randint(0,255)}.{random.randint(0,255)}.{random.randint(0,255)}' if instance_state == 'running' and random.random() > 0.3 else None,
-                'PrivateIpAddress': f'10.{random.randint(0,255)}.{random.randint(0,255)}.{random.randint(0,255)}',
-                'LaunchTime': (datetime.now() - timedelta(days=random.randint(1, 365))).isoformat(),
-                'Placement': {'AvailabilityZone': chosen_subnet['AvailabilityZone']},
-                'SecurityGroups': sg_list_for_ec2,
-                'SubnetId': chosen_subnet['SubnetId'],
-                'VpcId': chosen_vpc['VpcId'],
-                'Arn': _generate_arn(self.partition, 'ec2', region, self.account_id, f"instance/{instance_id}"),
-                'Tags': [
-                    {'Key': 'Name', 'Value': f'{app_name}-{env}-{i+1:02d}'},
-                    {'Key': 'Environment', 'Value': env},
-                    {'Key': 'Team', 'Value': team},
-                    {'Key': 'Application', 'Value': app_name},
-                    {'Key': 'Owner', 'Value': f'{team}-team@company.com'},
-                    {'Key': 'CostCenter', 'Value': f'CC-{random.randint(1000, 9999)}'},
-                    {'Key': 'Backup', 'Value': 'daily' if env == 'prod' else 'weekly'},
-                    {'Key': 'Monitoring', 'Value': 'enabled'}
-                ]
-            }
-            instances.append(instance)
-        
-        return instances
+        # 從該 VPC 的安全群組中隨機選 1-3 個（不超過該 VPC 的群組數）
+        sgs_in_vpc = sgs_by_vpc.get(chosen_vpc['VpcId'])
+        if not sgs_in_vpc:
+            chosen_sgs = [{'GroupID': self.id_gen('sg'), 'GroupName': 'default-sg'}]
+        elif sg_count == 1:
+            chosen_sgs = [random.choice(sgs_in_vpc)]
+        else:
+            chosen_sgs = random.sample(sgs_in_vpc, k=min(sg_count, len(sgs_in_vpc)))
+        
+        # 將 SG 格式化為 EC2 期待的格式
+        sg_list_for_ec2 = [{'GroupId': sg['GroupID'], 'GroupName': sg['GroupName']} for sg in chosen_sgs]
+        
+        # 根據應用程式類型選擇實例類型
+        if 'database' in app_name or 'cache' in app_name:
+            instance_type = random.choice(('r5.large', 'm5.large', 'c5.xlarge'))
+        elif 'web' in app_name or 'api' in app_name:
+            instance_type = random.choice(('t3.medium', 't3.small', 'm5.large'))
+        else:
+            instance_type = random.choice(self.instance_types)
+        
+        return {
+            'InstanceID': instance_id,
+            'ImageId': image_id,
+            'Name': f'{app_name}-{env}-{i+1:02d}',
+            'State': instance_state,
+            'InstanceType': instance_type,
+            'PublicIpAddress': public_ip if instance_state['Name'] == 'running' and has_public_ip else None,
+            'PrivateIpAddress': private_ip,
+            'LaunchTime': launch_time,
+            'Placement': {'AvailabilityZone': chosen_subnet['AvailabilityZone']},
+            'SecurityGroups': sg_list_for_ec2,
+            'SubnetId': chosen_subnet['SubnetId'],
+            'VpcId': chosen_vpc['VpcId'],
+            'Arn': self._arn('ec2', region, f"instance/{instance_id}"),
+            'Tags': [
+                {'Key': 'Name', 'Value': f'{app_name}-{env}-{i+1:02d}'},
+                ENVIRONMENT_TAGS[env],
+                {'Key': 'Team', 'Value': team},
+                {'Key': 'Application', 'Value': app_name},
+                {'Key': 'Owner', 'Value': f'{team}-team@company.com'},
+                {'Key': 'CostCenter', 'Value': cost_center},
+                BACKUP_TAGS['daily' if env == 'prod' else 'weekly'],
+                MONITORING_ENABLED_TAG
+            ]
+        }
     
     def generate_ebs_volumes(self, count: int = 25, ec2_instances: List[Dict[str, Any]] = []) -> List[Dict[str, Any]]:
         """生成 EBS 磁碟"""
-        volumes = []
-        
         # 篩選出可附加的實例
         attachable_instances = [inst for inst in ec2_instances if inst['State']['Name'] != 'terminated']
+        volume_ids = self.bulk_id_gen('vol', count)
+        volume_states = random.choices(('available', 'in-use', 'creating', 'deleting'), k=count)
+        volume_types = random.choices(self.volume_types, k=count)
+        sizes = random.choices(range(8, 1001), k=count)  # 8GB 到 1TB
+        encrypted = random.choices((True, False), weights=(8, 2), k=count)  # 80% 加密
+        has_kms_key = random.choices((True, False), weights=(7, 3), k=count)
+        regions = random.choices(self.regions, k=count)
+        days_ago = _iso_days_ago(datetime.now())
         
-        for i in range(count):
-            volume_state = random.choice(['available', 'in-use', 'creating', 'deleting'])
-            volume_id = self.id_gen('vol')
-            volume_type = random.choice(self.volume_types)
-            size = random.randint(8, 1000)  # 8GB 到 1TB
-            
-            volume = {
-                'VolumeId': volume_id,
-                'Size': size,
-                'VolumeType': volume_type,
-                'State': volume_state,
-                'Encrypted': random.random() > 0.2,  # 80% 加密
-                'KmsKeyId': f'arn:aws:kms:us-east-1:{self.account_id}:key/{self.id_gen("key")}' if random.random() > 0.3 else None,
-                'Region': random.choice(self.regions),
-                'Arn': _generate_arn(self.partition, 'ec2', 'us-east-1', self.account_id, f"volume/{volume_id}"),
-                'Tags': [
-                    {'Key': 'Name', 'Value': f'volume-{i+1:03d}'},
-                    {'Key': 'Type', 'Value': volume_type},
-                    {'Key': 'Backup', 'Value': 'enabled' if size > 100 else 'disabled'}
-                ]
-            }
-            
-            # 如果是 in-use 狀態，附加到實例
-            if volume_state == 'in-use' and attachable_instances:
-                chosen_instance = random.choice(attachable_instances)
-                volume['Region'] = chosen_instance['Placement']['AvailabilityZone'][:-1]  # 移除 AZ 後綴
-                volume['Attachments'] = [{
-                    'InstanceId': chosen_instance['InstanceID'],
-                    'Device': '/dev/sdf',
-                    'State': 'attached',
-                    'AttachTime': (datetime.now() - timedelta(days=random.randint(1, 50))).isoformat()
-                }]
-            
-            volumes.append(volume)
+        columns = zip(volume_ids, volume_states, volume_types, sizes, encrypted, has_kms_key, regions)
+        return [
+            self._build_ebs_volume(i, *row, attachable_instances, days_ago)
+            for i, row in enumerate(columns)
+        ]
+    
+    def _build_ebs_volume(self, i: int, volume_id: str, volume_state: str, volume_type: str, size: int,
+                          encrypted: bool, has_kms_key: bool, region: str,
+                          attachable_instances: List[Dict[str, Any]], days_ago: Callable[[int], str]) -> Dict[str, Any]:
+        """建立第 i 顆 EBS 磁碟，in-use 狀態時附加到隨機實例"""
+        
+        volume = {
+            'VolumeId': volume_id,
+            'Size': size,
+            'VolumeType': volume_type,
+            'State': volume_state,
+            'Encrypted': encrypted,
+            'KmsKeyId': f'arn:aws:kms:us-east-1:{self.account_id}:key/{self.id_gen("key")}' if has_kms_key else None,
+            'Region': region,
+            'Arn': self._arn('ec2', 'us-east-1', f"volume/{volume_id}"),
+            'Tags': [
+                {'Key': 'Name', 'Value': f'volume-{i+1:03d}'},
+                {'Key': 'Type', 'Value': volume_type},
+                BACKUP_TAGS['enabled' if size > 100 else 'disabled']
+            ]
+        }
         
-        return volumes
+        # 如果是 in-use 狀態，附加到實例
+        if volume_state == 'in-use' and attachable_instances:
+            chosen_instance = random.choice(attachable_instances)
+            volume['Region'] = chosen_instance['Placement']['AvailabilityZone'][:-1]  # 移除 AZ 後綴
+            volume['Attachments'] = [{
+                'InstanceId': chosen_instance['InstanceID'],
+                'Device': '/dev/sdf',
+                'State': 'attached',
+                'AttachTime': days_ago(random.randint(1, 50))
+            }]
+        
+        return volume
     
     def generate_rds_instances(self, count: int = 8, vpcs: List[Dict[str, Any]] = [], subnets: List[Dict[str, Any]] = []) -> List[Dict[str, Any]]:
         """生成 RDS 實例"""
-        rds_instances = []
-        db_engines = ['mysql', 'postgres', 'oracle', 'sqlserver', 'mariadb']
-        
-        for i in range(count):
-            vpc = random.choice(vpcs) if vpcs else {'VpcId': self.id_gen('vpc'), 'Region': random.choice(self.regions)}
-            region = vpc['Region']
-            
-            db_identifier = f'db-{random.choice(["prod", "staging", "dev"])}-{i+1:02d}'
-            engine = random.choice(db_engines)
-            
-            rds = {
-                'DBInstanceIdentifier': db_identifier,
-                'DBInstanceClass': random.choice(['db.t3.micro', 'db.t3.small', 'db.r5.large', 'db.m5.xlarge']),
-                'Engine': engine,
-                'EngineVersion': f'{random.randint(5, 8)}.{random.randint(0, 9)}.{random.randint(0, 9)}',
-                'DBInstanceStatus': random.choice(['available', 'backing-up', 'modifying']),
-                'MasterUsername': f'admin{random.randint(100, 999)}',
-                'AllocatedStorage': random.randint(20, 1000),
-                'StorageType': random.choice(['gp2', 'gp3', 'io1']),
-                'VpcId': vpc['VpcId'],
-                'Region': region,
-                'Arn': _generate_arn(self.partition, 'rds', region, self.account_id, f"db:{db_identifier}"),
-                'Tags': [
-                    {'Key': 'Name', 'Value': db_identifier},
-                    {'Key': 'Environment', 'Value': 'prod' if 'prod' in db_identifier else 'dev'},
-                    {'Key': 'Backup', 'Value': 'enabled'},
-                    {'Key': 'Monitoring', 'Value': 'enabled'}
-                ]
-            }
-            rds_instances.append(rds)
-        
-        return rds_instances
+        chosen_vpcs = random.choices(vpcs, k=count) if vpcs else [
+            {'VpcId': vpc_id, 'Region': region}
+            for vpc_id, region in zip(self.bulk_id_gen('vpc', count), random.choices(self.regions, k=count))
+        ]
+        digits = iter(random.choices(range(10), k=2 * count))
+        engine_versions = [
+            f'{major}.{minor}.{patch}'
+            for major, minor, patch in zip(random.choices(range(5, 9), k=count), digits, digits)
+        ]
+        
+        columns = zip(
+            chosen_vpcs,
+            random.choices(DEPLOY_ENVIRONMENTS, k=count),
+            random.choices(DB_ENGINES, k=count),
+            random.choices(('db.t3.micro', 'db.t3.small', 'db.r5.large', 'db.m5.xlarge'), k=count),
+            engine_versions,
+            random.choices(('available', 'backing-up', 'modifying'), k=count),
+            random.choices(range(100, 1000), k=count),
+            random.choices(range(20, 1001), k=count),
+            random.choices(('gp2', 'gp3', 'io1'), k=count),
+        )
+        return [self._build_rds_instance(i, *row) for i, row in enumerate(columns)]
+    
+    def _build_rds_instance(self, i: int, vpc: Dict[str, Any], env: str, engine: str, instance_class: str,
+                            engine_version: str, status: str, admin_suffix: int, allocated_storage: int,
+                            storage_type: str) -> Dict[str, Any]:
+        """在選定的 VPC 中建立第 i 個 RDS 實例"""
+        region = vpc['Region']
+        db_identifier = f'db-{env}-{i+1:02d}'
+        
+        return {
+            'DBInstanceIdentifier': db_identifier,
+            'DBInstanceClass': instance_class,
+            'Engine': engine,
+            'EngineVersion': engine_version,
+            'DBInstanceStatus': status,
+            'MasterUsername': f'admin{admin_suffix}',
+            'AllocatedStorage': allocated_storage,
+            'StorageType': storage_type,
+            'VpcId': vpc['VpcId'],
+            'Region': region,
+            'Arn': self._arn('rds', region, f"db:{db_identifier}"),
+            'Tags': [
+                {'Key': 'Name', 'Value': db_identifier},
+                ENVIRONMENT_TAGS['prod' if 'prod' in db_identifier else 'dev'],
+                BACKUP_TAGS['enabled'],
+                MONITORING_ENABLED_TAG
+            ]
+        }
     
     def generate_load_balancers(self, count: int = 8, vpcs: List[Dict[str, Any]] = []) -> List[Dict[str, Any]]:
         """生成負載平衡器"""
-        load_balancers = []
-        
-        for i in range(count):
-            vpc = random.choice(vpcs) if vpcs else {'VpcId': self.id_gen('vpc'), 'Region': random.choice(self.regions)}
-            region = vpc['Region']
-            
-            lb_name = f'lb-{random.choice(["web", "api", "internal"])}-{i+1:02d}'
-            lb_id = self.id_gen('lb')
-            
-            lb = {
-                'LoadBalancerId': lb_id,
-                'LoadBalancerName': lb_name,
-                'DNSName': f'{lb_id}.{region}.elb.amazonaws.com',
-                'State': random.choice(['active', 'provisioning']),
-                'Type': random.choice(['application', 'network', 'gateway']),
-                'Scheme': random.choice(['internet-facing', 'internal']),
-                'VpcId': vpc['VpcId'],
-                'Region': region,
-                'Arn': _generate_arn(self.partition, 'elasticloadbalancing', region, self.account_id, f"loadbalancer/{lb_id}"),
-                'Tags': [
-                    {'Key': 'Name', 'Value': lb_name},
-                    {'Key': 'Type', 'Value': 'load-balancer'},
-                    {'Key': 'Environment', 'Value': random.choice(['prod', 'staging', 'dev'])}
-                ]
-            }
-            load_balancers.append(lb)
-        
-        return load_balancers
+        return [self._build_load_balancer(i, lb_id, vpcs) for i, lb_id in enumerate(self.bulk_id_gen('lb', count))]
+    
+    def _build_load_balancer(self, i: int, lb_id: str, vpcs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """在隨機選出的 VPC 中建立第 i 個負載平衡器"""
+        vpc = random.choice(vpcs) if vpcs else {'VpcId': self.id_gen('vpc'), 'Region': random.choice(self.regions)}
+        region = vpc['Region']
+        
+        lb_name = f'lb-{random.choice(("web", "api", "internal"))}-{i+1:02d}'
+        
+        return {
+            'LoadBalancerId': lb_id,
+            'LoadBalancerName': lb_name,
+            'DNSName': f'{lb_id}.{region}.elb.amazonaws.com',
+            'State': random.choice(('active', 'provisioning')),
+            'Type': random.choice(('application', 'network', 'gateway')),
+            'Scheme': random.choice(('internet-facing', 'internal')),
+            'VpcId': vpc['VpcId'],
+            'Region': region,
+            'Arn': self._arn('elasticloadbalancing', region, f"loadbalancer/{lb_id}"),
+            'Tags': [
+                {'Key': 'Name', 'Value': lb_name},
+                LOAD_BALANCER_TYPE_TAG,
+                ENVIRONMENT_TAGS[random.choice(DEPLOY_ENVIRONMENTS)]
+            ]
+        }
     
     def generate_s3_buckets(self, count: int = 12) -> List[Dict[str, Any]]:
         """生成 S3 儲存桶"""
-        buckets = []
-        bucket_purposes = ['logs', 'backups', 'static-assets', 'data-lake', 'documents', 'images', 'videos', 'archives']
-        
-        for i in range(count):
-            purpose = random.choice(bucket_purposes)
-            bucket_name = f'company-{purpose}-{random.randint(1000, 9999)}'
-            region = random.choice(self.regions)
-            
-            bucket = {
-                'BucketName': bucket_name,
-                'CreationDate': (datetime.now() - timedelta(days=random.randint(1, 1000))).isoformat(),
-                'Region': region,
-                'Arn': _generate_arn(self.partition, 's3', '', '', bucket_name),
-                'Tags': [
-                    {'Key': 'Name', 'Value': bucket_name},
-                    {'Key': 'Purpose', 'Value': purpose},
-                    {'Key': 'Environment', 'Value': random.choice(['prod', 'staging', 'dev'])},
-                    {'Key': 'Retention', 'Value': '7-years' if purpose == 'archives' else '1-year'}
-                ]
-            }
-            buckets.append(bucket)
-        
-        return buckets
+        days_ago = _iso_days_ago(datetime.now())
+        return [self._build_s3_bucket(days_ago) for _ in range(count)]
+    
+    def _build_s3_bucket(self, days_ago: Callable[[int], str]) -> Dict[str, Any]:
+        """建立一個用途隨機的 S3 儲存桶"""
+        purpose = random.choice(BUCKET_PURPOSES)
+        bucket_name = f'company-{purpose}-{random.randint(1000, 9999)}'
+        region = random.choice(self.regions)
+        
+        return {
+            'BucketName': bucket_name,
+            'CreationDate': days_ago(random.randint(1, 1000)),
+            'Region': region,
+            'Arn': _generate_arn(self.partition, 's3', '', '', bucket_name),
+            'Tags': [
+                {'Key': 'Name', 'Value': bucket_name},
+                {'Key': 'Purpose', 'Value': purpose},
+                ENVIRONMENT_TAGS[random.choice(DEPLOY_ENVIRONMENTS)],
+                RETENTION_TAGS['7-years' if purpose == 'archives' else '1-year']
+            ]
+        }
     
     def generate_lambda_functions(self, count: int = 10) -> List[Dict[str, Any]]:
         """生成 Lambda 函數"""
-        functions = []
-        function_names = ['data-processor', 'image-resizer', 'email-sender', 'notification-handler', 
-                         'api-handler', 'scheduled-task', 'event-processor', 'webhook-handler']
-        
-        for i in range(count):
-            func_name = random.choice(function_names)
-            function_name = f'{func_name}-{random.choice(["prod", "staging", "dev"])}-{i+1:02d}'
-            region = random.choice(self.regions)
-            
-            function = {
-                'FunctionName': function_name,
-                'FunctionArn': _generate_arn(self.partition, 'lambda', region, self.account_id, f"function:{function_name}"),
-                'Runtime': random.choice(['python3.9', 'python3.8', 'nodejs18.x', 'java11', 'go1.x']),
-                'Handler': 'index.handler',
-                'CodeSize': random.randint(1000, 50000000),
-                'Description': f'Lambda function for {func_name}',
-                'Timeout': random.randint(3, 900),
-                'MemorySize': random.choice([128, 256, 512, 1024, 2048]),
-                'LastModified': (datetime.now() - timedelta(days=random.randint(1, 30))).isoformat(),
-                'Region': region,
-                'Tags': [
-                    {'Key': 'Name', 'Value': function_name},
-                    {'Key': 'Purpose', 'Value': func_name},
-                    {'Key': 'Environment', 'Value': random.choice(['prod', 'staging', 'dev'])}
-                ]
-            }
-            functions.append(function)
-        
-        return functions
+        days_ago = _iso_days_ago(datetime.now())
+        return [self._build_lambda_function(i, days_ago) for i in range(count)]
+    
+    def _build_lambda_function(self, i: int, days_ago: Callable[[int], str]) -> Dict[str, Any]:
+        """建立第 i 個 Lambda 函數"""
+        func_name = random.choice(LAMBDA_FUNCTION_NAMES)
+        env = random.choice(DEPLOY_ENVIRONMENTS)
+        function_name = f'{func_name}-{env}-{i+1:02d}'
+        region = random.choice(self.regions)
+        
+        return {
+            'FunctionName': function_name,
+            'FunctionArn': self._arn('lambda', region, f"function:{function_name}"),
+            'Runtime': random.choice(('python3.9', 'python3.8', 'nodejs18.x', 'java11', 'go1.x')),
+            'Handler': 'index.handler',
+            'CodeSize': random.randint(1000, 50000000),
+            'Description': f'Lambda function for {func_name}',
+            'Timeout': random.randint(3, 900),
+            'MemorySize': random.choice((128, 256, 512, 1024, 2048)),
+            'LastModified': days_ago(random.randint(1, 30)),
+            'Region': region,
+            'Tags': [
+                {'Key': 'Name', 'Value': function_name},
+                {'Key': 'Purpose', 'Value': func_name},
+                ENVIRONMENT_TAGS[env]
+            ]
+        }
     
     def generate_complete_dataset(self) -> Dict[str, Any]:
         """生成完整的模擬資料集"""
         print("生成增強版模擬 AWS 資料...")
         
         # 按順序生成資源以確保關聯性
-        vpcs = self.generate_vpcs(5)
+        counts = self.resource_counts
+        vpcs = self.generate_vpcs(counts['vpcs'])
         subnets = self.generate_subnets(vpcs)
-        security_groups = self.generate_security_groups(15, vpcs)
+        security_groups = self.generate_security_groups(counts['security_groups'], vpcs)
         security_rules = self.generate_security_rules(security_groups)
-        ec2_instances = self.generate_ec2_instances(30, vpcs, subnets, security_groups)
-        ebs_volumes = self.generate_ebs_volumes(25, ec2_instances)
-        rds_instances = self.generate_rds_instances(8, vpcs, subnets)
-        load_balancers = self.generate_load_balancers(8, vpcs)
-        s3_buckets = self.generate_s3_buckets(12)
-        lambda_functions = self.generate_lambda_functions(10)
+        ec2_instances = self.generate_ec2_instances(counts['ec2_instances'], vpcs, subnets, security_groups)
+        ebs_volumes = self.generate_ebs_volumes(counts['ebs_volumes'], ec2_instances)
+        load_balancers, s3_buckets, rds_instances, lambda_functions = self._generate_independent_sections(vpcs, subnets)
         
         # 組合完整資料集
         dataset = {
-            'metadata': {
-                'extraction_time': datetime.now().isoformat(),
-                'account_id': self.account_id,
-                'data_type': 'enhanced_mock_data',
-                'version': '2.0',
-                'description': 'Enhanced mock AWS data with realistic relationships and security rules'
-            },
+            'metadata': self._build_metadata(),
             'ec2_instances': {
                 'Reservations': [{
-                    'ReservationId': self.id_gen('r'),
-                    'OwnerId': self.account_id,
-                    'Groups': [],
+                    **self._build_reservation(),
                     'Instances': ec2_instances
                 }]
             },
@@ -493,42 +660,166 @@ class EnhancedMockAWSDataGenerator:
             'vpcs': {'Vpcs': vpcs},
             'subnets': {'Subnets': subnets},
             'load_balancers': {'LoadBalancers': load_balancers},
-            's3_buckets': {'Buckets': s3_buckets, 'Owner': {'DisplayName': 'mock-owner', 'ID': 'mock-owner-id'}},
+            's3_buckets': {'Buckets': s3_buckets, 'Owner': S3_OWNER},
             'ebs_volumes': {'Volumes': ebs_volumes},
             'rds_instances': {'DBInstances': rds_instances},
             'lambda_functions': {'Functions': lambda_functions}
         }
         
-        print(f"生成完成:")
-        print(f"- EC2 實例: {len(ec2_instances)}")
-        print(f"- 安全群組: {len(security_groups)}")
-        print(f"- 安全規則: {len(security_rules)}")
-        print(f"- VPC: {len(vpcs)}")
-        print(f"- 子網路: {len(subnets)}")
-        print(f"- EBS 磁碟: {len(ebs_volumes)}")
-        print(f"- RDS 實例: {len(rds_instances)}")
-        print(f"- 負載平衡器: {len(load_balancers)}")
-        print(f"- S3 儲存桶: {len(s3_buckets)}")
-        print(f"- Lambda 函數: {len(lambda_functions)}")
+        self._print_summary(len(ec2_instances), len(security_groups), len(security_rules), len(vpcs), len(subnets),
+                            len(ebs_volumes), len(rds_instances), len(load_balancers), len(s3_buckets), len(lambda_functions))
         
         return dataset
-
+    
+    def write_msgpack_dataset(self, output_file: str) -> None:
+        """
+        生成模擬資料集並以 MessagePack 二進位格式寫入檔案
+        
+        數值欄位以固定長度編碼，檔案比 JSON 小，重複載入時也不必解析數字字串。
+        需要安裝 ormsgpack，讀取端以 ormsgpack.unpackb() 還原為相同的字典結構。
+        """
+        if not ORMSGPACK_AVAILABLE:
+            raise RuntimeError("輸出 MessagePack 需要安裝 ormsgpack: pip install ormsgpack")
+        
+        dataset = self.generate_complete_dataset()
+        with open(output_file, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(ormsgpack.packb(dataset))
+    
+    def write_complete_dataset(self, output_file: str) -> None:
+        """
+        生成模擬資料集並逐筆串流寫入 JSON 檔案
+        
+        VPC、子網路、安全群組與 EC2 實例會被其他資源參照，需要先建立；
+        其餘資源在寫入該區段前才生成，寫完即釋放，不會同時留在記憶體中。
+        """
+        print("生成增強版模擬 AWS 資料...")
+        
+        counts = self.resource_counts
+        vpcs = self.generate_vpcs(counts['vpcs'])
+        subnets = self.generate_subnets(vpcs)
+        security_groups = self.generate_security_groups(counts['security_groups'], vpcs)
+        ec2_instances = self.generate_ec2_instances(counts['ec2_instances'], vpcs, subnets, security_groups)
+        independent_sections = self._generate_independent_sections(vpcs, subnets)
+        
+        with open(output_file, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(b'{"metadata":')
+            f.write(_encode_json(self._build_metadata()))
+            f.write(b',\n"ec2_instances":{"Reservations":[')
+            # 去掉 Reservation 物件結尾的 '}'，接著寫入 Instances 陣列
+            f.write(_encode_json(self._build_reservation())[:-1])
+            f.write(b',"Instances":')
+            _write_json_array(f, ec2_instances)
+            f.write(b'}]},\n"security_groups":{"SecurityGroups":')
+            _write_json_array(f, security_groups)
+            f.write(b'},\n"security_rules":{"Rules":')
+            rule_count = _write_json_array(f, self.generate_security_rules(security_groups))
+            f.write(b'},\n"vpcs":{"Vpcs":')
+            _write_json_array(f, vpcs)
+            f.write(b'},\n"subnets":{"Subnets":')
+            _write_json_array(f, subnets)
+            f.write(b'},\n"load_balancers":{"LoadBalancers":')
+            lb_count = _write_json_array(f, next(independent_sections))
+            f.write(b'},\n"s3_buckets":{"Buckets":')
+            bucket_count = _write_json_array(f, next(independent_sections))
+            f.write(b',"Owner":')
+            f.write(_encode_json(S3_OWNER))
+            f.write(b'},\n"ebs_volumes":{"Volumes":')
+            volume_count = _write_json_array(f, self.generate_ebs_volumes(counts['ebs_volumes'], ec2_instances))
+            f.write(b'},\n"rds_instances":{"DBInstances":')
+            rds_count = _write_json_array(f, next(independent_sections))
+            f.write(b'},\n"lambda_functions":{"Functions":')
+            lambda_count = _write_json_array(f, next(independent_sections))
+            f.write(b'}}\n')
+        
+        self._print_summary(len(ec2_instances), len(security_groups), rule_count, len(vpcs), len(subnets),
+                            volume_count, rds_count, lb_count, bucket_count, lambda_count)
+    
+    def _generate_independent_sections(self, vpcs: List[Dict[str, Any]],
+                                       subnets: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        依序產出負載平衡器、S3 儲存桶、RDS 實例與 Lambda 函數
+        
+        這四類資源只讀取 VPC 與子網路，彼此沒有相依性。workers 大於 1 時
+        同時交給多個行程生成；否則在取用時才逐一生成。
+        """
+        counts = self.resource_counts
+        tasks = (
+            (self.generate_load_balancers, counts['load_balancers'], vpcs),
+            (self.generate_s3_buckets, counts['s3_buckets']),
+            (self.generate_rds_instances, counts['rds_instances'], vpcs, subnets),
+            (self.generate_lambda_functions, counts['lambda_functions']),
+        )
+        
+        if self.workers <= 1:
+            for generate, *args in tasks:
+                yield generate(*args)
+            return
+        
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks)), initializer=_init_worker) as executor:
+            futures = [executor.submit(generate, *args) for generate, *args in tasks]
+            for future in futures:
+                yield future.result()
+    
+    def _build_metadata(self) -> Dict[str, Any]:
+        """建立資料集的中繼資料"""
+        return {
+            'extraction_time': datetime.now().isoformat(),
+            'account_id': self.account_id,
+            'data_type': 'enhanced_mock_data',
+            'version': '2.0',
+            'description': 'Enhanced mock AWS data with realistic relationships and security rules'
+        }
+    
+    def _build_reservation(self) -> Dict[str, Any]:
+        """建立 EC2 Reservation 的欄位（不含 Instances）"""
+        return {
+            'ReservationId': self.id_gen('r'),
+            'OwnerId': self.account_id,
+            'Groups': []
+        }
+    
+    def _print_summary(self, ec2_count: int, sg_count: int, rule_count: int, vpc_count: int, subnet_count: int,
+                       volume_count: int, rds_count: int, lb_count: int, bucket_count: int, lambda_count: int) -> None:
+        """輸出生成結果統計"""
+        print(f"生成完成:")
+        print(f"- EC2 實例: {ec2_count}")
+        print(f"- 安全群組: {sg_count}")
+        print(f"- 安全規則: {rule_count}")
+        print(f"- VPC: {vpc_count}")
+        print(f"- 子網路: {subnet_count}")
+        print(f"- EBS 磁碟: {volume_count}")
+        print(f"- RDS 實例: {rds_count}")
+        print(f"- 負載平衡器: {lb_count}")
+        print(f"- S3 儲存桶: {bucket_count}")
+        print(f"- Lambda 函數: {lambda_count}")
 
 def main():
     """主函數"""
-    generator = EnhancedMockAWSDataGenerator()
-    dataset = generator.generate_complete_dataset()
+    parser = argparse.ArgumentParser(description='增強版模擬 AWS 資料生成器')
+    parser.add_argument('--format', choices=['json', 'msgpack'], default='json',
+                        help='輸出格式（msgpack 需要安裝 ormsgpack）')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='平行生成彼此獨立資源的行程數（預設 1，即不使用多行程）')
+    args = parser.parse_args()
     
-    # 儲存到檔案
-    output_file = 'data/raw/enhanced_mock_aws_resources.json'
-    import os
-    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    generator = EnhancedMockAWSDataGenerator(workers=args.workers)
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(dataset, f, indent=2, ensure_ascii=False)
+    # 儲存到檔案
+    if args.format == 'msgpack':
+        if not ORMSGPACK_AVAILABLE:
+            print("輸出 MessagePack 需要安裝 ormsgpack: pip install ormsgpack")
+            return 1
+        output_file = MSGPACK_OUTPUT_FILE
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        generator.write_msgpack_dataset(output_file)
+    else:
+        output_file = OUTPUT_FILE
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        generator.write_complete_dataset(output_file)
     
     print(f"\n增強版模擬資料已儲存至: {output_file}")
+    return 0
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
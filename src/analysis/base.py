@@ -0,0 +1,183 @@
+"""
+分析器共用模組
+
+資安、故障衝擊與成本分析器共用的連線與查詢輔助功能：
+- 以驅動程式連線池建立唯讀 session
+- 受管理讀取交易與查詢結果轉換
+- 查詢結果快取（TTL + LRU，refresh() 清除）
+- 摘要查詢共用的執行緒池
+- 各類資源節點數量統計
+"""
+
+import copy
+import functools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Hashable, Optional, Tuple, Type, TypeVar
+from neo4j import GraphDatabase, READ_ACCESS
+from neo4j.exceptions import ClientError
+from loguru import logger
+
+from ..data_models import get_all_schemas
+
+
+AnalyzerT = TypeVar('AnalyzerT', bound='BaseAnalyzer')
+
+# 各分析器摘要中互不相依的查詢共用的執行緒池；驅動程式可跨執行緒使用，每個工作各自開啟 session
+_QUERY_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix='analysis-query')
+
+# 查詢結果快取的有效秒數與筆數上限；圖資料通常只在重新載入時變更，載入後由 refresh() 清除
+RESULT_CACHE_TTL = 60.0
+RESULT_CACHE_MAXSIZE = 128
+
+
+def fetch_dicts(session, query: str, **params) -> List[Dict[str, Any]]:
+    """執行查詢並以欄位名稱搭配各列的值組成字典，省去逐筆透過 Record 對映介面建立字典"""
+    result = session.run(query, **params)
+    keys = result.keys()
+    return [dict(zip(keys, row)) for row in result.values()]
+
+
+def plan_operators(plan: Dict[str, Any]) -> List[str]:
+    """將執行計畫樹（EXPLAIN 的 plan 或 PROFILE 的 profile）依先序攤平為運算子名稱清單（去除 @runtime 後綴）"""
+    operators = [plan['operatorType'].split('@')[0]]
+    for child in plan.get('children', []):
+        operators.extend(plan_operators(child))
+    return operators
+
+
+def cached_result(method: Callable) -> Callable:
+    """
+    將分析器方法的結果依 (方法名稱, 參數) 存入共用的查詢結果快取
+    
+    只用於查詢失敗時會拋出例外的方法，錯誤不會被當成結果暫存。
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__qualname__, args, tuple(sorted(kwargs.items())))
+        return self._cached(key, lambda: method(self, *args, **kwargs))
+    
+    return wrapper
+
+
+class BaseAnalyzer:
+    """分析器基礎類別"""
+    
+    def __init__(self, driver, database: Optional[str] = None):
+        """初始化分析器"""
+        self.driver = driver
+        self.database = database
+        # 是否可使用 APOC 程序；None 表示尚未偵測
+        self._apoc_available: Optional[bool] = None
+        # 查詢結果快取：{鍵: (寫入時間, 結果)}，依使用順序淘汰
+        self._result_cache: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._result_cache_lock = threading.Lock()
+    
+    @classmethod
+    def from_uri(cls: Type[AnalyzerT], uri: str, auth: Tuple[str, str], *, database: Optional[str] = None,
+                 pool_size: int = 50, acquisition_timeout: float = 30.0) -> AnalyzerT:
+        """
+        自行建立設定好連線池的驅動程式（單獨執行分析時使用）
+        
+        Args:
+            uri: Neo4j 連線 URI
+            auth: (使用者名稱, 密碼)
+            database: 資料庫名稱，指定後 session 不必再查詢預設資料庫
+            pool_size: 連線池上限
+            acquisition_timeout: 等待連線池釋出連線的秒數上限
+        """
+        driver = GraphDatabase.driver(
+            uri, auth=auth,
+            max_connection_pool_size=pool_size,
+            connection_acquisition_timeout=acquisition_timeout,
+            connection_timeout=10
+        )
+        return cls(driver, database)
+    
+    def _session(self):
+        """從驅動程式的連線池取得唯讀 session"""
+        return self.driver.session(database=self.database, default_access_mode=READ_ACCESS)
+    
+    def _read(self, query: str, **params) -> List[Dict[str, Any]]:
+        """以受管理的讀取交易執行查詢；遇到暫時性錯誤時由驅動程式自動重試"""
+        with self._session() as session:
+            return session.execute_read(fetch_dicts, query, **params)
+    
+    def _cached_read(self, query: str, **params) -> List[Dict[str, Any]]:
+        """與 _read 相同，但結果依 (查詢文字, 參數) 存入查詢結果快取"""
+        key = (query, tuple(sorted((name, repr(value)) for name, value in params.items())))
+        return self._cached(key, lambda: self._read(query, **params))
+    
+    def _cached(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        在 RESULT_CACHE_TTL 秒內以相同的鍵再次呼叫時直接回傳暫存的結果
+        
+        compute 拋出例外時不會寫入快取。回傳的是暫存結果的複本，呼叫端修改結果不會影響之後的命中。
+        """
+        now = time.monotonic()
+        with self._result_cache_lock:
+            cached = self._result_cache.get(key)
+            if cached is not None and now - cached[0] < RESULT_CACHE_TTL:
+                self._result_cache.move_to_end(key)
+                return copy.deepcopy(cached[1])
+        
+        value = compute()
+        
+        with self._result_cache_lock:
+            self._result_cache[key] = (time.monotonic(), value)
+            self._result_cache.move_to_end(key)
+            while len(self._result_cache) > RESULT_CACHE_MAXSIZE:
+                self._result_cache.popitem(last=False)
+        return copy.deepcopy(value)
+    
+    def refresh(self) -> None:
+        """清除快取的查詢結果（重新載入資料後呼叫）"""
+        with self._result_cache_lock:
+            self._result_cache.clear()
+    
+    @staticmethod
+    def _submit(fn: Callable, *args, **kwargs) -> Future:
+        """將互不相依的查詢交給共用執行緒池，與目前執行緒的查詢同時進行"""
+        return _QUERY_EXECUTOR.submit(fn, *args, **kwargs)
+    
+    def _count_resource_labels(self) -> Dict[str, int]:
+        """
+        統計各類資源的節點數量（依數量由多到少排序，略過數量為 0 者）
+        
+        只計入 get_all_schemas() 中的資源標籤；SchemaVersion、OpenToWorld 等輔助標籤不算資源。
+        優先使用 apoc.meta.stats() 直接讀取資料庫維護的標籤計數；
+        未安裝 APOC 時改為逐一標籤計數（同樣由計數儲存提供，不必掃描全部節點）。
+        """
+        resource_labels = get_all_schemas()
+        with self._session() as session:
+            label_counts = None
+            if self._apoc_available is not False:
+                try:
+                    label_counts = session.run(
+                        "CALL apoc.meta.stats() YIELD labels RETURN labels"
+                    ).single()['labels']
+                    self._apoc_available = True
+                except ClientError as e:
+                    logger.debug(f"apoc.meta.stats 不可用，改用逐一標籤計數: {e}")
+                    self._apoc_available = False
+            
+            if label_counts is None:
+                labels = [
+                    label for label in session.run("CALL db.labels() YIELD label RETURN label").value()
+                    if label in resource_labels
+                ]
+                if not labels:
+                    return {}
+                query = "\nUNION ALL\n".join(
+                    f"MATCH (n:`{label}`) RETURN $labels[{i}] AS Label, count(n) AS Count"
+                    for i, label in enumerate(labels)
+                )
+                label_counts = dict(session.run(query, labels=labels).values('Label', 'Count'))
+        
+        return {
+            label: count
+            for label, count in sorted(label_counts.items(), key=lambda item: item[1], reverse=True)
+            if count and label in resource_labels
+        }
@@ -9,25 +9,30 @@
 """
 
 from typing import List, Dict, Any, Optional
-from neo4j import GraphDatabase
 from loguru import logger
 
+from .base import BaseAnalyzer, cached_result, fetch_dicts, plan_operators
 
-class CostOptimizationAnalyzer:
-    """成本優化分析器"""
-    
-    def __init__(self, driver):
-        """初始化分析器"""
-        self.driver = driver
-    
-    def find_orphaned_ebs_volumes(self) -> List[Dict[str, Any]]:
-        """
-        找出孤兒 EBS 磁碟（未附加到任何 EC2 實例）
-        
-        Returns:
-            孤兒 EBS 磁碟清單
+
+# 容量超過此值（GB）的 EBS 磁碟視為高 IOPS 的昂貴資源；以參數傳入查詢，門檻調整不影響執行計畫快取
+HIGH_IOPS_MIN_SIZE_GB = 100
+
+# 運行中的大型實例：先由 EC2Instance(state) 索引找出運行中的實例，子字串比對只套用在這些實例上
+LARGE_INSTANCES_QUERY = """
+        MATCH (instance:EC2Instance)
+        WHERE instance.state = 'running'
+          AND instance.instancetype CONTAINS 'large'  // 已涵蓋 xlarge、2xlarge 等規格
+        RETURN 
+            instance.name AS InstanceName,
+            instance.instanceid AS InstanceID,
+            instance.instancetype AS InstanceType,
+            instance.region AS Region
+        ORDER BY instance.instancetype
         """
-        query = """
+
+
+# 孤兒 EBS 磁碟（未附加到任何 EC2 實例），依容量由大到小排序
+ORPHANED_VOLUMES_QUERY = """
         MATCH (volume:EBSVolume)
         WHERE NOT (volume)-[:ATTACHES_TO]->(:EC2Instance)
         RETURN 
@@ -38,65 +43,96 @@ class CostOptimizationAnalyzer:
             volume.region AS Region
         ORDER BY volume.size DESC
         """
+
+# 未被任何 EC2 實例使用的安全群組
+UNUSED_SECURITY_GROUPS_QUERY = """
+        MATCH (sg:SecurityGroup)
+        WHERE NOT (sg)<-[:IS_MEMBER_OF]-(:EC2Instance)
+        RETURN 
+            sg.name AS GroupName,
+            sg.groupid AS GroupID,
+            sg.description AS Description,
+            sg.vpcid AS VpcId,
+            COUNT { (sg)-[:HAS_RULE]->() } AS RuleCount
+        ORDER BY sg.name
+        """
+
+# 已停止的 EC2 實例，依啟動時間由新到舊排序
+STOPPED_INSTANCES_QUERY = """
+        MATCH (instance:EC2Instance)
+        WHERE instance.state = 'stopped'
+        RETURN 
+            instance.name AS InstanceName,
+            instance.instanceid AS InstanceID,
+            instance.instancetype AS InstanceType,
+            instance.launchtime AS LaunchTime,
+            instance.region AS Region
+        ORDER BY instance.launchtime DESC
+        """
+
+
+class CostOptimizationAnalyzer(BaseAnalyzer):
+    """成本優化分析器"""
+    
+    def find_orphaned_ebs_volumes(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        找出孤兒 EBS 磁碟（未附加到任何 EC2 實例）
+        
+        Args:
+            limit: 只取排序後的前幾筆；None 表示全部
+        
+        Returns:
+            孤兒 EBS 磁碟清單
+        """
+        query = ORPHANED_VOLUMES_QUERY
+        if limit is not None:
+            # 在資料庫端截斷，只傳回需要的筆數
+            query += "LIMIT $limit\n"
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query)
-                return [dict(record) for record in result]
+            return self._cached_read(query, limit=limit)
         except Exception as e:
             logger.error(f"查詢孤兒 EBS 磁碟失敗: {e}")
             return []
     
-    def find_unused_security_groups(self) -> List[Dict[str, Any]]:
+    def find_unused_security_groups(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         找出未使用的安全群組
         
+        Args:
+            limit: 只取排序後的前幾筆；None 表示全部
+        
         Returns:
             未使用安全群組清單
         """
-        query = """
-        MATCH (sg:SecurityGroup)
-        WHERE NOT (sg)<-[:IS_MEMBER_OF]-(:EC2Instance)
-        RETURN 
-            sg.name AS GroupName,
-            sg.groupid AS GroupID,
-            sg.description AS Description,
-            sg.vpcid AS VpcId,
-            COUNT { (sg)-[:HAS_RULE]->() } AS RuleCount
-        ORDER BY sg.name
-        """
+        query = UNUSED_SECURITY_GROUPS_QUERY
+        if limit is not None:
+            # 在資料庫端截斷，只傳回需要的筆數
+            query += "LIMIT $limit\n"
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query)
-                return [dict(record) for record in result]
+            return self._cached_read(query, limit=limit)
         except Exception as e:
             logger.error(f"查詢未使用安全群組失敗: {e}")
             return []
     
-    def find_stopped_instances(self) -> List[Dict[str, Any]]:
+    def find_stopped_instances(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         找出已停止的 EC2 實例
         
+        Args:
+            limit: 只取排序後的前幾筆；None 表示全部
+        
         Returns:
             已停止實例清單
         """
-        query = """
-        MATCH (instance:EC2Instance)
-        WHERE instance.state = 'stopped'
-        RETURN 
-            instance.name AS InstanceName,
-            instance.instanceid AS InstanceID,
-            instance.instancetype AS InstanceType,
-            instance.launchtime AS LaunchTime,
-            instance.region AS Region
-        ORDER BY instance.launchtime DESC
-        """
+        query = STOPPED_INSTANCES_QUERY
+        if limit is not None:
+            # 在資料庫端截斷，只傳回需要的筆數
+            query += "LIMIT $limit\n"
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query)
-                return [dict(record) for record in result]
+            return self._cached_read(query, limit=limit)
         except Exception as e:
             logger.error(f"查詢已停止實例失敗: {e}")
             return []
@@ -124,13 +160,11 @@ class CostOptimizationAnalyzer:
         """
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query)
-                instances = [dict(record) for record in result]
-                
-                # 這裡可以加入更多邏輯來分析利用率
-                # 例如：檢查實例類型、運行時間等
-                return instances
+            instances = self._read(query)
+            
+            # 這裡可以加入更多邏輯來分析利用率
+            # 例如：檢查實例類型、運行時間等
+            return instances
         except Exception as e:
             logger.error(f"查詢未充分利用實例失敗: {e}")
             return []
@@ -163,14 +197,12 @@ class CostOptimizationAnalyzer:
         """
         
         try:
-            with self.driver.session() as session:
-                # 分析 EBS 磁碟
-                ebs_result = session.run(ebs_query)
-                ebs_analysis = [dict(record) for record in ebs_result]
-                
-                # 分析 S3 儲存桶
-                s3_result = session.run(s3_query)
-                s3_analysis = [dict(record) for record in s3_result]
+            def _storage_tx(tx):
+                # 分析 EBS 磁碟與 S3 儲存桶（同一讀取交易）
+                return fetch_dicts(tx, ebs_query), fetch_dicts(tx, s3_query)
+            
+            with self._session() as session:
+                ebs_analysis, s3_analysis = session.execute_read(_storage_tx)
                 
                 return {
                     'ebs_analysis': ebs_analysis,
@@ -187,26 +219,10 @@ class CostOptimizationAnalyzer:
         Returns:
             昂貴資源清單
         """
-        # 大型實例
-        large_instances_query = """
-        MATCH (instance:EC2Instance)
-        WHERE instance.state = 'running'
-          AND (instance.instancetype CONTAINS 'large' 
-               OR instance.instancetype CONTAINS 'xlarge'
-               OR instance.instancetype CONTAINS '2xlarge'
-               OR instance.instancetype CONTAINS '4xlarge')
-        RETURN 
-            instance.name AS InstanceName,
-            instance.instanceid AS InstanceID,
-            instance.instancetype AS InstanceType,
-            instance.region AS Region
-        ORDER BY instance.instancetype
-        """
-        
         # 高 IOPS 磁碟
         high_iops_volumes_query = """
         MATCH (volume:EBSVolume)
-        WHERE volume.size > 100
+        WHERE volume.size > $min_size
         RETURN 
             volume.volumeid AS VolumeId,
             volume.volumetype AS VolumeType,
@@ -216,123 +232,184 @@ class CostOptimizationAnalyzer:
         """
         
         try:
-            with self.driver.session() as session:
-                # 查詢大型實例
-                large_instances = session.run(large_instances_query)
-                large_instances_list = [dict(record) for record in large_instances]
-                
-                # 查詢高 IOPS 磁碟
-                high_iops_volumes = session.run(high_iops_volumes_query)
-                high_iops_volumes_list = [dict(record) for record in high_iops_volumes]
-                
-                return {
-                    'large_instances': large_instances_list,
-                    'high_iops_volumes': high_iops_volumes_list
-                }
+            def _expensive_tx(tx):
+                # 查詢大型實例與高 IOPS 磁碟（同一讀取交易）
+                return (
+                    fetch_dicts(tx, LARGE_INSTANCES_QUERY),
+                    fetch_dicts(tx, high_iops_volumes_query, min_size=HIGH_IOPS_MIN_SIZE_GB)
+                )
+            
+            def _query():
+                with self._session() as session:
+                    return session.execute_read(_expensive_tx)
+            
+            large_instances_list, high_iops_volumes_list = self._cached('expensive_resources', _query)
+            return {
+                'large_instances': large_instances_list,
+                'high_iops_volumes': high_iops_volumes_list
+            }
         except Exception as e:
             logger.error(f"查詢昂貴資源失敗: {e}")
             return {}
     
-    def calculate_potential_savings(self) -> Dict[str, Any]:
+    def explain_large_instances(self) -> List[str]:
+        """
+        以 EXPLAIN 取得大型實例查詢的執行計畫運算子（不實際執行查詢）
+        
+        用於確認運行中實例由 EC2Instance(state) 索引查找：應出現 NodeIndexSeek，而非 NodeByLabelScan 加 Filter。
+        """
+        with self._session() as session:
+            summary = session.run("EXPLAIN " + LARGE_INSTANCES_QUERY).consume()
+        return plan_operators(summary.plan)
+    
+    @cached_result
+    def _collect_cost_totals(self) -> Dict[str, int]:
+        """
+        以單一查詢取得節省分析與優化建議所需的彙總數字
+        
+        兩者只需要各類資源的數量與孤兒磁碟的總容量，
+        因此直接在資料庫端彙總，只傳回一筆記錄而非整份資源清單。
+        
+        Returns:
+            各項彙總數字的字典
+        """
+        query = """
+        CALL {
+            MATCH (volume:EBSVolume)
+            WHERE NOT (volume)-[:ATTACHES_TO]->(:EC2Instance)
+            RETURN count(volume) AS orphaned_volume_count,
+                   coalesce(sum(volume.size), 0) AS orphaned_storage_gb
+        }
+        CALL {
+            MATCH (sg:SecurityGroup)
+            WHERE NOT (sg)<-[:IS_MEMBER_OF]-(:EC2Instance)
+            RETURN count(sg) AS unused_sg_count
+        }
+        CALL {
+            MATCH (instance:EC2Instance)
+            WHERE instance.state = 'stopped'
+            RETURN count(instance) AS stopped_instance_count
+        }
+        CALL {
+            MATCH (instance:EC2Instance)
+            WHERE instance.state = 'running'
+              AND instance.instancetype CONTAINS 'large'  // 已涵蓋 xlarge、2xlarge 等規格
+            RETURN count(instance) AS large_instance_count
+        }
+        CALL {
+            MATCH (volume:EBSVolume)
+            WHERE volume.size > $min_size
+            RETURN count(volume) AS high_iops_volume_count
+        }
+        RETURN orphaned_volume_count, orphaned_storage_gb, unused_sg_count,
+               stopped_instance_count, large_instance_count, high_iops_volume_count
+        """
+        
+        with self._session() as session:
+            record = session.run(query, min_size=HIGH_IOPS_MIN_SIZE_GB).single()
+            return dict(record)
+    
+    def calculate_potential_savings(self, totals: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """
         計算潛在節省成本
         
+        Args:
+            totals: _collect_cost_totals() 的結果；未提供時自行查詢
+        
         Returns:
             潛在節省分析
         """
         try:
-            with self.driver.session() as session:
-                # 孤兒 EBS 磁碟
-                orphaned_volumes = self.find_orphaned_ebs_volumes()
-                orphaned_storage_gb = sum(vol.get('Size', 0) or 0 for vol in orphaned_volumes)
-                
-                # 未使用安全群組
-                unused_sgs = self.find_unused_security_groups()
-                
-                # 已停止實例
-                stopped_instances = self.find_stopped_instances()
-                
-                # 昂貴資源
-                expensive_resources = self.find_expensive_resources()
-                
-                return {
-                    'orphaned_ebs_volumes': {
-                        'count': len(orphaned_volumes),
-                        'total_size_gb': orphaned_storage_gb,
-                        'estimated_monthly_cost': orphaned_storage_gb * 0.1  # 假設每 GB $0.1/月
-                    },
-                    'unused_security_groups': {
-                        'count': len(unused_sgs),
-                        'potential_savings': len(unused_sgs) * 0.1  # 假設每個安全群組 $0.1/月
-                    },
-                    'stopped_instances': {
-                        'count': len(stopped_instances),
-                        'potential_savings': len(stopped_instances) * 50  # 假設每個實例 $50/月
-                    },
-                    'expensive_resources': {
-                        'large_instances_count': len(expensive_resources.get('large_instances', [])),
-                        'high_iops_volumes_count': len(expensive_resources.get('high_iops_volumes', []))
-                    }
+            if totals is None:
+                totals = self._collect_cost_totals()
+            
+            orphaned_storage_gb = totals['orphaned_storage_gb']
+            unused_sg_count = totals['unused_sg_count']
+            stopped_instance_count = totals['stopped_instance_count']
+            
+            return {
+                'orphaned_ebs_volumes': {
+                    'count': totals['orphaned_volume_count'],
+                    'total_size_gb': orphaned_storage_gb,
+                    'estimated_monthly_cost': orphaned_storage_gb * 0.1  # 假設每 GB $0.1/月
+                },
+                'unused_security_groups': {
+                    'count': unused_sg_count,
+                    'potential_savings': unused_sg_count * 0.1  # 假設每個安全群組 $0.1/月
+                },
+                'stopped_instances': {
+                    'count': stopped_instance_count,
+                    'potential_savings': stopped_instance_count * 50  # 假設每個實例 $50/月
+                },
+                'expensive_resources': {
+                    'large_instances_count': totals['large_instance_count'],
+                    'high_iops_volumes_count': totals['high_iops_volume_count']
                 }
+            }
         except Exception as e:
             logger.error(f"計算潛在節省失敗: {e}")
             return {}
     
-    def get_cost_optimization_recommendations(self) -> List[Dict[str, Any]]:
+    def get_cost_optimization_recommendations(self, totals: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
         """
         獲取成本優化建議
         
+        Args:
+            totals: _collect_cost_totals() 的結果；未提供時自行查詢
+        
         Returns:
             成本優化建議清單
         """
         recommendations = []
         
         try:
+            if totals is None:
+                totals = self._collect_cost_totals()
+            
             # 孤兒 EBS 磁碟建議
-            orphaned_volumes = self.find_orphaned_ebs_volumes()
-            if orphaned_volumes:
+            orphaned_volume_count = totals['orphaned_volume_count']
+            if orphaned_volume_count:
                 recommendations.append({
                     'type': 'orphaned_ebs_volumes',
                     'priority': 'high',
                     'title': '刪除孤兒 EBS 磁碟',
-                    'description': f'發現 {len(orphaned_volumes)} 個未使用的 EBS 磁碟',
+                    'description': f'發現 {orphaned_volume_count} 個未使用的 EBS 磁碟',
                     'action': '檢查並刪除未使用的 EBS 磁碟',
-                    'potential_savings': f'約 ${len(orphaned_volumes) * 10}/月'
+                    'potential_savings': f'約 ${orphaned_volume_count * 10}/月'
                 })
             
             # 未使用安全群組建議
-            unused_sgs = self.find_unused_security_groups()
-            if unused_sgs:
+            unused_sg_count = totals['unused_sg_count']
+            if unused_sg_count:
                 recommendations.append({
                     'type': 'unused_security_groups',
                     'priority': 'medium',
                     'title': '清理未使用安全群組',
-                    'description': f'發現 {len(unused_sgs)} 個未使用的安全群組',
+                    'description': f'發現 {unused_sg_count} 個未使用的安全群組',
                     'action': '檢查並刪除未使用的安全群組',
-                    'potential_savings': f'約 ${len(unused_sgs) * 0.1}/月'
+                    'potential_savings': f'約 ${unused_sg_count * 0.1}/月'
                 })
             
             # 已停止實例建議
-            stopped_instances = self.find_stopped_instances()
-            if stopped_instances:
+            stopped_instance_count = totals['stopped_instance_count']
+            if stopped_instance_count:
                 recommendations.append({
                     'type': 'stopped_instances',
                     'priority': 'high',
                     'title': '處理已停止實例',
-                    'description': f'發現 {len(stopped_instances)} 個已停止的實例',
+                    'description': f'發現 {stopped_instance_count} 個已停止的實例',
                     'action': '決定是否終止或重新啟動這些實例',
-                    'potential_savings': f'約 ${len(stopped_instances) * 50}/月'
+                    'potential_savings': f'約 ${stopped_instance_count * 50}/月'
                 })
             
             # 昂貴資源建議
-            expensive_resources = self.find_expensive_resources()
-            large_instances = expensive_resources.get('large_instances', [])
-            if large_instances:
+            large_instance_count = totals['large_instance_count']
+            if large_instance_count:
                 recommendations.append({
                     'type': 'large_instances',
                     'priority': 'medium',
                     'title': '檢視大型實例使用情況',
-                    'description': f'發現 {len(large_instances)} 個大型實例',
+                    'description': f'發現 {large_instance_count} 個大型實例',
                     'action': '檢查這些實例是否真的需要如此大的規格',
                     'potential_savings': '視情況而定，可能節省 30-50% 成本'
                 })
@@ -343,6 +420,11 @@ class CostOptimizationAnalyzer:
             logger.error(f"獲取成本優化建議失敗: {e}")
             return []
     
+    @cached_result
+    def _get_resource_statistics(self) -> Dict[str, int]:
+        """統計各類資源的節點數量"""
+        return self._count_resource_labels()
+    
     def get_cost_summary(self) -> Dict[str, Any]:
         """
         獲取成本摘要報告
@@ -351,71 +433,59 @@ class CostOptimizationAnalyzer:
             成本摘要資訊
         """
         try:
-            with self.driver.session() as session:
-                # 基本統計
-                stats_query = """
-                MATCH (n)
-                RETURN 
-                    labels(n)[0] AS ResourceType,
-                    count(n) AS Count
-                ORDER BY Count DESC
-                """
-                
-                stats_result = session.run(stats_query)
-                resource_stats = {record['ResourceType']: record['Count'] for record in stats_result}
-                
-                # 潛在節省分析
-                potential_savings = self.calculate_potential_savings()
-                
-                # 成本優化建議
-                recommendations = self.get_cost_optimization_recommendations()
-                
-                return {
-                    'resource_statistics': resource_stats,
-                    'potential_savings': potential_savings,
-                    'recommendations': recommendations,
-                    'total_recommendations': len(recommendations)
-                }
-                
+            # 基本統計與彙總數字互不相依，交給背景執行緒查詢以重疊往返時間
+            stats_future = self._submit(self._get_resource_statistics)
+            
+            # 節省分析與優化建議共用同一次彙總查詢的結果
+            totals = self._collect_cost_totals()
+            resource_stats = stats_future.result()
+            
+            # 潛在節省分析
+            potential_savings = self.calculate_potential_savings(totals)
+            
+            # 成本優化建議
+            recommendations = self.get_cost_optimization_recommendations(totals)
+            
+            return {
+                'resource_statistics': resource_stats,
+                'potential_savings': potential_savings,
+                'recommendations': recommendations,
+                'total_recommendations': len(recommendations)
+            }
+            
         except Exception as e:
             logger.error(f"獲取成本摘要失敗: {e}")
             return {}
 
-
 # 使用範例
 if __name__ == "__main__":
-    from neo4j import GraphDatabase
-    
     # 連接設定
     NEO4J_URI = "bolt://localhost:7687"
     NEO4J_USERNAME = "neo4j"
     NEO4J_PASSWORD = "password"
     
     try:
-        # 創建驅動程式
-        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
-        
-        # 創建分析器
-        analyzer = CostOptimizationAnalyzer(driver)
+        # 創建分析器（含驅動程式）
+        analyzer = CostOptimizationAnalyzer.from_uri(NEO4J_URI, (NEO4J_USERNAME, NEO4J_PASSWORD))
         
         print("=== 成本優化分析 ===")
         
         # 1. 孤兒 EBS 磁碟
         print("\n1. 孤兒 EBS 磁碟:")
-        orphaned_volumes = analyzer.find_orphaned_ebs_volumes()
-        for volume in orphaned_volumes[:5]:  # 只顯示前5個
+        orphaned_volumes = analyzer.find_orphaned_ebs_volumes(limit=5)  # 只顯示前5個
+        for volume in orphaned_volumes:
             print(f"  - {volume['VolumeId']}: {volume['Size']}GB ({volume['VolumeType']})")
         
         # 2. 未使用安全群組
         print("\n2. 未使用安全群組:")
-        unused_sgs = analyzer.find_unused_security_groups()
-        for sg in unused_sgs[:5]:  # 只顯示前5個
+        unused_sgs = analyzer.find_unused_security_groups(limit=5)  # 只顯示前5個
+        for sg in unused_sgs:
             print(f"  - {sg['GroupName']} ({sg['GroupID']}): {sg['RuleCount']} 規則")
         
         # 3. 已停止實例
         print("\n3. 已停止實例:")
-        stopped_instances = analyzer.find_stopped_instances()
-        for instance in stopped_instances[:5]:  # 只顯示前5個
+        stopped_instances = analyzer.find_stopped_instances(limit=5)  # 只顯示前5個
+        for instance in stopped_instances:
             print(f"  - {instance['InstanceName']} ({instance['InstanceID']}): {instance['InstanceType']}")
         
         # 4. 成本優化建議
@@ -433,7 +503,7 @@ if __name__ == "__main__":
         print(f"  - 總建議數: {summary.get('total_recommendations', 0)}")
         
         # 關閉連接
-        driver.close()
+        analyzer.driver.close()
         
     except Exception as e:
         print(f"分析失敗: {e}")
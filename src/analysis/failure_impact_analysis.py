@@ -8,18 +8,132 @@
 - 影響範圍評估
 """
 
-from typing import List, Dict, Any, Optional, Tuple
-from neo4j import GraphDatabase
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from loguru import logger
 
+from .base import BaseAnalyzer
+from ..data_models import get_all_schemas
 
-class FailureImpactAnalyzer:
+
+# 故障與依賴會沿著傳遞的關係類型（與載入器建立的關係一致）
+DEPENDENCY_REL_TYPES = 'IS_MEMBER_OF|LOCATED_IN|ATTACHES_TO|HAS_RULE'
+
+# 已註冊的資源標籤；節點類型取其中第一個，略過 OpenToWorld 等輔助標籤與 SchemaVersion 節點
+RESOURCE_LABELS = list(get_all_schemas())
+
+# 變長路徑的深度上限，避免在大型圖上無限制展開
+MAX_TRAVERSAL_DEPTH = 10
+
+# 依 ID 找出起點資源；各分支以標籤加上有唯一約束的 id 定位，走索引查詢而非全圖掃描
+_START_NODE_SUBQUERY = """
+        CALL {
+            MATCH (start:EC2Instance {id: $resource_id}) RETURN start
+            UNION ALL
+            MATCH (start:SecurityGroup {id: $resource_id}) RETURN start
+            UNION ALL
+            MATCH (start:VPC {id: $resource_id}) RETURN start
+        }"""
+
+# 依深度預先組好的依賴查詢；相同深度每次送出相同的查詢文字，可重用伺服器端的執行計畫
+_DEPENDENCY_QUERIES = {
+    depth: _START_NODE_SUBQUERY + f"""
+        MATCH path = (start)-[:{DEPENDENCY_REL_TYPES}*1..{depth}]-(dependent)
+        RETURN 
+            start,
+            dependent,
+            length(path) as depth,
+            relationships(path) as relationships
+        ORDER BY depth
+        """
+    for depth in range(1, MAX_TRAVERSAL_DEPTH + 1)
+}
+
+# 關鍵性指標：直接連接數與兩步內可達的節點數，一次往返取得
+_IMPACT_SCORE_QUERY = _START_NODE_SUBQUERY + """
+        WITH start as n, COUNT { (start)--() } as connections
+        MATCH (n)-[*1..2]-(related)
+        WITH n, connections, count(DISTINCT related) as reachable_nodes
+        RETURN 
+            connections as direct_connections,
+            reachable_nodes as reachable_nodes,
+            connections * reachable_nodes as impact_score
+        """
+
+# 批次版本：以 UNWIND 一次計算多個資源，各分支各自引入 resource_id 後再以標籤加 id 定位
+_BATCH_IMPACT_SCORE_QUERY = """
+        UNWIND $resource_ids AS resource_id
+        CALL {
+            WITH resource_id
+            MATCH (start:EC2Instance {id: resource_id}) RETURN start
+            UNION ALL
+            WITH resource_id
+            MATCH (start:SecurityGroup {id: resource_id}) RETURN start
+            UNION ALL
+            WITH resource_id
+            MATCH (start:VPC {id: resource_id}) RETURN start
+        }
+        WITH resource_id, start as n, COUNT { (start)--() } as connections
+        MATCH (n)-[*1..2]-(related)
+        WITH resource_id, connections, count(DISTINCT related) as reachable_nodes
+        RETURN 
+            resource_id,
+            connections as direct_connections,
+            reachable_nodes as reachable_nodes,
+            connections * reachable_nodes as impact_score
+        """
+
+
+# 關鍵節點（連接數不少於 $min_connections 的資源節點），依連接數由多到少排序
+CRITICAL_NODES_QUERY = """
+        MATCH (n)
+        WITH n, COUNT { (n)--() } as connection_count
+        WHERE connection_count >= $min_connections
+        WITH n, connection_count, [label IN labels(n) WHERE label IN $resource_labels][0] as node_type
+        WHERE node_type IS NOT NULL
+        RETURN 
+            n,
+            connection_count,
+            node_type
+        ORDER BY connection_count DESC
+        """
+
+# 單點故障：COUNT { } 只讀取節點的連接度；通過篩選的節點恰有一個鄰居，直接展開一次取得即可
+SINGLE_POINTS_QUERY = """
+        MATCH (n)
+        WHERE COUNT { (n)--() } = 1
+        WITH n, [label IN labels(n) WHERE label IN $resource_labels][0] as node_type
+        WHERE node_type IS NOT NULL
+        MATCH (n)--(connected)
+        RETURN 
+            n,
+            1 as connection_count,
+            node_type,
+            connected
+        ORDER BY node_type
+        """
+
+
+def critical_node_entries(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """將 CRITICAL_NODES_QUERY 的結果列轉為關鍵節點清單"""
+    return [{
+        'node': dict(row['n']),
+        'connection_count': row['connection_count'],
+        'node_type': row['node_type']
+    } for row in rows]
+
+
+def single_point_entries(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """將 SINGLE_POINTS_QUERY 的結果列轉為單點故障清單"""
+    return [{
+        'node': dict(row['n']),
+        'connection_count': row['connection_count'],
+        'node_type': row['node_type'],
+        'connected_nodes': [dict(row['connected'])]
+    } for row in rows]
+
+class FailureImpactAnalyzer(BaseAnalyzer):
     """故障衝擊分析器"""
     
-    def __init__(self, driver):
-        """初始化分析器"""
-        self.driver = driver
-    
     def find_dependencies(self, resource_id: str, max_depth: int = 5) -> List[Dict[str, Any]]:
         """
         找出指定資源的所有依賴關係
@@ -31,20 +145,12 @@ class FailureImpactAnalyzer:
         Returns:
             依賴關係清單
         """
-        query = """
-        MATCH path = (start)-[*1..$max_depth]-(dependent)
-        WHERE start.InstanceID = $resource_id OR start.GroupID = $resource_id OR start.VpcId = $resource_id
-        RETURN 
-            start,
-            dependent,
-            length(path) as depth,
-            relationships(path) as relationships
-        ORDER BY depth
-        """
+        # Cypher 不接受以參數指定變長路徑的深度，改用對應深度預先組好的查詢
+        query = _DEPENDENCY_QUERIES[max(1, min(int(max_depth), MAX_TRAVERSAL_DEPTH))]
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query, resource_id=resource_id, max_depth=max_depth)
+            with self._session() as session:
+                result = session.run(query, resource_id=resource_id)
                 dependencies = []
                 
                 for record in result:
@@ -76,26 +182,24 @@ class FailureImpactAnalyzer:
         Returns:
             故障傳播路徑清單
         """
-        query = """
-        MATCH path = (failed)-[*1..10]->(affected)
-        WHERE failed.InstanceID = $failed_resource_id 
-           OR failed.GroupID = $failed_resource_id
-           OR failed.VpcId = $failed_resource_id
+        query = _START_NODE_SUBQUERY + f"""
+        WITH start AS failed
+        MATCH path = (failed)-[:{DEPENDENCY_REL_TYPES}*1..{MAX_TRAVERSAL_DEPTH}]->(affected)
         RETURN 
             failed,
             affected,
             length(path) as propagation_depth,
-            [node in nodes(path) | {
-                id: coalesce(node.InstanceID, node.GroupID, node.VpcId, node.SubnetId),
-                type: labels(node)[0],
-                name: coalesce(node.Name, node.GroupName, node.BucketName)
-            }] as propagation_path
+            [node in nodes(path) | {{
+                id: coalesce(node.instanceid, node.GroupID, node.VpcId, node.SubnetId),
+                type: [label IN labels(node) WHERE label IN $resource_labels][0],
+                name: coalesce(node.name, node.Name, node.GroupName, node.BucketName)
+            }}] as propagation_path
         ORDER BY propagation_depth
         """
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query, failed_resource_id=failed_resource_id)
+            with self._session() as session:
+                result = session.run(query, resource_id=failed_resource_id, resource_labels=RESOURCE_LABELS)
                 propagation_paths = []
                 
                 for record in result:
@@ -117,91 +221,107 @@ class FailureImpactAnalyzer:
             logger.error(f"分析故障傳播失敗: {e}")
             return []
     
-    def identify_critical_nodes(self, min_connections: int = 5) -> List[Dict[str, Any]]:
+    def identify_critical_nodes(self, min_connections: int = 5, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         識別關鍵節點（連接度高的節點）
         
         Args:
             min_connections: 最小連接數
+            limit: 只取連接數最高的前幾個節點；None 表示全部
             
         Returns:
             關鍵節點清單
         """
-        query = """
-        MATCH (n)
-        WITH n, COUNT { (n)--() } as connection_count
-        WHERE connection_count >= $min_connections
-        RETURN 
-            n,
-            connection_count,
-            labels(n)[0] as node_type
-        ORDER BY connection_count DESC
-        """
+        query = CRITICAL_NODES_QUERY
+        if limit is not None:
+            # 在資料庫端截斷，只傳回需要的筆數
+            query += "LIMIT $limit\n"
+        
+        def _scan() -> List[Dict[str, Any]]:
+            with self._session() as session:
+                return critical_node_entries(session.run(
+                    query, min_connections=min_connections, limit=limit, resource_labels=RESOURCE_LABELS
+                ))
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query, min_connections=min_connections)
-                critical_nodes = []
-                
-                for record in result:
-                    node = dict(record['n'])
-                    connection_count = record['connection_count']
-                    node_type = record['node_type']
-                    
-                    critical_nodes.append({
-                        'node': node,
-                        'connection_count': connection_count,
-                        'node_type': node_type
-                    })
-                
-                return critical_nodes
-                
+            return self._cached(('critical_nodes', min_connections, limit), _scan)
+            
         except Exception as e:
             logger.error(f"識別關鍵節點失敗: {e}")
             return []
     
-    def find_single_points_of_failure(self) -> List[Dict[str, Any]]:
+    def find_single_points_of_failure(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         找出單點故障（只有一個連接的節點）
         
+        Args:
+            limit: 只取排序後的前幾筆；None 表示全部
+        
         Returns:
             單點故障清單
         """
+        query = SINGLE_POINTS_QUERY
+        if limit is not None:
+            # 在資料庫端截斷，只傳回需要的筆數
+            query += "LIMIT $limit\n"
+        
+        def _scan() -> List[Dict[str, Any]]:
+            with self._session() as session:
+                return single_point_entries(
+                    session.run(query, limit=limit, resource_labels=RESOURCE_LABELS)
+                )
+        
+        try:
+            return self._cached(('single_points', limit), _scan)
+            
+        except Exception as e:
+            logger.error(f"找出單點故障失敗: {e}")
+            return []
+    
+    def _summarize_node_degrees(self, min_connections: int, top_n: int = 10) -> Tuple[int, int, List[Dict[str, Any]]]:
+        """
+        只計算一次各節點的連接數，並在資料庫端完成摘要所需的彙總
+        
+        摘要只需要關鍵節點與單點故障的數量以及前幾個關鍵節點，
+        因此計數直接由 Cypher 算出，只有前 top_n 個關鍵節點會傳回並轉成字典。
+        
+        Args:
+            min_connections: 關鍵節點的最小連接數
+            top_n: 傳回的關鍵節點數量上限
+            
+        Returns:
+            (關鍵節點數量, 單點故障數量, 前 top_n 個關鍵節點)
+        """
         query = """
         MATCH (n)
         WITH n, COUNT { (n)--() } as connection_count
-        WHERE connection_count = 1
+        WHERE connection_count >= $min_connections OR connection_count = 1
+        WITH n, connection_count, [label IN labels(n) WHERE label IN $resource_labels][0] as node_type
+        WHERE node_type IS NOT NULL
+        WITH n, connection_count, node_type
+        ORDER BY connection_count DESC
         RETURN 
-            n,
-            connection_count,
-            labels(n)[0] as node_type,
-            [(n)--(connected) | connected] as connected_nodes
-        ORDER BY node_type
+            count(CASE WHEN connection_count >= $min_connections THEN 1 END) as critical_count,
+            count(CASE WHEN connection_count = 1 THEN 1 END) as single_points_count,
+            collect(CASE WHEN connection_count >= $min_connections
+                         THEN [n, connection_count, node_type] END)[..$top_n] as top_critical
         """
         
-        try:
-            with self.driver.session() as session:
-                result = session.run(query)
-                single_points = []
-                
-                for record in result:
-                    node = dict(record['n'])
-                    connection_count = record['connection_count']
-                    node_type = record['node_type']
-                    connected_nodes = [dict(connected) for connected in record['connected_nodes']]
-                    
-                    single_points.append({
-                        'node': node,
-                        'connection_count': connection_count,
-                        'node_type': node_type,
-                        'connected_nodes': connected_nodes
-                    })
-                
-                return single_points
-                
-        except Exception as e:
-            logger.error(f"找出單點故障失敗: {e}")
-            return []
+        def _scan() -> Tuple[int, int, List[Dict[str, Any]]]:
+            with self._session() as session:
+                critical_count, single_points_count, top_critical = session.run(
+                    query, min_connections=min_connections, top_n=top_n, resource_labels=RESOURCE_LABELS
+                ).single().values()
+            
+            top_critical_nodes = [{
+                'node': dict(node),
+                'connection_count': connection_count,
+                'node_type': node_type
+            } for node, connection_count, node_type in top_critical]
+            
+            return critical_count, single_points_count, top_critical_nodes
+        
+        return self._cached(('degree_summary', min_connections, top_n), _scan)
     
     def analyze_network_redundancy(self) -> List[Dict[str, Any]]:
         """
@@ -214,27 +334,27 @@ class FailureImpactAnalyzer:
         MATCH (vpc:VPC)
         OPTIONAL MATCH (subnet:Subnet)-[:LOCATED_IN]->(vpc)
         OPTIONAL MATCH (instance:EC2Instance)-[:LOCATED_IN]->(subnet)
-        WITH vpc, 
-             collect(DISTINCT subnet) as subnets,
-             collect(DISTINCT instance) as instances
+        // 先依子網路分組計數，只需展開一次 LOCATED_IN
+        WITH vpc, subnet, count(instance) as subnet_instances
+        WITH vpc,
+             collect(CASE WHEN subnet IS NOT NULL THEN {
+                 id: subnet.SubnetId,
+                 az: subnet.AvailabilityZone,
+                 cidr: subnet.CidrBlock,
+                 instance_count: subnet_instances
+             } END) as subnet_details,
+             sum(subnet_instances) as instance_total
         RETURN 
             vpc.VpcId as VpcId,
             vpc.Name as VpcName,
-            size(subnets) as SubnetCount,
-            size(instances) as InstanceCount,
-            [subnet in subnets | {
-                id: subnet.SubnetId,
-                az: subnet.AvailabilityZone,
-                cidr: subnet.CidrBlock,
-                instance_count: COUNT { (instance:EC2Instance)-[:LOCATED_IN]->(subnet) }
-            }] as subnet_details
+            size(subnet_details) as SubnetCount,
+            instance_total as InstanceCount,
+            subnet_details
         ORDER BY vpc.vpcid
         """
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query)
-                return [dict(record) for record in result]
+            return self._read(query)
                 
         except Exception as e:
             logger.error(f"分析網路冗餘性失敗: {e}")
@@ -251,36 +371,8 @@ class FailureImpactAnalyzer:
             影響分數資訊
         """
         try:
-            with self.driver.session() as session:
-                # 計算直接連接數
-                direct_connections_query = """
-                MATCH (n)
-                WHERE n.InstanceID = $resource_id OR n.GroupID = $resource_id OR n.VpcId = $resource_id
-                RETURN size((n)--()) as direct_connections
-                """
-                
-                # 計算間接影響範圍
-                indirect_impact_query = """
-                MATCH (n)-[*1..3]-(affected)
-                WHERE n.InstanceID = $resource_id OR n.GroupID = $resource_id OR n.VpcId = $resource_id
-                RETURN count(DISTINCT affected) as indirect_impact
-                """
-                
-                # 計算關鍵性指標
-                criticality_query = """
-                MATCH (n)
-                WHERE n.InstanceID = $resource_id OR n.GroupID = $resource_id OR n.VpcId = $resource_id
-                WITH n, size((n)--()) as connections
-                MATCH (n)-[*1..2]-(related)
-                WITH n, connections, count(DISTINCT related) as reachable_nodes
-                RETURN 
-                    connections as direct_connections,
-                    reachable_nodes as reachable_nodes,
-                    connections * reachable_nodes as impact_score
-                """
-                
-                result = session.run(criticality_query, resource_id=resource_id)
-                record = result.single()
+            with self._session() as session:
+                record = session.run(_IMPACT_SCORE_QUERY, resource_id=resource_id).single()
                 
                 if record:
                     return {
@@ -301,6 +393,65 @@ class FailureImpactAnalyzer:
             logger.error(f"計算影響分數失敗: {e}")
             return {}
     
+    def calculate_impact_scores(self, resource_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        批次計算多個資源的影響分數（單次往返資料庫）
+        
+        Args:
+            resource_ids: 資源 ID 清單
+            
+        Returns:
+            依輸入順序排列的影響分數資訊，內容與 calculate_impact_score 相同
+        """
+        if not resource_ids:
+            return []
+        
+        resource_ids = list(resource_ids)
+        
+        def _query() -> Dict[Any, Tuple[int, int, int]]:
+            with self._session() as session:
+                result = session.run(_BATCH_IMPACT_SCORE_QUERY, resource_ids=resource_ids)
+                return {
+                    resource_id: (direct_connections, reachable_nodes, impact_score)
+                    for resource_id, direct_connections, reachable_nodes, impact_score in result.values()
+                }
+        
+        try:
+            scores = self._cached(('impact_scores', tuple(resource_ids)), _query)
+            
+            impact_scores = []
+            for resource_id in resource_ids:
+                # 找不到的資源與單筆版本一致，分數皆為 0
+                direct_connections, reachable_nodes, impact_score = scores.get(resource_id, (0, 0, 0))
+                impact_scores.append({
+                    'resource_id': resource_id,
+                    'direct_connections': direct_connections,
+                    'reachable_nodes': reachable_nodes,
+                    'impact_score': impact_score
+                })
+            
+            return impact_scores
+            
+        except Exception as e:
+            logger.error(f"批次計算影響分數失敗: {e}")
+            return []
+    
+    def _get_node_statistics(self) -> List[Dict[str, Any]]:
+        """統計各類資源節點的數量與平均連接數（只計入已註冊的資源標籤）"""
+        query = """
+        MATCH (n)
+        WITH n, [label IN labels(n) WHERE label IN $resource_labels][0] AS NodeType
+        WHERE NodeType IS NOT NULL
+        WITH NodeType, COUNT { (n)--() } as connections
+        RETURN 
+            NodeType,
+            count(*) AS Count,
+            avg(connections) AS AvgConnections
+        ORDER BY Count DESC
+        """
+        
+        return self._read(query, resource_labels=RESOURCE_LABELS)
+    
     def get_failure_impact_summary(self) -> Dict[str, Any]:
         """
         獲取故障衝擊摘要報告
@@ -309,79 +460,66 @@ class FailureImpactAnalyzer:
             故障衝擊摘要資訊
         """
         try:
-            with self.driver.session() as session:
-                # 基本統計
-                stats_query = """
-                MATCH (n)
-                WITH labels(n)[0] AS NodeType, n, COUNT { (n)--() } as connections
-                RETURN 
-                    NodeType,
-                    count(n) AS Count,
-                    avg(connections) AS AvgConnections
-                ORDER BY Count DESC
-                """
-                
-                stats_result = session.run(stats_query)
-                node_stats = [dict(record) for record in stats_result]
-                
-                # 關鍵節點統計
-                critical_nodes = self.identify_critical_nodes(min_connections=3)
-                
-                # 單點故障統計
-                single_points = self.find_single_points_of_failure()
-                
-                # 網路冗餘性分析
-                network_redundancy = self.analyze_network_redundancy()
-                
-                return {
-                    'node_statistics': node_stats,
-                    'critical_nodes_count': len(critical_nodes),
-                    'single_points_of_failure_count': len(single_points),
-                    'network_redundancy_analysis': network_redundancy,
-                    'top_critical_nodes': critical_nodes[:10]  # 前10個關鍵節點
-                }
-                
+            # 基本統計與網路冗餘性分析互不相依，交給背景執行緒查詢以重疊往返時間
+            stats_future = self._submit(self._get_node_statistics)
+            redundancy_future = self._submit(self.analyze_network_redundancy)
+            
+            # 關鍵節點與單點故障統計（共用同一次連接數掃描，計數在資料庫端完成）
+            critical_count, single_points_count, top_critical_nodes = self._summarize_node_degrees(
+                min_connections=3, top_n=10  # 前10個關鍵節點
+            )
+            
+            # 前幾個關鍵節點的影響分數以一次批次查詢取得，而非逐一呼叫 calculate_impact_score
+            impact_scores = self.calculate_impact_scores(
+                [node_info['node'].get('id') for node_info in top_critical_nodes]
+            )
+            for node_info, impact in zip(top_critical_nodes, impact_scores):
+                node_info['reachable_nodes'] = impact['reachable_nodes']
+                node_info['impact_score'] = impact['impact_score']
+            
+            return {
+                'node_statistics': stats_future.result(),
+                'critical_nodes_count': critical_count,
+                'single_points_of_failure_count': single_points_count,
+                'network_redundancy_analysis': redundancy_future.result(),
+                'top_critical_nodes': top_critical_nodes
+            }
+            
         except Exception as e:
             logger.error(f"獲取故障衝擊摘要失敗: {e}")
             return {}
 
-
 # 使用範例
 if __name__ == "__main__":
-    from neo4j import GraphDatabase
-    
     # 連接設定
     NEO4J_URI = "bolt://localhost:7687"
     NEO4J_USERNAME = "neo4j"
     NEO4J_PASSWORD = "password"
     
     try:
-        # 創建驅動程式
-        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
-        
-        # 創建分析器
-        analyzer = FailureImpactAnalyzer(driver)
+        # 創建分析器（含驅動程式）
+        analyzer = FailureImpactAnalyzer.from_uri(NEO4J_URI, (NEO4J_USERNAME, NEO4J_PASSWORD))
         
         print("=== 故障衝擊分析 ===")
         
         # 1. 找出關鍵節點
         print("\n1. 關鍵節點 (連接數 >= 3):")
-        critical_nodes = analyzer.identify_critical_nodes(min_connections=3)
-        for node_info in critical_nodes[:5]:  # 只顯示前5個
+        critical_nodes = analyzer.identify_critical_nodes(min_connections=3, limit=5)  # 只顯示前5個
+        for node_info in critical_nodes:
             node = node_info['node']
-            print(f"  - {node.get('Name', node.get('GroupName', 'Unknown'))}: {node_info['connection_count']} 連接")
+            print(f"  - {node.get('name', node.get('Name', node.get('GroupName', 'Unknown')))}: {node_info['connection_count']} 連接")
         
         # 2. 找出單點故障
         print("\n2. 單點故障:")
         single_points = analyzer.find_single_points_of_failure()
         for sp in single_points[:5]:  # 只顯示前5個
             node = sp['node']
-            print(f"  - {node.get('Name', node.get('GroupName', 'Unknown'))} ({sp['node_type']})")
+            print(f"  - {node.get('name', node.get('Name', node.get('GroupName', 'Unknown')))} ({sp['node_type']})")
         
         # 3. 分析特定資源的影響
         if critical_nodes:
             test_resource = critical_nodes[0]['node']
-            resource_id = test_resource.get('InstanceID', test_resource.get('GroupID', test_resource.get('VpcId')))
+            resource_id = test_resource.get('instanceid', test_resource.get('GroupID', test_resource.get('VpcId')))
             if resource_id:
                 print(f"\n3. 資源 {resource_id} 的影響分析:")
                 impact_score = analyzer.calculate_impact_score(resource_id)
@@ -396,7 +534,7 @@ if __name__ == "__main__":
         print(f"  - 單點故障數量: {summary.get('single_points_of_failure_count', 0)}")
         
         # 關閉連接
-        driver.close()
+        analyzer.driver.close()
         
     except Exception as e:
         print(f"分析失敗: {e}")
@@ -8,131 +8,203 @@
 - 權限過大的 IAM 角色
 """
 
-from typing import List, Dict, Any, Optional
-from neo4j import GraphDatabase
+from typing import List, Dict, Any, Iterable, Optional
 from loguru import logger
 
+from .base import BaseAnalyzer, plan_operators
 
-class SecurityAnalyzer:
-    """資安分析器"""
+
+# 暴露服務查詢：以索引提示固定由 (opentoworld, protocol, fromport, toport) 複合索引找出規則，再展開到實例
+EXPOSED_SERVICES_QUERY = """
+        MATCH (rule:SecurityRule)
+        USING INDEX rule:SecurityRule(opentoworld, protocol, fromport, toport)
+        WHERE rule.opentoworld = true
+          AND rule.protocol = $protocol
+          AND rule.fromport <= $port AND rule.toport >= $port
+          AND rule.direction = 'inbound'
+        MATCH (instance:EC2Instance)-[:IS_MEMBER_OF]->(sg:SecurityGroup)-[:HAS_RULE]->(rule)
+        RETURN 
+            instance.name AS InstanceName,
+            instance.instanceid AS InstanceID,
+            instance.publicip AS PublicIP,
+            instance.state AS State,
+            sg.name AS SecurityGroup,
+            rule.ruleid AS RuleID
+        """
+
+
+# 過度寬鬆規則：OpenToWorld 標籤在載入時標記（來源為 0.0.0.0/0 的入站規則）
+PERMISSIVE_RULES_QUERY = """
+        MATCH (sg:SecurityGroup)-[:HAS_RULE]->(rule:OpenToWorld)
+        RETURN 
+            sg.name AS SecurityGroupName,
+            sg.groupid AS SecurityGroupID,
+            rule.ruleid AS RuleID,
+            rule.protocol AS Protocol,
+            rule.portrange AS PortRange,
+            rule.sourcecidr AS SourceCIDR,
+            rule.description AS Description
+        ORDER BY sg.name, rule.portrange
+        """
+
+# 未加密的 EBS 磁碟（載入時已將缺值補為 false，可直接使用 encrypted 索引）
+UNENCRYPTED_EBS_QUERY = """
+        MATCH (volume:EBSVolume)
+        WHERE volume.encrypted = false
+        RETURN 
+            'EBSVolume' AS ResourceType,
+            volume.volumeid AS ResourceID,
+            volume.size AS Size,
+            volume.volumetype AS Type,
+            volume.region AS Region
+        """
+
+# S3 儲存桶（實際的加密狀態需要額外的 API 調用）
+UNENCRYPTED_S3_QUERY = """
+        MATCH (bucket:S3Bucket)
+        RETURN 
+            'S3Bucket' AS ResourceType,
+            bucket.name AS ResourceID,
+            bucket.region AS Region
+        """
+
+
+def _group_by_instance(rows: Iterable[Any], fields: List[str], collected: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    將每列一個 (實例, 安全群組, 規則) 組合的查詢結果依 InstanceID 合併
     
-    def __init__(self, driver):
-        """初始化分析器"""
-        self.driver = driver
+    Args:
+        rows: 查詢結果（需含 InstanceID 與 InstanceName 欄位）
+        fields: 直接沿用的實例欄位
+        collected: {來源欄位: 輸出欄位}，各實例收集為不重複且保持出現順序的清單（略過 null）
+        
+    Returns:
+        依 InstanceName 排序的實例清單
+    """
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for row in rows:
+        group = groups.get(row['InstanceID'])
+        if group is None:
+            group = {field: row[field] for field in fields}
+            for target in collected.values():
+                group[target] = {}
+            groups[row['InstanceID']] = group
+        for source, target in collected.items():
+            value = row[source]
+            if value is not None:
+                group[target][value] = None
+    
+    instances = list(groups.values())
+    for group in instances:
+        for target in collected.values():
+            group[target] = list(group[target])
+    # 與 ORDER BY instance.name 相同，名稱為 null 的排在最後
+    instances.sort(key=lambda group: (group['InstanceName'] is None, group['InstanceName'] or ''))
+    return instances
+
+
+
+def group_exposed_services(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """將 EXPOSED_SERVICES_QUERY 的結果列依實例合併為暴露的主機清單"""
+    return _group_by_instance(
+        rows,
+        ['InstanceName', 'InstanceID', 'PublicIP', 'State'],
+        {'SecurityGroup': 'SecurityGroups', 'RuleID': 'Rules'}
+    )
+
+class SecurityAnalyzer(BaseAnalyzer):
+    """資安分析器"""
     
     def find_exposed_services(self, port: str = "22", protocol: str = "tcp") -> List[Dict[str, Any]]:
         """
         找出暴露於公網且開啟指定連接埠的主機
         
         Args:
-            port: 連接埠號
+            port: 連接埠號（字串或整數皆可）
             protocol: 協定類型
             
         Returns:
             暴露的主機清單
         """
-        query = """
-        MATCH (instance:EC2Instance)-[:IS_MEMBER_OF]->(sg:SecurityGroup),
-              (sg)-[:HAS_RULE]->(rule:SecurityRule)
-        WHERE rule.sourcecidr CONTAINS '0.0.0.0/0' 
-          AND rule.portrange CONTAINS $port
-          AND rule.protocol = $protocol
-          AND rule.direction = 'inbound'
-        RETURN DISTINCT 
-            instance.name AS InstanceName,
-            instance.instanceid AS InstanceID,
-            instance.publicip AS PublicIP,
-            instance.state AS State,
-            collect(DISTINCT sg.name) AS SecurityGroups,
-            collect(DISTINCT rule.ruleid) AS Rules
-        ORDER BY instance.name
-        """
-        
         try:
-            with self.driver.session() as session:
-                result = session.run(query, port=port, protocol=protocol)
-                return [dict(record) for record in result]
+            # 伺服器只傳回平面列，依實例分組在用戶端完成，省去 collect(DISTINCT) 與排序
+            return group_exposed_services(
+                self._cached_read(EXPOSED_SERVICES_QUERY, port=int(port), protocol=protocol)
+            )
         except Exception as e:
             logger.error(f"查詢暴露服務失敗: {e}")
             return []
     
-    def find_overly_permissive_rules(self) -> List[Dict[str, Any]]:
+    def profile_exposed_services(self, port: str = "22", protocol: str = "tcp") -> List[str]:
+        """
+        以 PROFILE 執行暴露服務查詢，回傳執行計畫中的運算子
+        
+        用於確認規則由 SecurityRule 複合索引查找：應出現 NodeIndexSeek，而非 NodeByLabelScan 加 Filter。
+        """
+        with self._session() as session:
+            summary = session.run(
+                "PROFILE " + EXPOSED_SERVICES_QUERY, port=int(port), protocol=protocol
+            ).consume()
+        return plan_operators(summary.profile)
+    
+    def find_overly_permissive_rules(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         找出過度寬鬆的安全群組規則
         
+        Args:
+            limit: 只取排序後的前幾筆；None 表示全部
+        
         Returns:
             過度寬鬆的規則清單
         """
-        query = """
-        MATCH (sg:SecurityGroup)-[:HAS_RULE]->(rule:SecurityRule)
-        WHERE rule.sourcecidr CONTAINS '0.0.0.0/0'
-          AND rule.direction = 'inbound'
-        RETURN 
-            sg.name AS SecurityGroupName,
-            sg.groupid AS SecurityGroupID,
-            rule.ruleid AS RuleID,
-            rule.protocol AS Protocol,
-            rule.portrange AS PortRange,
-            rule.sourcecidr AS SourceCIDR,
-            rule.description AS Description
-        ORDER BY sg.name, rule.portrange
-        """
+        query = PERMISSIVE_RULES_QUERY
+        if limit is not None:
+            # 在資料庫端截斷，只傳回需要的筆數
+            query += "LIMIT $limit\n"
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query)
-                return [dict(record) for record in result]
+            return self._cached_read(query, limit=limit)
         except Exception as e:
             logger.error(f"查詢過度寬鬆規則失敗: {e}")
             return []
     
-    def find_unencrypted_resources(self) -> List[Dict[str, Any]]:
+    def find_unencrypted_resources(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         找出未加密的資源
         
+        Args:
+            limit: 只取前幾筆（EBS 磁碟優先）；None 表示全部
+        
         Returns:
             未加密的資源清單
         """
-        # 查詢未加密的 EBS 磁碟
-        ebs_query = """
-        MATCH (volume:EBSVolume)
-        WHERE volume.encrypted = false OR volume.encrypted IS NULL
-        RETURN 
-            'EBSVolume' AS ResourceType,
-            volume.volumeid AS ResourceID,
-            volume.size AS Size,
-            volume.volumetype AS Type,
-            volume.region AS Region
-        """
+        ebs_query = UNENCRYPTED_EBS_QUERY
+        s3_query = UNENCRYPTED_S3_QUERY
         
-        # 查詢未加密的 S3 儲存桶（需要額外的 API 調用）
-        s3_query = """
-        MATCH (bucket:S3Bucket)
-        RETURN 
-            'S3Bucket' AS ResourceType,
-            bucket.name AS ResourceID,
-            bucket.region AS Region
-        """
+        if limit is not None:
+            # 在資料庫端截斷，EBS 磁碟不足 limit 筆時才以剩餘筆數查詢 S3 儲存桶
+            ebs_query += "LIMIT $limit\n"
+            s3_query += "LIMIT $limit\n"
         
         try:
-            with self.driver.session() as session:
-                # 查詢 EBS 磁碟
-                ebs_result = session.run(ebs_query)
-                ebs_resources = [dict(record) for record in ebs_result]
-                
-                # 查詢 S3 儲存桶（注意：實際的加密狀態需要額外的 API 調用）
-                s3_result = session.run(s3_query)
-                s3_resources = [dict(record) for record in s3_result]
-                
-                return ebs_resources + s3_resources
+            # 查詢 EBS 磁碟與 S3 儲存桶（注意：S3 實際的加密狀態需要額外的 API 調用）
+            resources = self._cached_read(ebs_query, limit=limit)
+            if limit is None:
+                return resources + self._cached_read(s3_query, limit=limit)
+            if len(resources) < limit:
+                resources += self._cached_read(s3_query, limit=limit - len(resources))
+            return resources
         except Exception as e:
             logger.error(f"查詢未加密資源失敗: {e}")
             return []
     
-    def find_orphaned_security_groups(self) -> List[Dict[str, Any]]:
+    def find_orphaned_security_groups(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         找出孤兒安全群組（沒有被任何 EC2 實例使用）
         
+        Args:
+            limit: 只取排序後的前幾筆；None 表示全部
+        
         Returns:
             孤兒安全群組清單
         """
@@ -146,11 +218,12 @@ class SecurityAnalyzer:
             sg.vpcid AS VpcId
         ORDER BY sg.name
         """
+        if limit is not None:
+            # 在資料庫端截斷，只傳回需要的筆數
+            query += "LIMIT $limit\n"
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query)
-                return [dict(record) for record in result]
+            return self._cached_read(query, limit=limit)
         except Exception as e:
             logger.error(f"查詢孤兒安全群組失敗: {e}")
             return []
@@ -162,29 +235,24 @@ class SecurityAnalyzer:
         Returns:
             高風險連接埠清單
         """
-        # 定義高風險連接埠
-        high_risk_ports = ["22", "23", "3389", "445", "1433", "3306", "5432", "6379", "27017"]
-        
+        # HighRiskOpen 標籤在載入時標記（對全網開放且連接埠範圍涵蓋高風險連接埠的入站規則）
         query = """
-        MATCH (instance:EC2Instance)-[:IS_MEMBER_OF]->(sg:SecurityGroup),
-              (sg)-[:HAS_RULE]->(rule:SecurityRule)
-        WHERE rule.sourcecidr CONTAINS '0.0.0.0/0'
-          AND rule.direction = 'inbound'
-          AND any(port IN $high_risk_ports WHERE rule.portrange CONTAINS port)
-        RETURN DISTINCT 
+        MATCH (instance:EC2Instance)-[:IS_MEMBER_OF]->(sg:SecurityGroup)-[:HAS_RULE]->(rule:HighRiskOpen)
+        RETURN 
             instance.name AS InstanceName,
             instance.instanceid AS InstanceID,
             instance.publicip AS PublicIP,
-            collect(DISTINCT rule.portrange) AS ExposedPorts,
-            collect(DISTINCT rule.protocol) AS Protocols,
-            collect(DISTINCT sg.name) AS SecurityGroups
-        ORDER BY instance.name
+            rule.portrange AS PortRange,
+            rule.protocol AS Protocol,
+            sg.name AS SecurityGroup
         """
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query, high_risk_ports=high_risk_ports)
-                return [dict(record) for record in result]
+            return _group_by_instance(
+                self._cached_read(query),
+                ['InstanceName', 'InstanceID', 'PublicIP'],
+                {'PortRange': 'ExposedPorts', 'Protocol': 'Protocols', 'SecurityGroup': 'SecurityGroups'}
+            )
         except Exception as e:
             logger.error(f"查詢高風險連接埠失敗: {e}")
             return []
@@ -196,93 +264,119 @@ class SecurityAnalyzer:
         Returns:
             網路分段分析結果
         """
+        # 以子查詢分別計算子網路與實例數量，避免兩個 OPTIONAL MATCH 展開後再收集整批節點
         query = """
         MATCH (vpc:VPC)
-        OPTIONAL MATCH (vpc)<-[:PART_OF]-(subnet:Subnet)
-        OPTIONAL MATCH (subnet)<-[:RESIDES_IN]-(instance:EC2Instance)
-        WITH vpc, 
-             collect(DISTINCT subnet) as subnets,
-             collect(DISTINCT instance) as instances
+        CALL {
+            WITH vpc
+            MATCH (vpc)<-[:PART_OF]-(subnet:Subnet)
+            RETURN count(subnet) AS subnet_count, collect(subnet.CidrBlock) AS subnet_cidrs
+        }
+        CALL {
+            WITH vpc
+            MATCH (vpc)<-[:PART_OF]-(:Subnet)<-[:RESIDES_IN]-(instance:EC2Instance)
+            RETURN count(DISTINCT instance) AS instance_count
+        }
         RETURN 
             vpc.VpcId AS VpcId,
             vpc.Name AS VpcName,
             vpc.CidrBlock AS CidrBlock,
-            size(subnets) AS SubnetCount,
-            size(instances) AS InstanceCount,
-            [subnet in subnets | subnet.CidrBlock] AS SubnetCidrs
+            subnet_count AS SubnetCount,
+            instance_count AS InstanceCount,
+            subnet_cidrs AS SubnetCidrs
         ORDER BY vpc.Name
         """
         
         try:
-            with self.driver.session() as session:
-                result = session.run(query)
-                return [dict(record) for record in result]
+            return self._cached_read(query)
         except Exception as e:
             logger.error(f"分析網路分段失敗: {e}")
             return []
     
+    def _get_node_statistics(self) -> Dict[str, int]:
+        """統計各類節點的數量"""
+        return self._count_resource_labels()
+    
     def get_security_summary(self) -> Dict[str, Any]:
         """
         獲取資安摘要報告
         
+        摘要只需要各項發現的數量，因此以單一查詢在資料庫端計數，
+        條件與對應的 find_* 方法一致，但不傳回任何資源清單。
+        
         Returns:
             資安摘要資訊
         """
+        query = """
+        CALL {
+            MATCH (rule:SecurityRule)
+            USING INDEX rule:SecurityRule(opentoworld, protocol, fromport, toport)
+            WHERE rule.opentoworld = true
+              AND rule.protocol = $protocol
+              AND rule.fromport <= $port AND rule.toport >= $port
+              AND rule.direction = 'inbound'
+            MATCH (instance:EC2Instance)-[:IS_MEMBER_OF]->(:SecurityGroup)-[:HAS_RULE]->(rule)
+            RETURN count(DISTINCT instance) AS exposed_services_count
+        }
+        CALL {
+            MATCH (:SecurityGroup)-[:HAS_RULE]->(rule:OpenToWorld)
+            RETURN count(*) AS permissive_rules_count
+        }
+        CALL {
+            MATCH (volume:EBSVolume)
+            WHERE volume.encrypted = false
+            RETURN count(volume) AS unencrypted_volume_count
+        }
+        CALL {
+            MATCH (bucket:S3Bucket)
+            RETURN count(bucket) AS bucket_count
+        }
+        CALL {
+            MATCH (sg:SecurityGroup)
+            WHERE NOT (sg)<-[:IS_MEMBER_OF]-(:EC2Instance)
+            RETURN count(sg) AS orphaned_security_groups_count
+        }
+        CALL {
+            MATCH (instance:EC2Instance)-[:IS_MEMBER_OF]->(:SecurityGroup)-[:HAS_RULE]->(:HighRiskOpen)
+            RETURN count(DISTINCT instance) AS high_risk_instances
+        }
+        RETURN exposed_services_count, permissive_rules_count,
+               unencrypted_volume_count + bucket_count AS unencrypted_resources_count,
+               orphaned_security_groups_count, high_risk_instances
+        """
+        
         try:
-            with self.driver.session() as session:
-                # 基本統計
-                stats_query = """
-                MATCH (n)
-                RETURN 
-                    labels(n)[0] AS NodeType,
-                    count(n) AS Count
-                ORDER BY Count DESC
-                """
-                
-                stats_result = session.run(stats_query)
-                node_stats = {record['NodeType']: record['Count'] for record in stats_result}
-                
-                # 暴露服務統計
-                exposed_services = self.find_exposed_services()
-                
-                # 過度寬鬆規則統計
-                permissive_rules = self.find_overly_permissive_rules()
-                
-                # 未加密資源統計
-                unencrypted_resources = self.find_unencrypted_resources()
-                
-                # 孤兒安全群組統計
-                orphaned_sgs = self.find_orphaned_security_groups()
-                
-                return {
-                    'node_statistics': node_stats,
-                    'exposed_services_count': len(exposed_services),
-                    'permissive_rules_count': len(permissive_rules),
-                    'unencrypted_resources_count': len(unencrypted_resources),
-                    'orphaned_security_groups_count': len(orphaned_sgs),
-                    'high_risk_instances': len(self.find_high_risk_ports())
-                }
+            # 節點統計需掃描全部節點，交給背景執行緒與計數查詢同時進行
+            stats_future = self._submit(self._get_node_statistics)
+            
+            with self._session() as session:
+                record = session.run(
+                    query, port=22, protocol='tcp'
+                ).single()
+            
+            return {
+                'node_statistics': stats_future.result(),
+                'exposed_services_count': record['exposed_services_count'],
+                'permissive_rules_count': record['permissive_rules_count'],
+                'unencrypted_resources_count': record['unencrypted_resources_count'],
+                'orphaned_security_groups_count': record['orphaned_security_groups_count'],
+                'high_risk_instances': record['high_risk_instances']
+            }
                 
         except Exception as e:
             logger.error(f"獲取資安摘要失敗: {e}")
             return {}
 
-
 # 使用範例
 if __name__ == "__main__":
-    from neo4j import GraphDatabase
-    
     # 連接設定
     NEO4J_URI = "bolt://localhost:7687"
     NEO4J_USERNAME = "neo4j"
     NEO4J_PASSWORD = "password"
     
     try:
-        # 創建驅動程式
-        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USERNAME, NEO4J_PASSWORD))
-        
-        # 創建分析器
-        analyzer = SecurityAnalyzer(driver)
+        # 創建分析器（含驅動程式）
+        analyzer = SecurityAnalyzer.from_uri(NEO4J_URI, (NEO4J_USERNAME, NEO4J_PASSWORD))
         
         print("=== 資安漏洞分析 ===")
         
@@ -291,11 +385,13 @@ if __name__ == "__main__":
         exposed_ssh = analyzer.find_exposed_services("22", "tcp")
         for service in exposed_ssh:
             print(f"  - {service['InstanceName']} ({service['InstanceID']}) - {service['PublicIP']}")
+        operators = analyzer.profile_exposed_services("22", "tcp")
+        print(f"  執行計畫使用索引查找: {'NodeIndexSeek' in operators} ({' <- '.join(operators)})")
         
         # 2. 找出過度寬鬆的規則
         print("\n2. 過度寬鬆的安全群組規則:")
-        permissive_rules = analyzer.find_overly_permissive_rules()
-        for rule in permissive_rules[:5]:  # 只顯示前5個
+        permissive_rules = analyzer.find_overly_permissive_rules(limit=5)  # 只顯示前5個
+        for rule in permissive_rules:
             print(f"  - {rule['SecurityGroupName']}: {rule['Protocol']}:{rule['PortRange']} from {rule['SourceCIDR']}")
         
         # 3. 找出未加密的資源
@@ -311,7 +407,7 @@ if __name__ == "__main__":
             print(f"  {key}: {value}")
         
         # 關閉連接
-        driver.close()
+        analyzer.driver.close()
         
     except Exception as e:
         print(f"分析失敗: {e}")
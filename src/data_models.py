@@ -64,22 +64,22 @@ class CartographyRelSchema:
 @dataclass(frozen=True)
 class EC2InstanceNodeProperties(CartographyNodeProperties):
     """EC2 實例節點屬性"""
-    id: PropertyRef = PropertyRef("InstanceId")
-    instanceid: PropertyRef = PropertyRef("InstanceId", extra_index=True)
-    name: PropertyRef = PropertyRef("Name")
-    state: PropertyRef = PropertyRef("State")
-    instancetype: PropertyRef = PropertyRef("InstanceType")
-    publicip: PropertyRef = PropertyRef("PublicIpAddress")
-    privateip: PropertyRef = PropertyRef("PrivateIpAddress")
-    imageid: PropertyRef = PropertyRef("ImageId")
-    launchtime: PropertyRef = PropertyRef("LaunchTime")
-    availabilityzone: PropertyRef = PropertyRef("AvailabilityZone")
-    region: PropertyRef = PropertyRef("Region", set_in_kwargs=True)
+    id: PropertyRef = PropertyRef("instanceid")
+    instanceid: PropertyRef = PropertyRef("instanceid", extra_index=True)
+    name: PropertyRef = PropertyRef("name")
+    state: PropertyRef = PropertyRef("state")
+    instancetype: PropertyRef = PropertyRef("instancetype")
+    publicip: PropertyRef = PropertyRef("publicip")
+    privateip: PropertyRef = PropertyRef("privateip")
+    imageid: PropertyRef = PropertyRef("imageid")
+    launchtime: PropertyRef = PropertyRef("launchtime")
+    availabilityzone: PropertyRef = PropertyRef("availabilityzone")
+    region: PropertyRef = PropertyRef("region", set_in_kwargs=True)
     lastupdated: PropertyRef = PropertyRef("lastupdated", set_in_kwargs=True)
-    platform: PropertyRef = PropertyRef("Platform")
-    architecture: PropertyRef = PropertyRef("Architecture")
-    ebsoptimized: PropertyRef = PropertyRef("EbsOptimized")
-    tenancy: PropertyRef = PropertyRef("Tenancy")
+    platform: PropertyRef = PropertyRef("platform")
+    architecture: PropertyRef = PropertyRef("architecture")
+    ebsoptimized: PropertyRef = PropertyRef("ebsoptimized")
+    tenancy: PropertyRef = PropertyRef("tenancy")
 
 
 @dataclass(frozen=True)
@@ -303,16 +303,16 @@ class SubnetSchema(CartographyNodeSchema):
 @dataclass(frozen=True)
 class EBSVolumeNodeProperties(CartographyNodeProperties):
     """EBS 磁碟節點屬性"""
-    id: PropertyRef = PropertyRef("VolumeId")
-    volumeid: PropertyRef = PropertyRef("VolumeId", extra_index=True)
-    size: PropertyRef = PropertyRef("Size")
-    volumetype: PropertyRef = PropertyRef("VolumeType")
-    state: PropertyRef = PropertyRef("State")
-    encrypted: PropertyRef = PropertyRef("Encrypted")
-    iops: PropertyRef = PropertyRef("Iops")
-    creationdate: PropertyRef = PropertyRef("CreationDate")
-    kmskeyid: PropertyRef = PropertyRef("KmsKeyId")
-    region: PropertyRef = PropertyRef("Region", set_in_kwargs=True)
+    id: PropertyRef = PropertyRef("volumeid")
+    volumeid: PropertyRef = PropertyRef("volumeid", extra_index=True)
+    size: PropertyRef = PropertyRef("size")
+    volumetype: PropertyRef = PropertyRef("volumetype")
+    state: PropertyRef = PropertyRef("state")
+    encrypted: PropertyRef = PropertyRef("encrypted", extra_index=True)
+    iops: PropertyRef = PropertyRef("iops")
+    creationdate: PropertyRef = PropertyRef("creationdate")
+    kmskeyid: PropertyRef = PropertyRef("kmskeyid")
+    region: PropertyRef = PropertyRef("region", set_in_kwargs=True)
     lastupdated: PropertyRef = PropertyRef("lastupdated", set_in_kwargs=True)
 
 
@@ -357,6 +357,10 @@ class EBSVolumeSchema(CartographyNodeSchema):
 # 安全規則模型
 # ============================================================================
 
+# 高風險連接埠（SSH、Telnet、RDP、SMB 與常見資料庫）；載入時據此為規則加上 HighRiskOpen 標籤
+HIGH_RISK_PORTS = (22, 23, 3389, 445, 1433, 3306, 5432, 6379, 27017)
+
+
 @dataclass(frozen=True)
 class SecurityRuleNodeProperties(CartographyNodeProperties):
     """安全規則節點屬性"""
@@ -364,7 +368,10 @@ class SecurityRuleNodeProperties(CartographyNodeProperties):
     ruleid: PropertyRef = PropertyRef("RuleId", extra_index=True)
     protocol: PropertyRef = PropertyRef("Protocol")
     portrange: PropertyRef = PropertyRef("PortRange")
+    fromport: PropertyRef = PropertyRef("FromPort")
+    toport: PropertyRef = PropertyRef("ToPort")
     sourcecidr: PropertyRef = PropertyRef("SourceCIDR")
+    opentoworld: PropertyRef = PropertyRef("OpenToWorld")
     direction: PropertyRef = PropertyRef("Direction")
     action: PropertyRef = PropertyRef("Action")
     description: PropertyRef = PropertyRef("Description")
@@ -436,6 +443,9 @@ class S3BucketSchema(CartographyNodeSchema):
 # 索引定義
 # ============================================================================
 
+# 架構版本；INDEXES、約束、SCHEMA_REGISTRY 或既有資料的轉換（載入器的 _backfill_properties）變更時需遞增
+CURRENT_SCHEMA_VERSION = 6
+
 INDEXES = [
     # EC2 實例索引
     "CREATE INDEX IF NOT EXISTS FOR (n:EC2Instance) ON (n.id)",
@@ -468,6 +478,7 @@ INDEXES = [
     "CREATE INDEX IF NOT EXISTS FOR (n:EBSVolume) ON (n.lastupdated)",
     "CREATE INDEX IF NOT EXISTS FOR (n:EBSVolume) ON (n.volumeid)",
     "CREATE INDEX IF NOT EXISTS FOR (n:EBSVolume) ON (n.state)",
+    "CREATE INDEX IF NOT EXISTS FOR (n:EBSVolume) ON (n.encrypted)",
     
     # 安全規則索引
     "CREATE INDEX IF NOT EXISTS FOR (n:SecurityRule) ON (n.id)",
@@ -475,6 +486,8 @@ INDEXES = [
     "CREATE INDEX IF NOT EXISTS FOR (n:SecurityRule) ON (n.ruleid)",
     "CREATE INDEX IF NOT EXISTS FOR (n:SecurityRule) ON (n.protocol)",
     "CREATE INDEX IF NOT EXISTS FOR (n:SecurityRule) ON (n.direction)",
+    # 對全網開放的規則依協定與連接埠範圍查詢（暴露服務、高風險連接埠）
+    "CREATE INDEX IF NOT EXISTS FOR (n:SecurityRule) ON (n.opentoworld, n.protocol, n.fromport, n.toport)",
     
     # S3 儲存桶索引
     "CREATE INDEX IF NOT EXISTS FOR (n:S3Bucket) ON (n.id)",
@@ -8,6 +8,8 @@
 import boto3
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
@@ -17,9 +19,12 @@ logger = logging.getLogger(__name__)
 class AWSExtractor:
     """AWS 資料提取器"""
     
-    def __init__(self, region: str = 'us-east-1'):
+    def __init__(self, region: str = 'us-east-1', max_workers: int = 8):
         self.region = region
+        self.max_workers = max_workers
         self.session = None
+        self._clients = {}
+        self._clients_lock = threading.Lock()
         self._initialize_session()
     
     def _initialize_session(self):
@@ -27,18 +32,27 @@ class AWSExtractor:
         try:
             self.session = boto3.Session(region_name=self.region)
             # 測試連接
-            sts = self.session.client('sts')
+            sts = self._client('sts')
             identity = sts.get_caller_identity()
-            logger.info(f"成功連接到 AWS，帳戶 ID: {identity.get('Account')}")
-            logger.info(f"使用者 ARN: {identity.get('Arn')}")
+            logger.info("成功連接到 AWS，帳戶 ID: %s", identity.get('Account'))
+            logger.info("使用者 ARN: %s", identity.get('Arn'))
         except Exception as e:
-            logger.error(f"AWS 連接失敗: {e}")
+            logger.error("AWS 連接失敗: %s", e)
             raise
     
+    def _client(self, service_name: str):
+        """取得快取的 boto3 client（session 非執行緒安全，client 則可跨執行緒共用）"""
+        with self._clients_lock:
+            client = self._clients.get(service_name)
+            if client is None:
+                client = self.session.client(service_name)
+                self._clients[service_name] = client
+            return client
+    
     def extract_ec2_instances(self) -> Dict[str, Any]:
         """提取 EC2 實例"""
         try:
-            ec2 = self.session.client('ec2')
+            ec2 = self._client('ec2')
             response = ec2.describe_instances()
             
             instances = []
@@ -64,20 +78,20 @@ class AWSExtractor:
             return {
                 'Reservations': [{
                     'ReservationId': f'r-{datetime.now().strftime("%Y%m%d%H%M%S")}',
-                    'OwnerId': self.session.client('sts').get_caller_identity()['Account'],
+                    'OwnerId': self._client('sts').get_caller_identity()['Account'],
                     'Groups': [],
                     'Instances': instances
                 }]
             }
             
         except Exception as e:
-            logger.error(f"提取 EC2 實例失敗: {e}")
+            logger.error("提取 EC2 實例失敗: %s", e)
             return {'Reservations': []}
     
     def extract_security_groups(self) -> Dict[str, Any]:
         """提取安全群組"""
         try:
-            ec2 = self.session.client('ec2')
+            ec2 = self._client('ec2')
             response = ec2.describe_security_groups()
             
             return {
@@ -85,13 +99,13 @@ class AWSExtractor:
             }
             
         except Exception as e:
-            logger.error(f"提取安全群組失敗: {e}")
+            logger.error("提取安全群組失敗: %s", e)
             return {'SecurityGroups': []}
     
     def extract_vpcs(self) -> Dict[str, Any]:
         """提取 VPC"""
         try:
-            ec2 = self.session.client('ec2')
+            ec2 = self._client('ec2')
             response = ec2.describe_vpcs()
             
             return {
@@ -99,13 +113,13 @@ class AWSExtractor:
             }
             
         except Exception as e:
-            logger.error(f"提取 VPC 失敗: {e}")
+            logger.error("提取 VPC 失敗: %s", e)
             return {'Vpcs': []}
     
     def extract_subnets(self) -> Dict[str, Any]:
         """提取子網路"""
         try:
-            ec2 = self.session.client('ec2')
+            ec2 = self._client('ec2')
             response = ec2.describe_subnets()
             
             return {
@@ -113,13 +127,13 @@ class AWSExtractor:
             }
             
         except Exception as e:
-            logger.error(f"提取子網路失敗: {e}")
+            logger.error("提取子網路失敗: %s", e)
             return {'Subnets': []}
     
     def extract_ebs_volumes(self) -> Dict[str, Any]:
         """提取 EBS 磁碟"""
         try:
-            ec2 = self.session.client('ec2')
+            ec2 = self._client('ec2')
             response = ec2.describe_volumes()
             
             return {
@@ -127,13 +141,13 @@ class AWSExtractor:
             }
             
         except Exception as e:
-            logger.error(f"提取 EBS 磁碟失敗: {e}")
+            logger.error("提取 EBS 磁碟失敗: %s", e)
             return {'Volumes': []}
     
     def extract_rds_instances(self) -> Dict[str, Any]:
         """提取 RDS 實例"""
         try:
-            rds = self.session.client('rds')
+            rds = self._client('rds')
             response = rds.describe_db_instances()
             
             return {
@@ -141,13 +155,13 @@ class AWSExtractor:
             }
             
         except Exception as e:
-            logger.error(f"提取 RDS 實例失敗: {e}")
+            logger.error("提取 RDS 實例失敗: %s", e)
             return {'DBInstances': []}
     
     def extract_load_balancers(self) -> Dict[str, Any]:
         """提取負載平衡器"""
         try:
-            elbv2 = self.session.client('elbv2')
+            elbv2 = self._client('elbv2')
             response = elbv2.describe_load_balancers()
             
             return {
@@ -155,13 +169,13 @@ class AWSExtractor:
             }
             
         except Exception as e:
-            logger.error(f"提取負載平衡器失敗: {e}")
+            logger.error("提取負載平衡器失敗: %s", e)
             return {'LoadBalancers': []}
     
     def extract_s3_buckets(self) -> Dict[str, Any]:
         """提取 S3 儲存桶"""
         try:
-            s3 = self.session.client('s3')
+            s3 = self._client('s3')
             response = s3.list_buckets()
             
             return {
@@ -170,13 +184,13 @@ class AWSExtractor:
             }
             
         except Exception as e:
-            logger.error(f"提取 S3 儲存桶失敗: {e}")
+            logger.error("提取 S3 儲存桶失敗: %s", e)
             return {'Buckets': [], 'Owner': {}}
     
     def extract_lambda_functions(self) -> Dict[str, Any]:
         """提取 Lambda 函數"""
         try:
-            lambda_client = self.session.client('lambda')
+            lambda_client = self._client('lambda')
             response = lambda_client.list_functions()
             
             return {
@@ -184,29 +198,39 @@ class AWSExtractor:
             }
             
         except Exception as e:
-            logger.error(f"提取 Lambda 函數失敗: {e}")
+            logger.error("提取 Lambda 函數失敗: %s", e)
             return {'Functions': []}
     
     def extract_all_resources(self) -> Dict[str, Any]:
         """提取所有 AWS 資源"""
         logger.info("開始提取真實 AWS 資源...")
         
+        extractors = {
+            'ec2_instances': self.extract_ec2_instances,
+            'security_groups': self.extract_security_groups,
+            'vpcs': self.extract_vpcs,
+            'subnets': self.extract_subnets,
+            'ebs_volumes': self.extract_ebs_volumes,
+            'rds_instances': self.extract_rds_instances,
+            'load_balancers': self.extract_load_balancers,
+            's3_buckets': self.extract_s3_buckets,
+            'lambda_functions': self.extract_lambda_functions
+        }
+        
         resources = {
             'metadata': {
                 'extraction_time': datetime.now().isoformat(),
                 'region': self.region,
                 'data_type': 'real_aws_data'
-            },
-            'ec2_instances': self.extract_ec2_instances(),
-            'security_groups': self.extract_security_groups(),
-            'vpcs': self.extract_vpcs(),
-            'subnets': self.extract_subnets(),
-            'ebs_volumes': self.extract_ebs_volumes(),
-            'rds_instances': self.extract_rds_instances(),
-            'load_balancers': self.extract_load_balancers(),
-            's3_buckets': self.extract_s3_buckets(),
-            'lambda_functions': self.extract_lambda_functions()
+            }
         }
         
+        # 各服務的 API 呼叫互相獨立，以執行緒池並行提取
+        # （每個 extract_* 方法自行捕捉錯誤並回傳空結果）
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {key: executor.submit(func) for key, func in extractors.items()}
+            for key, future in futures.items():
+                resources[key] = future.result()
+        
         logger.info("AWS 資源提取完成")
         return resources
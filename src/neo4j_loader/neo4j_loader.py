@@ -5,10 +5,11 @@
 參考了 Cartography 的批次處理和事務管理最佳實踐。
 """
 
+import re
 import time
 import logging
-from typing import Dict, List, Any, Optional, Union
-from functools import wraps
+from typing import Dict, List, Any, Optional, Tuple, Union
+from functools import partial, wraps
 from dataclasses import dataclass
 
 import neo4j
@@ -30,14 +31,103 @@ except ImportError:
 from ..data_models import (
     CartographyNodeSchema, 
     CartographyRelSchema,
+    CURRENT_SCHEMA_VERSION,
+    HIGH_RISK_PORTS,
     create_indexes,
     get_schema,
     get_all_schemas
 )
+from ..analysis.cost_optimization import (
+    ORPHANED_VOLUMES_QUERY,
+    STOPPED_INSTANCES_QUERY,
+    UNUSED_SECURITY_GROUPS_QUERY
+)
+from ..analysis.failure_impact_analysis import (
+    CRITICAL_NODES_QUERY,
+    RESOURCE_LABELS,
+    SINGLE_POINTS_QUERY,
+    critical_node_entries,
+    single_point_entries
+)
+from ..analysis.security_analysis import (
+    EXPOSED_SERVICES_QUERY,
+    PERMISSIVE_RULES_QUERY,
+    UNENCRYPTED_EBS_QUERY,
+    UNENCRYPTED_S3_QUERY,
+    group_exposed_services
+)
 
 logger = logging.getLogger(__name__)
 
 
+def _parse_port_range(port_range: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    將 "22-22"、"0-65535" 或單一連接埠字串解析為 (起始連接埠, 結束連接埠)
+    
+    無法解析時回傳 (None, None)，該規則不會符合任何連接埠範圍查詢。
+    """
+    if not port_range:
+        return None, None
+    
+    from_port, _, to_port = str(port_range).partition('-')
+    try:
+        from_port = int(from_port)
+        to_port = int(to_port) if to_port else from_port
+    except ValueError:
+        return None, None
+    return from_port, to_port
+
+
+
+def _return_columns(query: str) -> List[str]:
+    """取出查詢最後一個 RETURN 子句的輸出欄位名稱（別名，或未取別名時的變數名稱）"""
+    clause = query.rsplit('RETURN', 1)[1].split('ORDER BY', 1)[0]
+    return [re.split(r'\s+(?:AS|as)\s+', item.strip())[-1] for item in clause.split(',')]
+
+
+def _collect_subquery(name: str, query: str, capped: bool = False) -> str:
+    """
+    將分析器的清單查詢包成 CALL 子查詢，各列依欄位名稱組成 map 後收集為清單 name
+    
+    capped 為 True 時另外回傳 name_total（實際筆數），清單依 $node_limit 截斷（為 null 時不截斷）。
+    """
+    row = ', '.join(f"{column}: {column}" for column in _return_columns(query))
+    if not capped:
+        returns = f"collect({{{row}}}) AS {name}"
+    else:
+        returns = (f"count(*) AS {name}_total,\n"
+                   f"                   collect({{{row}}})[..coalesce($node_limit, count(*))] AS {name}")
+    return f"""
+        CALL {{
+            CALL {{{query}}}
+            RETURN {returns}
+        }}"""
+
+
+# 綜合分析的清單查詢：(結果名稱, 分析器的查詢)；各子查詢共用同一組參數
+COMPREHENSIVE_LISTS = [
+    ('exposed_services', EXPOSED_SERVICES_QUERY),
+    ('permissive_rules', PERMISSIVE_RULES_QUERY),
+    ('unencrypted_ebs', UNENCRYPTED_EBS_QUERY),
+    ('unencrypted_s3', UNENCRYPTED_S3_QUERY),
+    ('critical_nodes', CRITICAL_NODES_QUERY),
+    ('single_points_of_failure', SINGLE_POINTS_QUERY),
+    ('orphaned_volumes', ORPHANED_VOLUMES_QUERY),
+    ('unused_security_groups', UNUSED_SECURITY_GROUPS_QUERY),
+    ('stopped_instances', STOPPED_INSTANCES_QUERY),
+]
+
+# 依 $node_limit 截斷的清單：逐一列出完整節點屬性，筆數可能與圖的規模相當
+COMPREHENSIVE_CAPPED_LISTS = ('critical_nodes', 'single_points_of_failure')
+
+# 以單一查詢取得全部清單：直接組合分析器的查詢常數，結果與各分析器單獨執行時一致
+COMPREHENSIVE_QUERY = "".join(
+    _collect_subquery(name, query, name in COMPREHENSIVE_CAPPED_LISTS) for name, query in COMPREHENSIVE_LISTS
+) + "\n        RETURN " + ", ".join(
+    [name for name, _ in COMPREHENSIVE_LISTS] + [f"{name}_total" for name in COMPREHENSIVE_CAPPED_LISTS]
+) + "\n"
+
+
 def timeit(func):
     """計時裝飾器"""
     @wraps(func)
@@ -45,7 +135,7 @@ def timeit(func):
         start_time = time.time()
         result = func(*args, **kwargs)
         end_time = time.time()
-        logger.info(f"{func.__name__} 執行時間: {end_time - start_time:.2f} 秒")
+        logger.info("%s 執行時間: %.2f 秒", func.__name__, end_time - start_time)
         return result
     return wrapper
 
@@ -59,18 +149,25 @@ class LoadConfig:
     create_indexes: bool = True
     cleanup_old_data: bool = True
     use_advanced_loading: bool = True  # 啟用進階載入功能
+    use_apoc_iterate: bool = False     # 以 apoc.periodic.iterate 在伺服器端分批寫入（需安裝 APOC）
+    apoc_batch_size: int = 1000
+    max_connection_pool_size: int = 50           # 驅動程式連線池大小（分析器共用）
+    connection_acquisition_timeout: float = 60.0
 
 
 class ImprovedNeo4jLoader:
     """改進的 Neo4j 載入器，基於 Cartography 架構"""
     
-    def __init__(self, uri: str, username: str, password: str, database: str = "neo4j"):
+    def __init__(self, uri: str, username: str, password: str, database: str = "neo4j",
+                 config: Optional[LoadConfig] = None):
         self.uri = uri
         self.username = username
         self.password = password
         self.database = database
+        self.config = config or LoadConfig()
         self.driver = None
         self.session = None
+        self.session_factory = None
         self.update_tag = int(time.time())
         
     def connect(self) -> bool:
@@ -78,9 +175,12 @@ class ImprovedNeo4jLoader:
         try:
             self.driver = GraphDatabase.driver(
                 self.uri, 
-                auth=(self.username, self.password)
+                auth=(self.username, self.password),
+                max_connection_pool_size=self.config.max_connection_pool_size,
+                connection_acquisition_timeout=self.config.connection_acquisition_timeout
             )
-            self.session = self.driver.session(database=self.database)
+            self.session_factory = partial(self.driver.session, database=self.database)
+            self.session = self.session_factory()
             
             # 測試連接
             self.session.run("RETURN 1")
@@ -88,7 +188,7 @@ class ImprovedNeo4jLoader:
             return True
             
         except Exception as e:
-            logger.error(f"連接 Neo4j 失敗: {e}")
+            logger.error("連接 Neo4j 失敗: %s", e)
             return False
     
     def close(self):
@@ -99,11 +199,15 @@ class ImprovedNeo4jLoader:
             self.driver.close()
         logger.info("Neo4j 連接已關閉")
     
-    def setup_schema(self):
-        """設定資料庫架構"""
+    def setup_schema(self, force: bool = False):
+        """設定資料庫架構（已是最新版本時略過）"""
         if not self.session:
             raise RuntimeError("未連接到 Neo4j")
         
+        if not force and self._get_schema_version() == CURRENT_SCHEMA_VERSION:
+            logger.info("資料庫架構已是版本 %s，略過設定", CURRENT_SCHEMA_VERSION)
+            return
+        
         logger.info("設定資料庫架構...")
         
         # 創建索引
@@ -112,8 +216,96 @@ class ImprovedNeo4jLoader:
         # 創建約束
         self._create_constraints()
         
+        # 補齊舊資料的屬性
+        self._backfill_properties()
+        
+        # 記錄架構版本
+        self.session.run(
+            "MERGE (s:SchemaVersion) SET s.v = $version",
+            version=CURRENT_SCHEMA_VERSION
+        )
+        
         logger.info("資料庫架構設定完成")
     
+    def _backfill_properties(self):
+        """轉換舊版載入器留下的屬性，讓既有資料不必重新載入即符合目前的查詢與索引"""
+        # 舊版以 AWS 欄位名稱（RuleId、PortRange 等）寫入安全規則；改為架構宣告的小寫屬性，
+        # 並補上連接埠範圍、是否對全網開放，以及 OpenToWorld／HighRiskOpen 標籤
+        self.session.run("""
+        MATCH (rule:SecurityRule)
+        WHERE rule.ruleid IS NULL AND rule.RuleId IS NOT NULL
+        WITH rule, split(coalesce(rule.PortRange, ''), '-') AS ports
+        SET rule.ruleid = rule.RuleId,
+            rule.groupid = rule.GroupId,
+            rule.protocol = rule.Protocol,
+            rule.portrange = rule.PortRange,
+            rule.fromport = toInteger(ports[0]),
+            rule.toport = coalesce(toInteger(ports[1]), toInteger(ports[0])),
+            rule.sourcecidr = rule.SourceCIDR,
+            rule.opentoworld = coalesce(rule.SourceCIDR, '') CONTAINS '0.0.0.0/0',
+            rule.direction = rule.Direction,
+            rule.action = rule.Action,
+            rule.description = rule.Description
+        REMOVE rule.RuleId, rule.GroupId, rule.Protocol, rule.PortRange, rule.FromPort, rule.ToPort,
+               rule.SourceCIDR, rule.OpenToWorld, rule.Direction, rule.Action, rule.Description
+        """)
+        self.session.run("""
+        MATCH (rule:SecurityRule)
+        REMOVE rule:OpenToWorld:HighRiskOpen
+        WITH rule
+        WHERE rule.opentoworld = true AND rule.direction = 'inbound'
+        SET rule:OpenToWorld
+        WITH rule
+        WHERE any(port IN $high_risk_ports WHERE rule.fromport <= port <= rule.toport)
+        SET rule:HighRiskOpen
+        """, high_risk_ports=list(HIGH_RISK_PORTS))
+        
+        # 舊版以 AWS 欄位名稱（InstanceId、State 等）寫入 EC2 實例；改為架構宣告的小寫屬性，
+        # 讓 state 等查詢條件能使用 INDEXES 中的索引。舊欄位仍存在表示它比小寫屬性新寫入，因此優先採用
+        self.session.run("""
+        MATCH (i:EC2Instance)
+        WHERE i.InstanceId IS NOT NULL
+        SET i.instanceid = coalesce(i.InstanceId, i.instanceid),
+            i.name = coalesce(i.Name, i.name),
+            i.state = coalesce(i.State, i.state),
+            i.instancetype = coalesce(i.InstanceType, i.instancetype),
+            i.publicip = coalesce(i.PublicIpAddress, i.publicip),
+            i.privateip = coalesce(i.PrivateIpAddress, i.privateip),
+            i.imageid = coalesce(i.ImageId, i.imageid),
+            i.launchtime = coalesce(i.LaunchTime, i.launchtime),
+            i.availabilityzone = coalesce(i.AvailabilityZone, i.availabilityzone),
+            i.region = coalesce(i.region, i.Region)
+        REMOVE i.InstanceId, i.Name, i.State, i.InstanceType, i.PublicIpAddress, i.PrivateIpAddress,
+               i.ImageId, i.LaunchTime, i.AvailabilityZone, i.Region
+        """)
+        
+        # 舊版以 AWS 欄位名稱（VolumeId、State、Encrypted 等）寫入 EBS 磁碟；改為架構宣告的小寫屬性。
+        # 舊欄位仍存在表示它比小寫屬性新寫入，因此優先採用；加密狀態缺值視為未加密
+        self.session.run("""
+        MATCH (v:EBSVolume)
+        WHERE v.VolumeId IS NOT NULL OR v.Encrypted IS NOT NULL OR v.encrypted IS NULL
+        SET v.volumeid = coalesce(v.VolumeId, v.volumeid),
+            v.size = coalesce(v.Size, v.size),
+            v.volumetype = coalesce(v.VolumeType, v.volumetype),
+            v.state = coalesce(v.State, v.state),
+            v.encrypted = coalesce(v.Encrypted, v.encrypted, false),
+            v.iops = coalesce(v.Iops, v.iops),
+            v.creationdate = coalesce(v.CreationDate, v.creationdate),
+            v.kmskeyid = coalesce(v.KmsKeyId, v.kmskeyid),
+            v.region = coalesce(v.region, v.Region)
+        REMOVE v.VolumeId, v.Size, v.VolumeType, v.State, v.Encrypted,
+               v.Iops, v.CreationDate, v.KmsKeyId, v.Region
+        """)
+    
+    def _get_schema_version(self) -> Optional[int]:
+        """讀取資料庫中記錄的架構版本"""
+        try:
+            record = self.session.run("MATCH (s:SchemaVersion) RETURN s.v AS v LIMIT 1").single()
+            return record['v'] if record else None
+        except Exception as e:
+            logger.debug("讀取架構版本失敗: %s", e)
+            return None
+    
     def _create_constraints(self):
         """創建約束"""
         # 先刪除現有的索引，避免與約束衝突
@@ -131,7 +323,7 @@ class ImprovedNeo4jLoader:
             try:
                 self.session.run(drop_index)
             except Exception as e:
-                logger.debug(f"刪除索引: {drop_index}, 錯誤: {e}")
+                logger.debug("刪除索引: %s, 錯誤: %s", drop_index, e)
         
         # 創建約束
         constraints = [
@@ -148,7 +340,7 @@ class ImprovedNeo4jLoader:
             try:
                 self.session.run(constraint)
             except Exception as e:
-                logger.warning(f"創建約束失敗: {constraint}, 錯誤: {e}")
+                logger.warning("創建約束失敗: %s, 錯誤: %s", constraint, e)
     
     @timeit
     def load_nodes(self, node_type: str, data: List[Dict[str, Any]], 
@@ -159,23 +351,27 @@ class ImprovedNeo4jLoader:
         
         schema = get_schema(node_type)
         if not schema:
-            logger.error(f"未知的節點類型: {node_type}")
+            logger.error("未知的節點類型: %s", node_type)
             return False
         
-        logger.info(f"載入 {len(data)} 個 {node_type} 節點...")
+        logger.info("載入 %s 個 %s 節點...", len(data), node_type)
         
         try:
-            # 批次處理
-            batch_size = 1000
-            for i in range(0, len(data), batch_size):
-                batch = data[i:i + batch_size]
-                self._load_node_batch(schema, batch, region, account_id)
+            if self.config.use_apoc_iterate:
+                # 整份資料一次送出，由伺服器端 apoc.periodic.iterate 分批提交
+                self._load_node_batch_apoc(schema, data, region, account_id)
+            else:
+                # 批次處理
+                batch_size = 1000
+                for i in range(0, len(data), batch_size):
+                    batch = data[i:i + batch_size]
+                    self._load_node_batch(schema, batch, region, account_id)
             
-            logger.info(f"成功載入 {len(data)} 個 {node_type} 節點")
+            logger.info("成功載入 %s 個 %s 節點", len(data), node_type)
             return True
             
         except Exception as e:
-            logger.error(f"載入 {node_type} 節點失敗: {e}")
+            logger.error("載入 %s 節點失敗: %s", node_type, e)
             return False
     
     def _load_node_batch(self, schema: CartographyNodeSchema, batch: List[Dict], 
@@ -195,14 +391,44 @@ class ImprovedNeo4jLoader:
         # 執行查詢
         self.session.run(query, params)
     
+    def _load_node_batch_apoc(self, schema: CartographyNodeSchema, data: List[Dict],
+                              region: str = None, account_id: str = None):
+        """透過 apoc.periodic.iterate 載入節點"""
+        query = """
+        CALL apoc.periodic.iterate(
+            'UNWIND $batch AS item RETURN item',
+            $action,
+            {batchSize: $batch_size, parallel: false,
+             params: {batch: $batch, region: $region, account_id: $account_id, lastupdated: $lastupdated}}
+        )
+        YIELD failedBatches, errorMessages
+        RETURN failedBatches, errorMessages
+        """
+        
+        params = {
+            'action': self._build_node_merge_clause(schema),
+            'batch': data,
+            'batch_size': self.config.apoc_batch_size,
+            'region': region,
+            'account_id': account_id,
+            'lastupdated': self.update_tag
+        }
+        
+        # apoc.periodic.iterate 不會因批次失敗而拋出例外，需檢查回傳的失敗批次數
+        record = self.session.run(query, params).single()
+        if record and record['failedBatches']:
+            raise RuntimeError(
+                f"apoc.periodic.iterate 有 {record['failedBatches']} 個批次失敗: {record['errorMessages']}"
+            )
+    
     def _build_node_query(self, schema: CartographyNodeSchema) -> str:
         """構建節點查詢"""
-        # 獲取屬性列表
-        properties = schema.properties.__dict__
-        
+        return "UNWIND $batch as item\n" + self._build_node_merge_clause(schema)
+    
+    def _build_node_merge_clause(self, schema: CartographyNodeSchema) -> str:
+        """構建單筆 item 的 MERGE/SET 子句"""
         # 構建 MERGE 查詢 - 使用動態屬性載入
         query = f"""
-        UNWIND $batch as item
         MERGE (n:{schema.label} {{id: item.id}})
         SET n += item
         SET n.lastupdated = $lastupdated
@@ -210,7 +436,8 @@ class ImprovedNeo4jLoader:
         
         # 添加區域和帳戶 ID
         if hasattr(schema.properties, 'region'):
-            query += "SET n.region = $region\n"
+            # 未指定區域時保留資料本身的 region 屬性
+            query += "SET n.region = coalesce($region, item.region)\n"
         if hasattr(schema.properties, 'account_id'):
             query += "SET n.account_id = $account_id\n"
         
@@ -222,7 +449,7 @@ class ImprovedNeo4jLoader:
         if not self.session:
             raise RuntimeError("未連接到 Neo4j")
         
-        logger.info(f"載入 {len(data)} 個 {rel_type} 關係...")
+        logger.info("載入 %s 個 %s 關係...", len(data), rel_type)
         
         try:
             # 批次處理
@@ -231,11 +458,11 @@ class ImprovedNeo4jLoader:
                 batch = data[i:i + batch_size]
                 self._load_relationship_batch(rel_type, batch)
             
-            logger.info(f"成功載入 {len(data)} 個 {rel_type} 關係")
+            logger.info("成功載入 %s 個 %s 關係", len(data), rel_type)
             return True
             
         except Exception as e:
-            logger.error(f"載入 {rel_type} 關係失敗: {e}")
+            logger.error("載入 %s 關係失敗: %s", rel_type, e)
             return False
     
     def _load_relationship_batch(self, rel_type: str, batch: List[Dict]):
@@ -274,7 +501,7 @@ class ImprovedNeo4jLoader:
             SET r.lastupdated = $lastupdated
             """
         else:
-            logger.warning(f"未知的關係類型: {rel_type}")
+            logger.warning("未知的關係類型: %s", rel_type)
             return
         
         # 執行查詢
@@ -293,7 +520,7 @@ class ImprovedNeo4jLoader:
         if node_types is None:
             node_types = list(get_all_schemas().keys())
         
-        logger.info(f"清理舊資料: {node_types}")
+        logger.info("清理舊資料: %s", node_types)
         
         for node_type in node_types:
             try:
@@ -303,9 +530,9 @@ class ImprovedNeo4jLoader:
                 DETACH DELETE n
                 """
                 self.session.run(query, {'update_tag': self.update_tag})
-                logger.info(f"清理 {node_type} 舊資料完成")
+                logger.info("清理 %s 舊資料完成", node_type)
             except Exception as e:
-                logger.error(f"清理 {node_type} 舊資料失敗: {e}")
+                logger.error("清理 %s 舊資料失敗: %s", node_type, e)
     
     @timeit
     def load_aws_data(self, data: Dict[str, Any], region: str = None, 
@@ -327,7 +554,7 @@ class ImprovedNeo4jLoader:
             return True
             
         except Exception as e:
-            logger.error(f"載入 AWS 資料失敗: {e}")
+            logger.error("載入 AWS 資料失敗: %s", e)
             return False
     
     def _load_aws_nodes(self, data: Dict[str, Any], region: str, account_id: str):
@@ -375,18 +602,24 @@ class ImprovedNeo4jLoader:
         if isinstance(ec2_data, dict) and 'Reservations' in ec2_data:
             for reservation in ec2_data['Reservations']:
                 for instance in reservation['Instances']:
+                    # AWS API 的 State 為 {'Name': ...}，AWSExtractor 已先攤平為字串
+                    state = instance.get('State') or {}
+                    if isinstance(state, dict):
+                        state = state.get('Name', 'unknown')
+                    
+                    # 以架構宣告、查詢與索引使用的小寫屬性寫入
                     instances.append({
                         'id': instance.get('InstanceId'),  # 添加 id 欄位
-                        'InstanceId': instance.get('InstanceId'),
-                        'Name': instance.get('Name'),
-                        'State': instance.get('State', {}).get('Name', 'unknown'),
-                        'InstanceType': instance.get('InstanceType'),
-                        'PublicIpAddress': instance.get('PublicIpAddress'),
-                        'PrivateIpAddress': instance.get('PrivateIpAddress'),
-                        'ImageId': instance.get('ImageId'),
-                        'LaunchTime': instance.get('LaunchTime'),
-                        'AvailabilityZone': instance.get('Placement', {}).get('AvailabilityZone'),
-                        'Region': instance.get('Region', 'unknown')
+                        'instanceid': instance.get('InstanceId'),
+                        'name': instance.get('Name'),
+                        'state': state,
+                        'instancetype': instance.get('InstanceType'),
+                        'publicip': instance.get('PublicIpAddress'),
+                        'privateip': instance.get('PrivateIpAddress'),
+                        'imageid': instance.get('ImageId'),
+                        'launchtime': instance.get('LaunchTime'),
+                        'availabilityzone': instance.get('Placement', {}).get('AvailabilityZone'),
+                        'region': instance.get('Region', 'unknown')
                     })
         
         return instances
@@ -451,16 +684,18 @@ class ImprovedNeo4jLoader:
         if isinstance(volume_data, dict) and 'Volumes' in volume_data:
             for volume in volume_data['Volumes']:
                 volumes.append({
+                    # 以架構宣告、查詢與索引使用的小寫屬性寫入
                     'id': volume.get('VolumeId'),  # 添加 id 欄位
-                    'VolumeId': volume.get('VolumeId'),
-                    'Size': volume.get('Size'),
-                    'VolumeType': volume.get('VolumeType'),
-                    'State': volume.get('State'),
-                    'Encrypted': volume.get('Encrypted', False),
-                    'Iops': volume.get('Iops'),
-                    'CreationDate': volume.get('CreationDate'),
-                    'KmsKeyId': volume.get('KmsKeyId'),
-                    'Region': volume.get('Region', 'unknown')
+                    'volumeid': volume.get('VolumeId'),
+                    'size': volume.get('Size'),
+                    'volumetype': volume.get('VolumeType'),
+                    'state': volume.get('State'),
+                    # 缺值視為未加密，確保屬性一律為布林值
+                    'encrypted': bool(volume.get('Encrypted')),
+                    'iops': volume.get('Iops'),
+                    'creationdate': volume.get('CreationDate'),
+                    'kmskeyid': volume.get('KmsKeyId'),
+                    'region': volume.get('Region', 'unknown')
                 })
         
         return volumes
@@ -560,20 +795,28 @@ class ImprovedNeo4jLoader:
         if 'security_rules' in data and 'Rules' in data['security_rules']:
             rules = []
             for rule in data['security_rules']['Rules']:
+                # 連接埠範圍與是否對全網開放在載入時算好，查詢可用數值範圍與索引而非字串比對；
+                # 鍵名與 SecurityRuleNodeProperties 宣告的屬性一致，SET n += item 後即為分析查詢讀取的屬性
+                from_port, to_port = _parse_port_range(rule.get('PortRange'))
+                source_cidr = rule.get('SourceCIDR')
                 rules.append({
                     'id': rule.get('RuleId'),
-                    'RuleId': rule.get('RuleId'),
-                    'GroupId': rule.get('GroupId'),
-                    'Protocol': rule.get('Protocol'),
-                    'PortRange': rule.get('PortRange'),
-                    'SourceCIDR': rule.get('SourceCIDR'),
-                    'Direction': rule.get('Direction'),
-                    'Action': rule.get('Action'),
-                    'Description': rule.get('Description')
+                    'ruleid': rule.get('RuleId'),
+                    'groupid': rule.get('GroupId'),
+                    'protocol': rule.get('Protocol'),
+                    'portrange': rule.get('PortRange'),
+                    'fromport': from_port,
+                    'toport': to_port,
+                    'sourcecidr': source_cidr,
+                    'opentoworld': '0.0.0.0/0' in (source_cidr or ''),
+                    'direction': rule.get('Direction'),
+                    'action': rule.get('Action'),
+                    'description': rule.get('Description')
                 })
             
             if rules:
                 self.load_nodes("SecurityRule", rules)
+                self._tag_exposed_rules(rules)
         
         # 載入安全群組到安全規則的關係
         if 'security_rules' in data and 'Rules' in data['security_rules']:
@@ -587,6 +830,35 @@ class ImprovedNeo4jLoader:
             if relationships:
                 self.load_relationships("HAS_RULE", relationships)
     
+    def _tag_exposed_rules(self, rules: List[Dict[str, Any]]):
+        """
+        為對全網開放的入站規則加上 OpenToWorld 標籤，涵蓋高風險連接埠者再加上 HighRiskOpen
+        
+        條件在載入時判斷一次，分析查詢只需依標籤找出規則，不必逐條比對來源 CIDR 與連接埠範圍。
+        重新載入時會先移除舊標籤，規則變更後標籤仍保持正確。
+        """
+        tags = []
+        for rule in rules:
+            open_to_world = rule['opentoworld'] and rule.get('direction') == 'inbound'
+            from_port, to_port = rule['fromport'], rule['toport']
+            high_risk = open_to_world and from_port is not None and any(
+                from_port <= port <= to_port for port in HIGH_RISK_PORTS
+            )
+            tags.append({'id': rule['id'], 'open_to_world': open_to_world, 'high_risk': high_risk})
+        
+        query = """
+        UNWIND $tags AS tag
+        MATCH (rule:SecurityRule {id: tag.id})
+        REMOVE rule:OpenToWorld:HighRiskOpen
+        WITH rule, tag
+        FOREACH (_ IN CASE WHEN tag.open_to_world THEN [1] ELSE [] END | SET rule:OpenToWorld)
+        FOREACH (_ IN CASE WHEN tag.high_risk THEN [1] ELSE [] END | SET rule:HighRiskOpen)
+        """
+        
+        batch_size = 1000
+        for i in range(0, len(tags), batch_size):
+            self.session.run(query, tags=tags[i:i + batch_size])
+    
     def get_statistics(self) -> Dict[str, int]:
         """獲取資料庫統計資訊"""
         if not self.session:
@@ -608,12 +880,56 @@ class ImprovedNeo4jLoader:
         
         return stats
     
+    def run_comprehensive_cypher(self, node_limit: Optional[int] = None, port: int = 22,
+                                 protocol: str = 'tcp', min_connections: int = 5) -> Dict[str, Any]:
+        """
+        以單一查詢（一次往返）取得綜合分析的各項清單
+        
+        Args:
+            node_limit: 關鍵節點與單點故障清單的筆數上限；None 表示全部。
+                超過上限時清單只含排序後的前 node_limit 筆，
+                並以 <清單>_total 回報實際筆數、<清單>_truncated 標示是否截斷
+            port: 暴露服務查詢的連接埠
+            protocol: 暴露服務查詢的協定
+            min_connections: 關鍵節點的最少連接數
+            
+        Returns:
+            {清單名稱: 清單}，格式與對應分析器方法的回傳值相同
+        """
+        if not self.session:
+            raise RuntimeError("未連接到 Neo4j")
+        
+        def _comprehensive_tx(tx: neo4j.Transaction) -> Dict[str, Any]:
+            return tx.run(
+                COMPREHENSIVE_QUERY, node_limit=node_limit, port=port, protocol=protocol,
+                min_connections=min_connections, resource_labels=RESOURCE_LABELS
+            ).single().data()
+        
+        record = self.session.execute_read(_comprehensive_tx)
+        
+        lists = {
+            'exposed_services': group_exposed_services(record['exposed_services']),
+            'permissive_rules': record['permissive_rules'],
+            # 與 find_unencrypted_resources 相同，EBS 磁碟在前
+            'unencrypted_resources': record['unencrypted_ebs'] + record['unencrypted_s3'],
+            'critical_nodes': critical_node_entries(record['critical_nodes']),
+            'single_points_of_failure': single_point_entries(record['single_points_of_failure']),
+            'orphaned_volumes': record['orphaned_volumes'],
+            'unused_security_groups': record['unused_security_groups'],
+            'stopped_instances': record['stopped_instances'],
+        }
+        for name in COMPREHENSIVE_CAPPED_LISTS:
+            total = record[f'{name}_total']
+            lists[f'{name}_total'] = total
+            lists[f'{name}_truncated'] = total > len(lists[name])
+        return lists
+    
     # ===== 進階功能（基於 Cartography 架構） =====
     
     def load_with_schema_advanced(self, schema: CartographyNodeSchema, data: List[Dict[str, Any]], **kwargs) -> None:
         """使用 Schema 進階載入資料（批次處理 + 重試機制）"""
         if not data:
-            logger.info(f"沒有 {schema.label} 資料需要載入")
+            logger.info("沒有 %s 資料需要載入", schema.label)
             return
         
         if not self.config.use_advanced_loading:
@@ -626,7 +942,7 @@ class ImprovedNeo4jLoader:
         # 批次載入
         self._load_data_in_batches_advanced(schema, data, **kwargs)
         
-        logger.info(f"成功載入 {len(data)} 個 {schema.label} 節點")
+        logger.info("成功載入 %s 個 %s 節點", len(data), schema.label)
     
     def _ensure_indexes_advanced(self, schema: CartographyNodeSchema) -> None:
         """確保索引存在（進階版本）"""
@@ -648,7 +964,7 @@ class ImprovedNeo4jLoader:
             try:
                 self._run_index_query_with_retry(query)
             except Exception as e:
-                logger.warning(f"建立索引失敗: {e}")
+                logger.warning("建立索引失敗: %s", e)
     
     def _run_index_query_with_retry(self, query: str) -> None:
         """執行索引查詢並重試"""
@@ -681,7 +997,7 @@ class ImprovedNeo4jLoader:
                     backoff.expo,
                     (ServiceUnavailable, SessionExpired, TransientError),
                     max_tries=self.config.max_retries,
-                    on_backoff=lambda details: logger.warning(f"重試載入，第 {details['tries']} 次嘗試")
+                    on_backoff=lambda details: logger.warning("重試載入，第 %s 次嘗試", details['tries'])
                 )
                 def _load_with_retry():
                     self.session.write_transaction(_load_batch_tx)
@@ -689,7 +1005,7 @@ class ImprovedNeo4jLoader:
             else:
                 self.session.write_transaction(_load_batch_tx)
             
-            logger.debug(f"載入批次 {i//batch_size + 1}/{(len(data)-1)//batch_size + 1}")
+            logger.debug("載入批次 %s/%s", i//batch_size + 1, (len(data)-1)//batch_size + 1)
     
     def _build_batch_query(self, schema: CartographyNodeSchema, batch: List[Dict[str, Any]]) -> str:
         """建構批次載入查詢"""
@@ -747,9 +1063,9 @@ class ImprovedNeo4jLoader:
                 else:
                     self.session.write_transaction(_cleanup_tx)
                 
-                logger.info(f"清理 {label} 舊資料完成")
+                logger.info("清理 %s 舊資料完成", label)
             except Exception as e:
-                logger.error(f"清理 {label} 失敗: {e}")
+                logger.error("清理 %s 失敗: %s", label, e)
     
     def run_analysis_advanced(self, analysis_type: str) -> List[Dict[str, Any]]:
         """執行進階分析查詢"""
@@ -761,7 +1077,7 @@ class ImprovedNeo4jLoader:
                   AND rule.PortRange CONTAINS '22'
                   AND rule.Protocol = 'tcp'
                 SET instance.exposed_ssh = true
-                RETURN instance.Name, instance.PublicIP, sg.GroupName
+                RETURN instance.name, instance.publicip, sg.GroupName
             """,
             'exposed_ssh': """
                 MATCH (instance:EC2Instance)-[:MEMBER_OF]->(sg:SecurityGroup),
@@ -770,7 +1086,7 @@ class ImprovedNeo4jLoader:
                   AND rule.PortRange CONTAINS '22'
                   AND rule.Protocol = 'tcp'
                 SET instance.exposed_ssh = true
-                RETURN instance.Name, instance.PublicIP, sg.GroupName
+                RETURN instance.name, instance.publicip, sg.GroupName
             """,
             'overly_permissive': """
                 MATCH (sg:SecurityGroup)-[:HAS_RULE]->(rule:Rule)
@@ -790,32 +1106,32 @@ class ImprovedNeo4jLoader:
             'orphaned_volumes': """
                 MATCH (volume:EBSVolume)
                 WHERE NOT (volume)-[:ATTACHES_TO]->(:EC2Instance)
-                  AND volume.State = 'available'
+                  AND volume.state = 'available'
                 SET volume.orphaned = true
-                RETURN volume.VolumeId, volume.Size, volume.VolumeType
-                ORDER BY volume.Size DESC
+                RETURN volume.volumeid, volume.size, volume.volumetype
+                ORDER BY volume.size DESC
             """,
             'cost': """
                 MATCH (instance:EC2Instance)
-                WHERE instance.State = 'stopped'
-                  AND instance.LaunchTime < datetime() - duration('P30D')
+                WHERE instance.state = 'stopped'
+                  AND instance.launchtime < datetime() - duration('P30D')
                 SET instance.cost_optimization_candidate = true
-                RETURN instance.Name, instance.InstanceType, instance.LaunchTime
-                ORDER BY instance.LaunchTime ASC
+                RETURN instance.name, instance.instancetype, instance.launchtime
+                ORDER BY instance.launchtime ASC
             """,
             'cost_optimization': """
                 MATCH (instance:EC2Instance)
-                WHERE instance.State = 'stopped'
-                  AND instance.LaunchTime < datetime() - duration('P30D')
+                WHERE instance.state = 'stopped'
+                  AND instance.launchtime < datetime() - duration('P30D')
                 SET instance.cost_optimization_candidate = true
-                RETURN instance.Name, instance.InstanceType, instance.LaunchTime
-                ORDER BY instance.LaunchTime ASC
+                RETURN instance.name, instance.instancetype, instance.launchtime
+                ORDER BY instance.launchtime ASC
             """
         }
         
         query = analysis_queries.get(analysis_type)
         if not query:
-            logger.error(f"未知的分析類型: {analysis_type}")
+            logger.error("未知的分析類型: %s", analysis_type)
             return []
         
         def _run_analysis_tx(tx: neo4j.Transaction) -> List[Dict[str, Any]]:
@@ -825,8 +1141,8 @@ class ImprovedNeo4jLoader:
         try:
             # 使用 execute_write 因為查詢中包含 SET 操作
             findings = self.session.execute_write(_run_analysis_tx)
-            logger.info(f"分析 {analysis_type} 完成，發現 {len(findings)} 個問題")
+            logger.info("分析 %s 完成，發現 %s 個問題", analysis_type, len(findings))
             return findings
         except Exception as e:
-            logger.error(f"分析 {analysis_type} 失敗: {e}")
+            logger.error("分析 %s 失敗: %s", analysis_type, e)
             return []
@@ -5,7 +5,9 @@
 參考了 Cartography 的規則引擎最佳實踐。
 """
 
+import json
 import logging
+import operator
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import List, Dict, Any, Optional, Tuple
@@ -24,6 +26,14 @@ class Severity(Enum):
     INFO = "INFO"
 
 
+# 輸出時序列化的欄位（不含 cypher_query）
+FINDING_EXPORT_FIELDS = (
+    'rule_id', 'rule_name', 'severity', 'description',
+    'affected_resources', 'recommendation', 'metadata'
+)
+_get_finding_export_values = operator.attrgetter(*FINDING_EXPORT_FIELDS)
+
+
 @dataclass
 class SecurityFinding:
     """安全發現"""
@@ -35,6 +45,12 @@ class SecurityFinding:
     recommendation: str
     cypher_query: str
     metadata: Dict[str, Any] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """轉換為可 JSON 序列化的字典"""
+        data = dict(zip(FINDING_EXPORT_FIELDS, _get_finding_export_values(self)))
+        data['severity'] = self.severity.value
+        return data
 
 
 class SecurityRule(ABC):
@@ -248,8 +264,8 @@ class UnencryptedEBSRule(SecurityRule):
     def get_cypher_query(self) -> str:
         return """
         MATCH (volume:EBSVolume)
-        WHERE volume.Encrypted = false
-          AND volume.State = 'in-use'
+        WHERE volume.encrypted = false
+          AND volume.state = 'in-use'
         RETURN volume
         """
     
@@ -303,7 +319,7 @@ class OrphanedEBSRule(SecurityRule):
         return """
         MATCH (volume:EBSVolume)
         WHERE NOT (volume)-[:ATTACHES_TO]->(:EC2Instance)
-          AND volume.State = 'available'
+          AND volume.state = 'available'
         RETURN volume
         """
     
@@ -473,12 +489,12 @@ class SecurityRulesEngine:
     def add_rule(self, rule: SecurityRule):
         """添加自定義規則"""
         self.rules.append(rule)
-        logger.info(f"添加安全規則: {rule.rule_name}")
+        logger.info("添加安全規則: %s", rule.rule_name)
     
     def remove_rule(self, rule_id: str):
         """移除規則"""
         self.rules = [rule for rule in self.rules if rule.rule_id != rule_id]
-        logger.info(f"移除安全規則: {rule_id}")
+        logger.info("移除安全規則: %s", rule_id)
     
     def get_rule(self, rule_id: str) -> Optional[SecurityRule]:
         """獲取規則"""
@@ -507,19 +523,19 @@ class SecurityRulesEngine:
         else:
             rules_to_run = [rule for rule in self.rules if rule.rule_id in rule_ids]
         
-        logger.info(f"執行 {len(rules_to_run)} 個安全規則...")
+        logger.info("執行 %s 個安全規則...", len(rules_to_run))
         
         all_findings = []
         for rule in rules_to_run:
             try:
-                logger.info(f"執行規則: {rule.rule_name}")
+                logger.info("執行規則: %s", rule.rule_name)
                 findings = rule.evaluate(self.session)
                 all_findings.extend(findings)
-                logger.info(f"規則 {rule.rule_name} 完成，發現 {len(findings)} 個問題")
+                logger.info("規則 %s 完成，發現 %s 個問題", rule.rule_name, len(findings))
             except Exception as e:
-                logger.error(f"執行規則 {rule.rule_name} 失敗: {e}")
+                logger.error("執行規則 %s 失敗: %s", rule.rule_name, e)
         
-        logger.info(f"安全分析完成，總共發現 {len(all_findings)} 個問題")
+        logger.info("安全分析完成，總共發現 %s 個問題", len(all_findings))
         return all_findings
     
     def get_findings_by_severity(self, findings: List[SecurityFinding]) -> Dict[str, List[SecurityFinding]]:
@@ -564,19 +580,7 @@ class SecurityRulesEngine:
     def export_findings(self, findings: List[SecurityFinding], format: str = 'json') -> str:
         """導出發現結果"""
         if format == 'json':
-            import json
-            return json.dumps([
-                {
-                    'rule_id': finding.rule_id,
-                    'rule_name': finding.rule_name,
-                    'severity': finding.severity.value,
-                    'description': finding.description,
-                    'affected_resources': finding.affected_resources,
-                    'recommendation': finding.recommendation,
-                    'metadata': finding.metadata
-                }
-                for finding in findings
-            ], indent=2, ensure_ascii=False)
+            return json.dumps([finding.to_dict() for finding in findings], indent=2, ensure_ascii=False)
         else:
             raise ValueError(f"不支援的導出格式: {format}")
 
@@ -597,8 +601,8 @@ class CustomSecurityRule(SecurityRule):
     def get_cypher_query(self) -> str:
         return """
         MATCH (instance:EC2Instance)
-        WHERE instance.State = 'running'
-          AND instance.PublicIpAddress IS NOT NULL
+        WHERE instance.state = 'running'
+          AND instance.publicip IS NOT NULL
         RETURN instance
         """
     
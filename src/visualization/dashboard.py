@@ -9,7 +9,6 @@ import dash
 from dash import dcc, html, Input, Output, callback_context
 import plotly.graph_objs as go
 import plotly.express as px
-import pandas as pd
 import json
 from typing import Dict, List, Any, Optional
 from neo4j import GraphDatabase
@@ -181,14 +180,12 @@ class CloudInfrastructureDashboard:
                 ORDER BY Count DESC
                 """
                 
-                result = session.run(query)
-                data = [dict(record) for record in result]
+                # 直接由查詢結果建立 DataFrame，不經過中間的字典清單
+                df = session.run(query).to_df()
                 
-                if not data:
+                if df.empty:
                     return go.Figure()
                 
-                df = pd.DataFrame(data)
-                
                 fig = px.bar(df, x='NodeType', y='Count', 
                            title='資源類型統計',
                            color='Count',
@@ -218,14 +215,12 @@ class CloudInfrastructureDashboard:
                 ORDER BY Count DESC
                 """
                 
-                result = session.run(query)
-                data = [dict(record) for record in result]
+                # 直接由查詢結果建立 DataFrame，不經過中間的字典清單
+                df = session.run(query).to_df()
                 
-                if not data:
+                if df.empty:
                     return go.Figure()
                 
-                df = pd.DataFrame(data)
-                
                 fig = px.pie(df, values='Count', names='Region', 
                            title='資源區域分佈')
                 
@@ -357,8 +352,8 @@ class CloudInfrastructureDashboard:
                           (sg)-[:HAS_RULE]->(rule:Rule)
                     WHERE rule.SourceCIDR CONTAINS '0.0.0.0/0'
                     RETURN DISTINCT 
-                        instance.Name AS InstanceName,
-                        instance.PublicIP AS PublicIP,
+                        instance.name AS InstanceName,
+                        instance.publicip AS PublicIP,
                         collect(DISTINCT rule.PortRange) AS ExposedPorts
                     LIMIT 10
                     """
@@ -382,7 +377,7 @@ class CloudInfrastructureDashboard:
                     query = """
                     MATCH (volume:EBSVolume)
                     WHERE NOT (volume)-[:ATTACHES_TO]->(:EC2Instance)
-                    RETURN volume.VolumeId AS VolumeId, volume.Size AS Size
+                    RETURN volume.volumeid AS VolumeId, volume.size AS Size
                     LIMIT 10
                     """
                     
@@ -0,0 +1,23 @@
+"""需要 Neo4j 的測試共用設定：設定 NEO4J_TEST_URI 才會執行，測試會寫入並清除自己的節點"""
+
+import os
+import unittest
+
+from src.neo4j_loader.neo4j_loader import ImprovedNeo4jLoader
+
+NEO4J_TEST_URI = os.getenv('NEO4J_TEST_URI')
+
+requires_neo4j = unittest.skipUnless(NEO4J_TEST_URI, "未設定 NEO4J_TEST_URI，略過需要 Neo4j 的測試")
+
+
+def connect_loader() -> ImprovedNeo4jLoader:
+    """以 NEO4J_TEST_* 環境變數連接測試用的 Neo4j"""
+    loader = ImprovedNeo4jLoader(
+        uri=NEO4J_TEST_URI,
+        username=os.getenv('NEO4J_TEST_USERNAME', 'neo4j'),
+        password=os.getenv('NEO4J_TEST_PASSWORD', 'password'),
+        database=os.getenv('NEO4J_TEST_DATABASE', 'neo4j')
+    )
+    if not loader.connect():
+        raise unittest.SkipTest(f"無法連接到 {NEO4J_TEST_URI}")
+    return loader
@@ -0,0 +1,54 @@
+"""分析器共用查詢結果快取測試"""
+
+import unittest
+from unittest import mock
+
+from src.analysis.base import BaseAnalyzer
+
+
+def _make_analyzer(rows):
+    """建立使用假驅動程式的分析器；讀取交易固定回傳 rows"""
+    driver = mock.MagicMock()
+    session = driver.session.return_value.__enter__.return_value
+    session.execute_read.side_effect = lambda *args, **kwargs: [dict(row) for row in rows]
+    return BaseAnalyzer(driver), session
+
+
+class CachedReadTest(unittest.TestCase):
+    
+    def test_repeated_read_hits_cache(self):
+        analyzer, session = _make_analyzer([{'Name': 'a'}])
+        self.assertEqual(analyzer._cached_read("RETURN 1", limit=5), [{'Name': 'a'}])
+        self.assertEqual(analyzer._cached_read("RETURN 1", limit=5), [{'Name': 'a'}])
+        self.assertEqual(session.execute_read.call_count, 1)
+        
+        # 參數不同視為不同的查詢
+        analyzer._cached_read("RETURN 1", limit=6)
+        self.assertEqual(session.execute_read.call_count, 2)
+    
+    def test_refresh_invalidates(self):
+        analyzer, session = _make_analyzer([{'Name': 'a'}])
+        analyzer._cached_read("RETURN 1")
+        analyzer.refresh()
+        analyzer._cached_read("RETURN 1")
+        self.assertEqual(session.execute_read.call_count, 2)
+    
+    def test_hits_return_copies(self):
+        analyzer, _ = _make_analyzer([{'Name': 'a'}])
+        first = analyzer._cached_read("RETURN 1")
+        first[0]['Name'] = 'changed'
+        first.append({'Name': 'extra'})
+        self.assertEqual(analyzer._cached_read("RETURN 1"), [{'Name': 'a'}])
+    
+    def test_errors_are_not_cached(self):
+        analyzer = BaseAnalyzer(mock.MagicMock())
+        compute = mock.Mock(side_effect=[RuntimeError('down'), 42])
+        with self.assertRaises(RuntimeError):
+            analyzer._cached('key', compute)
+        self.assertEqual(analyzer._cached('key', compute), 42)
+        self.assertEqual(analyzer._cached('key', compute), 42)
+        self.assertEqual(compute.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""綜合分析單一查詢測試"""
+
+import unittest
+from unittest import mock
+
+from src.neo4j_loader.neo4j_loader import COMPREHENSIVE_LISTS, COMPREHENSIVE_QUERY, ImprovedNeo4jLoader
+
+
+def _record(critical_total, single_total):
+    """合併查詢傳回的唯一一列（每個子查詢一個欄位）"""
+    record = {name: [] for name, _ in COMPREHENSIVE_LISTS}
+    record.update({
+        'exposed_services': [
+            {'InstanceName': 'web', 'InstanceID': 'i-1', 'PublicIP': '1.2.3.4', 'State': 'running',
+             'SecurityGroup': 'sg-a', 'RuleID': 'r-1'},
+            {'InstanceName': 'web', 'InstanceID': 'i-1', 'PublicIP': '1.2.3.4', 'State': 'running',
+             'SecurityGroup': 'sg-b', 'RuleID': 'r-2'},
+        ],
+        'unencrypted_ebs': [{'ResourceType': 'EBSVolume', 'ResourceID': 'vol-1'}],
+        'unencrypted_s3': [{'ResourceType': 'S3Bucket', 'ResourceID': 'bucket-1'}],
+        'critical_nodes': [{'n': {'id': 'vpc-1'}, 'connection_count': 7, 'node_type': 'VPC'}],
+        'critical_nodes_total': critical_total,
+        'single_points_of_failure': [
+            {'n': {'id': 'vol-2'}, 'connection_count': 1, 'node_type': 'EBSVolume', 'connected': {'id': 'i-1'}}
+        ],
+        'single_points_of_failure_total': single_total,
+    })
+    return record
+
+
+class RunComprehensiveCypherTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.loader = ImprovedNeo4jLoader('bolt://localhost:7687', 'neo4j', 'password')
+        self.loader.session = mock.MagicMock()
+        self.tx = mock.MagicMock()
+        self.loader.session.execute_read.side_effect = lambda work: work(self.tx)
+    
+    def test_query_is_built_from_analyzer_queries(self):
+        for name, query in COMPREHENSIVE_LISTS:
+            self.assertIn(query, COMPREHENSIVE_QUERY)
+            self.assertIn(f"AS {name}\n", COMPREHENSIVE_QUERY)
+    
+    def test_lists_come_from_one_round_trip(self):
+        self.tx.run.return_value.single.return_value.data.return_value = _record(1, 1)
+        lists = self.loader.run_comprehensive_cypher(node_limit=100)
+        
+        self.assertEqual(self.loader.session.execute_read.call_count, 1)
+        self.assertEqual(self.tx.run.call_count, 1)
+        self.assertEqual(self.tx.run.call_args.kwargs['node_limit'], 100)
+        self.assertEqual(lists['exposed_services'][0]['SecurityGroups'], ['sg-a', 'sg-b'])
+        self.assertEqual([r['ResourceID'] for r in lists['unencrypted_resources']], ['vol-1', 'bucket-1'])
+        self.assertEqual(lists['critical_nodes'], [{'node': {'id': 'vpc-1'}, 'connection_count': 7, 'node_type': 'VPC'}])
+        self.assertEqual(lists['single_points_of_failure'][0]['connected_nodes'], [{'id': 'i-1'}])
+        self.assertFalse(lists['critical_nodes_truncated'])
+        self.assertFalse(lists['single_points_of_failure_truncated'])
+    
+    def test_capped_lists_report_total_and_truncation(self):
+        self.tx.run.return_value.single.return_value.data.return_value = _record(250, 1)
+        lists = self.loader.run_comprehensive_cypher(node_limit=1)
+        
+        self.assertEqual(lists['critical_nodes_total'], 250)
+        self.assertTrue(lists['critical_nodes_truncated'])
+        self.assertEqual(lists['single_points_of_failure_total'], 1)
+        self.assertFalse(lists['single_points_of_failure_truncated'])
+
+
+if __name__ == '__main__':
+    unittest.main()
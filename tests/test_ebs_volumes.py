@@ -0,0 +1,59 @@
+"""EBS 磁碟載入與未加密磁碟規則的一致性測試"""
+
+import re
+import unittest
+from dataclasses import fields
+
+from src.data_models import EBSVolumeNodeProperties
+from src.neo4j_loader.neo4j_loader import ImprovedNeo4jLoader
+from src.rules.security_rules_engine import UnencryptedEBSRule
+from tests.neo4j_support import connect_loader, requires_neo4j
+
+VOLUMES = {'Volumes': [
+    {'VolumeId': 'vol-test-plain', 'Size': 8, 'VolumeType': 'gp3', 'State': 'in-use', 'Encrypted': False},
+    {'VolumeId': 'vol-test-missing', 'Size': 16, 'VolumeType': 'gp2', 'State': 'in-use'},
+    {'VolumeId': 'vol-test-encrypted', 'Size': 32, 'VolumeType': 'gp3', 'State': 'in-use', 'Encrypted': True},
+    {'VolumeId': 'vol-test-detached', 'Size': 64, 'VolumeType': 'gp3', 'State': 'available', 'Encrypted': False},
+]}
+VOLUME_IDS = [volume['VolumeId'] for volume in VOLUMES['Volumes']]
+
+
+class EBSVolumeExtractionTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.volumes = ImprovedNeo4jLoader('bolt://localhost:7687', 'neo4j', 'password')._extract_ebs_volumes(VOLUMES)
+    
+    def test_extracted_keys_match_schema_properties(self):
+        schema_properties = {field.name for field in fields(EBSVolumeNodeProperties)} - {'lastupdated'}
+        for volume in self.volumes:
+            self.assertEqual(set(volume), schema_properties)
+            self.assertIsInstance(volume['encrypted'], bool)
+    
+    def test_unencrypted_rule_reads_loaded_properties(self):
+        read = set(re.findall(r'volume\.(\w+)', UnencryptedEBSRule().get_cypher_query()))
+        self.assertTrue(read)
+        self.assertLessEqual(read, set(self.volumes[0]))
+
+
+@requires_neo4j
+class UnencryptedEBSRuleIntegrationTest(unittest.TestCase):
+    """實際載入磁碟後執行 UNENCRYPTED_EBS 規則"""
+    
+    def setUp(self):
+        self.loader = connect_loader()
+        self.addCleanup(self.loader.close)
+        self.addCleanup(
+            self.loader.session.run, "MATCH (v:EBSVolume) WHERE v.id IN $ids DETACH DELETE v", ids=VOLUME_IDS
+        )
+        self.assertTrue(self.loader.load_aws_data({'ebs_volumes': VOLUMES}, region='us-east-1'))
+    
+    def test_rule_matches_unencrypted_in_use_volumes(self):
+        findings = UnencryptedEBSRule().evaluate(self.loader.session)
+        matched = {
+            resource['volume_id'] for finding in findings for resource in finding.affected_resources
+        } & set(VOLUME_IDS)
+        self.assertEqual(matched, {'vol-test-plain', 'vol-test-missing'})
+
+
+if __name__ == '__main__':
+    unittest.main()
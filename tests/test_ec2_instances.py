@@ -0,0 +1,80 @@
+"""EC2 實例載入、狀態索引與舊屬性轉換測試"""
+
+import re
+import unittest
+from dataclasses import fields
+
+from src.analysis.cost_optimization import CostOptimizationAnalyzer, LARGE_INSTANCES_QUERY
+from src.data_models import EC2InstanceNodeProperties
+from src.neo4j_loader.neo4j_loader import ImprovedNeo4jLoader
+from tests.neo4j_support import connect_loader, requires_neo4j
+
+INSTANCES = {'Reservations': [{'Instances': [
+    # 模擬資料與 AWS API 的 State 為字典
+    {'InstanceId': 'i-test-large', 'Name': 'large', 'InstanceType': 'm5.xlarge',
+     'State': {'Name': 'running'}, 'PublicIpAddress': '203.0.113.10'},
+    # AWSExtractor 已將 State 攤平為字串
+    {'InstanceId': 'i-test-small', 'Name': 'small', 'InstanceType': 't3.micro', 'State': 'running'},
+    {'InstanceId': 'i-test-stopped', 'Name': 'stopped', 'InstanceType': 'm5.large',
+     'State': {'Name': 'stopped'}},
+]}]}
+INSTANCE_IDS = ['i-test-large', 'i-test-small', 'i-test-stopped', 'i-test-legacy']
+
+
+class EC2InstanceExtractionTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.instances = ImprovedNeo4jLoader(
+            'bolt://localhost:7687', 'neo4j', 'password'
+        )._extract_ec2_instances(INSTANCES)
+    
+    def test_extracted_keys_are_schema_properties(self):
+        schema_properties = {field.name for field in fields(EC2InstanceNodeProperties)}
+        for instance in self.instances:
+            self.assertLessEqual(set(instance), schema_properties)
+    
+    def test_state_accepts_dict_and_flattened_values(self):
+        self.assertEqual([instance['state'] for instance in self.instances], ['running', 'running', 'stopped'])
+    
+    def test_large_instance_query_reads_loaded_properties(self):
+        read = set(re.findall(r'instance\.(\w+)', LARGE_INSTANCES_QUERY))
+        self.assertLessEqual(read, set(self.instances[0]))
+
+
+@requires_neo4j
+class EC2StateIndexIntegrationTest(unittest.TestCase):
+    """載入實例並套用架構後，大型實例查詢應由 state 索引查找"""
+    
+    def setUp(self):
+        self.loader = connect_loader()
+        self.addCleanup(self.loader.close)
+        self.addCleanup(
+            self.loader.session.run, "MATCH (i:EC2Instance) WHERE i.id IN $ids DETACH DELETE i", ids=INSTANCE_IDS
+        )
+        # 舊版載入器以 AWS 欄位名稱寫入的節點
+        self.loader.session.run(
+            "CREATE (:EC2Instance {id: 'i-test-legacy', InstanceId: 'i-test-legacy', Name: 'legacy', "
+            "State: 'running', InstanceType: 'c5.2xlarge'})"
+        )
+        self.loader.setup_schema(force=True)
+        self.loader.session.run("CALL db.awaitIndexes(60)")
+        self.assertTrue(self.loader.load_aws_data({'ec2_instances': INSTANCES}, region='us-east-1'))
+        self.analyzer = CostOptimizationAnalyzer(self.loader.driver, self.loader.database)
+    
+    def test_large_instances_use_state_index(self):
+        self.assertIn('NodeIndexSeek', self.analyzer.explain_large_instances())
+        
+        found = {
+            instance['InstanceID'] for instance in self.analyzer.find_expensive_resources()['large_instances']
+        } & set(INSTANCE_IDS)
+        self.assertEqual(found, {'i-test-large', 'i-test-legacy'})
+    
+    def test_legacy_properties_are_renamed(self):
+        record = self.loader.session.run(
+            "MATCH (i:EC2Instance {id: 'i-test-legacy'}) RETURN i.state AS state, i.State AS legacy_state"
+        ).single()
+        self.assertEqual((record['state'], record['legacy_state']), ('running', None))
+
+
+if __name__ == '__main__':
+    unittest.main()
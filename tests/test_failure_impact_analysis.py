@@ -0,0 +1,82 @@
+"""故障衝擊分析器測試"""
+
+import unittest
+from unittest import mock
+
+from src.analysis.failure_impact_analysis import FailureImpactAnalyzer
+
+
+def _make_analyzer():
+    """建立使用假驅動程式的分析器，回傳 (分析器, 假 session)"""
+    driver = mock.MagicMock()
+    session = driver.session.return_value.__enter__.return_value
+    return FailureImpactAnalyzer(driver), session
+
+
+class CriticalNodeCacheTest(unittest.TestCase):
+    """連接度掃描使用共用的查詢結果快取，不依賴 APOC"""
+    
+    def setUp(self):
+        self.analyzer, self.session = _make_analyzer()
+        self.session.run.return_value = [
+            {'n': {'id': 'vpc-1'}, 'connection_count': 7, 'node_type': 'VPC'}
+        ]
+    
+    def test_scan_is_cached_until_refresh(self):
+        expected = [{'node': {'id': 'vpc-1'}, 'connection_count': 7, 'node_type': 'VPC'}]
+        self.assertEqual(self.analyzer.identify_critical_nodes(min_connections=5), expected)
+        self.assertEqual(self.analyzer.identify_critical_nodes(min_connections=5), expected)
+        self.assertEqual(self.session.run.call_count, 1)
+        
+        self.analyzer.refresh()
+        self.analyzer.identify_critical_nodes(min_connections=5)
+        self.assertEqual(self.session.run.call_count, 2)
+    
+    def test_callers_cannot_corrupt_cached_scan(self):
+        first = self.analyzer.identify_critical_nodes(min_connections=5)
+        first[0]['node']['id'] = 'changed'
+        first.clear()
+        self.assertEqual(
+            self.analyzer.identify_critical_nodes(min_connections=5)[0]['node'], {'id': 'vpc-1'}
+        )
+
+
+class ImpactScoreTest(unittest.TestCase):
+    """關鍵節點的影響分數以一次批次查詢取得"""
+    
+    def setUp(self):
+        self.analyzer, self.session = _make_analyzer()
+        self.session.run.return_value.values.return_value = [
+            ['sg-1', 4, 9, 36],
+            ['vpc-1', 7, 20, 140],
+        ]
+    
+    def test_batch_keeps_input_order_and_zero_defaults(self):
+        scores = self.analyzer.calculate_impact_scores(['vpc-1', 'missing', 'sg-1'])
+        self.assertEqual([score['resource_id'] for score in scores], ['vpc-1', 'missing', 'sg-1'])
+        self.assertEqual(scores[0]['impact_score'], 140)
+        self.assertEqual(scores[1], {
+            'resource_id': 'missing', 'direct_connections': 0, 'reachable_nodes': 0, 'impact_score': 0
+        })
+        self.assertEqual(self.session.run.call_count, 1)
+    
+    def test_summary_scores_top_critical_nodes_in_one_query(self):
+        top_critical = [
+            {'node': {'id': 'vpc-1'}, 'connection_count': 7, 'node_type': 'VPC'},
+            {'node': {'id': 'sg-1'}, 'connection_count': 4, 'node_type': 'SecurityGroup'},
+        ]
+        with mock.patch.object(self.analyzer, '_summarize_node_degrees', return_value=(2, 0, top_critical)), \
+                mock.patch.object(self.analyzer, '_get_node_statistics', return_value={}), \
+                mock.patch.object(self.analyzer, 'analyze_network_redundancy', return_value=[]):
+            summary = self.analyzer.get_failure_impact_summary()
+        
+        self.assertEqual(
+            [(node['node']['id'], node['impact_score']) for node in summary['top_critical_nodes']],
+            [('vpc-1', 140), ('sg-1', 36)]
+        )
+        self.session.run.assert_called_once()
+        self.assertEqual(self.session.run.call_args.kwargs['resource_ids'], ['vpc-1', 'sg-1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
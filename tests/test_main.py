@@ -0,0 +1,55 @@
+"""main.py 資料擷取與載入流程測試"""
+
+import hashlib
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from main import ImprovedCloudInfrastructureAnalyzer
+from scripts.create_mock_data import EnhancedMockAWSDataGenerator
+
+
+class MockDataCacheTest(unittest.TestCase):
+    """沿用快取的模擬資料時，完整流程應載入該檔案而非資料目錄中最新的檔案"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        tmp = Path(self.tmp.name)
+        config_path = tmp / '.env'
+        config_path.write_text(f"DATA_DIR={tmp / 'data'}\nOUTPUT_DIR={tmp / 'output'}\n")
+        
+        with mock.patch.object(ImprovedCloudInfrastructureAnalyzer, '_initialize_components'):
+            self.analyzer = ImprovedCloudInfrastructureAnalyzer(str(config_path))
+        self.analyzer.neo4j_loader = mock.Mock()
+        self.analyzer.neo4j_loader.load_aws_data.return_value = True
+        
+        # 與生成設定相符的快取檔案，以及一個較新的其他資料檔案
+        config_hash = hashlib.blake2b(
+            json.dumps(EnhancedMockAWSDataGenerator().get_config(), sort_keys=True).encode(), digest_size=8
+        ).hexdigest()
+        self.mock_data_path = self.analyzer.raw_data_dir / 'enhanced_mock_aws_resources.json'
+        self.mock_data_path.write_text(json.dumps({'source': 'cached-mock'}))
+        self.mock_data_path.with_name(self.mock_data_path.name + '.meta').write_text(config_hash)
+        newer_path = self.analyzer.raw_data_dir / 'real_aws_resources_us-east-1.json'
+        newer_path.write_text(json.dumps({'source': 'newer-file'}))
+        mtime = self.mock_data_path.stat().st_mtime + 60
+        os.utime(newer_path, (mtime, mtime))
+    
+    def test_cache_hit_records_cached_path(self):
+        self.assertTrue(self.analyzer.extract_data(use_mock=True))
+        self.assertEqual(self.analyzer._last_extracted, self.mock_data_path)
+    
+    def test_full_pipeline_loads_cached_mock_data(self):
+        with mock.patch.object(self.analyzer, 'run_analysis', return_value={'summary': {}}):
+            self.assertTrue(self.analyzer.run_full_pipeline(use_mock=True))
+        
+        loaded = self.analyzer.neo4j_loader.load_aws_data.call_args[0][0]
+        self.assertEqual(loaded, {'source': 'cached-mock'})
+
+
+if __name__ == '__main__':
+    unittest.main()